@@ -84,6 +84,8 @@ namespace Footsies
 
         private TrainingManager trainingManager;
         private TrainingRemoteControl trainingRemoteControl;
+        // Battle states kept in the game by the remote control, so that they don't have to be transferred
+        private readonly Dictionary<int, BattleState> stateSlots = new();
 
         void Awake()
         {
@@ -118,6 +120,11 @@ namespace Footsies
                 GameManager.Instance.botP1?.SetAI(p1Bot);
                 GameManager.Instance.botP2?.SetAI(p2Bot);
 
+                // Listen for all remote connections before signaling that the game is ready for them
+                (int p1Port, int p2Port) = trainingManager.Listen();
+                int remoteControlPort = trainingRemoteControl.Listen();
+                GameManager.Instance.SignalReady(p1Port, p2Port, remoteControlPort);
+
                 // Wait for everything to setup (mainly remote connections)
                 Task.WhenAll(new Task[] {trainingManager.Setup(), trainingRemoteControl.Setup()}).Wait();
 
@@ -137,41 +144,7 @@ namespace Footsies
 
         void FixedUpdate()
         {
-            TrainingRemoteControl.Command command = trainingRemoteControl.ProcessCommand();
-            switch (command)
-            {
-                case TrainingRemoteControl.Command.RESET:
-                    Debug.Log("Received RESET command");
-                    ChangeRoundState(RoundStateType.Stop);
-                    break;
-
-                case TrainingRemoteControl.Command.STATE_SAVE:
-                    Debug.Log("Received STATE SAVE command");
-                    trainingRemoteControl.SendBattleState(SaveState());
-                    break;
-
-                case TrainingRemoteControl.Command.STATE_LOAD:
-                    Debug.Log("Received STATE LOAD command");
-                    LoadState(trainingRemoteControl.GetDesiredBattleState());
-                    break;
-                
-                case TrainingRemoteControl.Command.P2_BOT:
-                    Debug.Log("Received P2 BOT command");
-                    if (trainingRemoteControl.isP2Bot)
-                    {
-                        trainingManager.actorP2 = trainingRemoteControl.p2Bot;
-                    }
-                    else
-                    {
-                        trainingManager.actorP2 = trainingRemoteControl.p2Saved;
-                    }
-                    break;
-                
-                case TrainingRemoteControl.Command.SEED:
-                    Debug.Log("Setting random seed to " + trainingRemoteControl.seed.ToString());
-                    Random.InitState(trainingRemoteControl.seed);
-                    break;
-            }
+            ProcessRemoteControlCommands();
 
             switch(_roundState)
             {
@@ -205,6 +178,13 @@ namespace Footsies
                         break;
                     }
 
+                    // Commands sent before the actions may have arrived after the ones carried out at the start of this update
+                    ProcessRemoteControlCommands();
+                    if (_roundState != RoundStateType.Fight)
+                    {
+                        break;
+                    }
+
                     frameCount++;
                     
                     UpdateFightState();
@@ -244,6 +224,66 @@ namespace Footsies
             }
         }
 
+        // Carry out all pending remote control commands, so that commands sent one after the other (such as loading a battle state and keeping it in a slot)
+        // all take effect before the battle advances with the actions that were sent after them
+        void ProcessRemoteControlCommands()
+        {
+            TrainingRemoteControl.Command command;
+            while ((command = trainingRemoteControl.ProcessCommand()) != TrainingRemoteControl.Command.NONE)
+            {
+                ProcessRemoteControlCommand(command);
+            }
+        }
+
+        void ProcessRemoteControlCommand(TrainingRemoteControl.Command command)
+        {
+            switch (command)
+            {
+                case TrainingRemoteControl.Command.RESET:
+                    Debug.Log("Received RESET command");
+                    ChangeRoundState(RoundStateType.Stop);
+                    break;
+
+                case TrainingRemoteControl.Command.STATE_SAVE:
+                    Debug.Log("Received STATE SAVE command");
+                    trainingRemoteControl.SendBattleState(SaveState());
+                    break;
+
+                case TrainingRemoteControl.Command.STATE_LOAD:
+                    Debug.Log("Received STATE LOAD command");
+                    LoadState(trainingRemoteControl.GetDesiredBattleState());
+                    break;
+                
+                case TrainingRemoteControl.Command.P2_BOT:
+                    Debug.Log("Received P2 BOT command");
+                    if (trainingRemoteControl.isP2Bot)
+                    {
+                        trainingManager.actorP2 = trainingRemoteControl.p2Bot;
+                    }
+                    else
+                    {
+                        trainingManager.actorP2 = trainingRemoteControl.p2Saved;
+                    }
+                    break;
+                
+                case TrainingRemoteControl.Command.SEED:
+                    Debug.Log("Setting random seed to " + trainingRemoteControl.seed.ToString());
+                    Random.InitState(trainingRemoteControl.seed);
+                    break;
+
+                case TrainingRemoteControl.Command.STATE_SAVE_SLOT:
+                    stateSlots[trainingRemoteControl.stateSlot] = SaveState();
+                    break;
+
+                case TrainingRemoteControl.Command.STATE_LOAD_SLOT:
+                    if (stateSlots.TryGetValue(trainingRemoteControl.stateSlot, out BattleState slotState))
+                        LoadState(slotState);
+                    else
+                        Debug.Log("WARNING: no battle state was saved in slot " + trainingRemoteControl.stateSlot.ToString() + ", ignoring");
+                    break;
+            }
+        }
+
         void ChangeRoundState(RoundStateType state)
         {
             _roundState = state;
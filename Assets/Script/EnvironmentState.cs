@@ -1,5 +1,6 @@
 using System.Collections;
 using System.Collections.Generic;
+using System.Buffers.Binary;
 using UnityEngine;
 using System;
 
@@ -9,6 +10,16 @@ namespace Footsies
     [Serializable]
     public class EnvironmentState
     {
+        // Binary encoding of the environment state, as an alternative to JSON.
+        // The layout is fixed: 15 big-endian 4-byte fields, in the order below (which is the same order as the Python `FootsiesState`):
+        // p1Vital, p2Vital, p1Guard, p2Guard, p1Move, p2Move, p1MoveFrame, p2MoveFrame (int),
+        // p1Position, p2Position (float),
+        // globalFrame, p1MostRecentAction, p2MostRecentAction, p1Hitstun, p2Hitstun (int)
+        // The protocol version should be bumped whenever this layout changes
+        public static readonly byte[] PROTOCOL_MAGIC = {(byte)'F', (byte)'T', (byte)'S', (byte)'S'};
+        public const int PROTOCOL_VERSION = 1;
+        public const int BINARY_SIZE = 15 * 4;
+
         public int p1Vital;
         public int p2Vital;
         public int p1Guard;
@@ -43,5 +54,40 @@ namespace Footsies
             p1Hitstun = p1Hitstun_;
             p2Hitstun = p2Hitstun_;
         }
+
+        public byte[] ToBytes()
+        {
+            byte[] bytes = new byte[BINARY_SIZE];
+            WriteBytes(bytes);
+            return bytes;
+        }
+
+        public void WriteBytes(Span<byte> bytes)
+        {
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(0, 4), p1Vital);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(4, 4), p2Vital);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(8, 4), p1Guard);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(12, 4), p2Guard);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(16, 4), p1Move);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(20, 4), p2Move);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(24, 4), p1MoveFrame);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(28, 4), p2MoveFrame);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(32, 4), BitConverter.SingleToInt32Bits(p1Position));
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(36, 4), BitConverter.SingleToInt32Bits(p2Position));
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(40, 4), globalFrame);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(44, 4), p1MostRecentAction);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(48, 4), p2MostRecentAction);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(52, 4), p1Hitstun);
+            BinaryPrimitives.WriteInt32BigEndian(bytes.Slice(56, 4), p2Hitstun);
+        }
+
+        // Message sent once right after the agent connects, so that it can verify it speaks the same binary protocol
+        public static byte[] ProtocolHandshake()
+        {
+            byte[] handshake = new byte[8];
+            PROTOCOL_MAGIC.CopyTo(handshake, 0);
+            BinaryPrimitives.WriteInt32BigEndian(new Span<byte>(handshake, 4, 4), PROTOCOL_VERSION);
+            return handshake;
+        }
     }
 }
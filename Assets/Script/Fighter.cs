@@ -794,9 +794,10 @@ namespace Footsies
             
             currentHitStunFrame = state.currentHitStunFrame;
             
-            input = state.input;
-            inputDown = state.inputDown;
-            inputUp = state.inputUp;
+            // The state may be loaded more than once, so it shouldn't be changed by the fighter
+            input = (int[]) state.input.Clone();
+            inputDown = (int[]) state.inputDown.Clone();
+            inputUp = (int[]) state.inputUp.Clone();
             
             isInputBackward = state.isInputBackward;
             isReserveProximityGuard = state.isReserveProximityGuard;
@@ -1,6 +1,7 @@
 ﻿using UnityEngine;
 using UnityEngine.SceneManagement;
 using System;
+using System.Text;
 
 namespace Footsies
 {
@@ -27,7 +28,19 @@ namespace Footsies
         public TrainingBattleAIActor botP1 { get; private set; }
         public TrainingBattleAIActor botP2 { get; private set; }
 
+        // Message sent to the training environment once the game is listening for its connections, with the ports on which it's listening (-1 if not listening)
+        [Serializable]
+        private class ReadyMessage
+        {
+            public int p1Port;
+            public int p2Port;
+            public int remoteControlPort;
+        }
+
         private bool shouldMute = false;
+        // Where to signal that the game is ready for the training environment to connect, if anywhere (port -1)
+        private string readyAddress = "localhost";
+        private int readyPort = -1;
 
         private void Awake()
         {
@@ -42,20 +55,27 @@ namespace Footsies
             int argTrainingSyncMode = 0; // 0: async | 1: sync non-blocking | 2: sync blocking
             string argRemoteControlAddress = "localhost";
             int argRemoteControlPort = 11002;
+            string argRemoteControlUnixPath = null;
             bool argP1Bot = false;
             bool argP1Player = false;
             bool argP1Spectator = false;
             string argP1TrainingAddress = "localhost";
             int argP1TrainingPort = 11000;
+            string argP1TrainingUnixPath = null;
+            string argP1TrainingShmPath = null;
             bool argP1NoState = false;
+            int argP1StateBatch = 1;
             bool argP2Bot = false;
             bool argP2Player = false;
             bool argP2Spectator = false;
             string argP2TrainingAddress = "localhost";
             int argP2TrainingPort = 11001;
+            string argP2TrainingUnixPath = null;
             bool argP2NoState = false;
             bool argFastForward = false;
             float argFastForwardSpeed = 6.0f;
+            bool argBinaryState = false;
+            bool argActionRepeat = false;
             
             int argIndex = 0;
             foreach (var arg in args)
@@ -108,6 +128,14 @@ namespace Footsies
                         argP2Spectator = true;
                         break;
 
+                    case "--binary-state":
+                        argBinaryState = true;
+                        break;
+
+                    case "--action-repeat":
+                        argActionRepeat = true;
+                        break;
+
                     case "--mute":
                         shouldMute = true;
                         break;
@@ -120,6 +148,10 @@ namespace Footsies
                         argRemoteControlPort = Convert.ToUInt16(args[argIndex + 1]);
                         break;
 
+                    case "--remote-control-unix-path":
+                        argRemoteControlUnixPath = args[argIndex + 1];
+                        break;
+
                     case "--p1-address":
                         argP1TrainingAddress = args[argIndex + 1];
                         break;
@@ -127,11 +159,23 @@ namespace Footsies
                     case "--p1-port":
                         argP1TrainingPort = Convert.ToUInt16(args[argIndex + 1]);
                         break;
+
+                    case "--p1-unix-path":
+                        argP1TrainingUnixPath = args[argIndex + 1];
+                        break;
+
+                    case "--p1-shm-path":
+                        argP1TrainingShmPath = args[argIndex + 1];
+                        break;
                     
                     case "--p1-no-state":
                         argP1NoState = true;
                         break;
 
+                    case "--p1-state-batch":
+                        argP1StateBatch = Convert.ToInt32(args[argIndex + 1]);
+                        break;
+
                     case "--p2-address":
                         argP2TrainingAddress = args[argIndex + 1];
                         break;
@@ -139,10 +183,22 @@ namespace Footsies
                     case "--p2-port":
                         argP2TrainingPort = Convert.ToUInt16(args[argIndex + 1]);
                         break;
+
+                    case "--p2-unix-path":
+                        argP2TrainingUnixPath = args[argIndex + 1];
+                        break;
                     
                     case "--p2-no-state":
                         argP2NoState = true;
                         break;
+
+                    case "--ready-address":
+                        readyAddress = args[argIndex + 1];
+                        break;
+
+                    case "--ready-port":
+                        readyPort = Convert.ToUInt16(args[argIndex + 1]);
+                        break;
                 }
 
                 argIndex++;
@@ -157,21 +213,30 @@ namespace Footsies
                             ? "synced non-blocking"
                             : "async"
                 ) + "\n"
+                + "   Binary environment state? " + argBinaryState + "\n"
+                + "   P1 action repeat? " + argActionRepeat + "\n"
                 + "   Mute? " + shouldMute + "\n"
                 + "   Remote Control address: " + argRemoteControlAddress + "\n"
                 + "   Remote Control port: " + argRemoteControlPort + "\n"
+                + "   Remote Control Unix socket path: " + argRemoteControlUnixPath + "\n"
                 + "   P1 Bot? " + argP1Bot + "\n"
                 + "   P1 Player? " + argP1Player + "\n"
                 + "   P1 Spectator? " + argP1Spectator + "\n"
                 + "   P1 Training address: " + argP1TrainingAddress + "\n"
                 + "   P1 Training port: " + argP1TrainingPort + "\n"
+                + "   P1 Training Unix socket path: " + argP1TrainingUnixPath + "\n"
+                + "   P1 Training shared memory path: " + argP1TrainingShmPath + "\n"
                 + "   Send environment state to P1? " + !argP1NoState + "\n"
+                + "   P1 spectator states per message: " + argP1StateBatch + "\n"
                 + "   P2 Bot? " + argP2Bot + "\n"
                 + "   P2 Player? " + argP2Player + "\n"
                 + "   P1 Spectator? " + argP2Spectator + "\n"
                 + "   P2 Training address: " + argP2TrainingAddress + "\n"
                 + "   P2 Training port: " + argP2TrainingPort + "\n"
+                + "   P2 Training Unix socket path: " + argP2TrainingUnixPath + "\n"
                 + "   Send environment state to P2? " + !argP2NoState + "\n"
+                + "   Ready signal address: " + readyAddress + "\n"
+                + "   Ready signal port: " + readyPort + "\n"
             );
 
             if (argIsTrainingEnv && argFastForward)
@@ -188,21 +253,35 @@ namespace Footsies
 
             TrainingActor actorP1 = argP1Bot ? botP1
                          : (argP1Player ? new TrainingPlayerActor(true)
-                                        : new TrainingRemoteActor(argP1TrainingAddress, argP1TrainingPort, argTrainingSyncMode == 2, argP1NoState));
+                                        : new TrainingRemoteActor(argP1TrainingAddress, argP1TrainingPort, argTrainingSyncMode == 2, argP1NoState, argBinaryState, argActionRepeat, argP1TrainingUnixPath, argP1TrainingShmPath));
 
             TrainingActor actorP2 = argP2Bot ? botP2
                          : (argP2Player ? new TrainingPlayerActor(false)
-                                        : new TrainingRemoteActor(argP2TrainingAddress, argP2TrainingPort, argTrainingSyncMode == 2, argP2NoState));
+                                        : new TrainingRemoteActor(argP2TrainingAddress, argP2TrainingPort, argTrainingSyncMode == 2, argP2NoState, argBinaryState, false, argP2TrainingUnixPath));
 
             // WARNING: because each player only has an address-port pair, it doesn't make sense to create a spectator of a RemoteActor
             if (argP1Spectator)
-                actorP1 = new TrainingActorRemoteSpectator(argP1TrainingAddress, argP1TrainingPort, argTrainingSyncMode == 2, actorP1);
+                actorP1 = new TrainingActorRemoteSpectator(argP1TrainingAddress, argP1TrainingPort, argTrainingSyncMode == 2, actorP1, argBinaryState, argP1TrainingUnixPath, argP1StateBatch);
             if (argP2Spectator)
-                actorP2 = new TrainingActorRemoteSpectator(argP2TrainingAddress, argP2TrainingPort, argTrainingSyncMode == 2, actorP2);
+                actorP2 = new TrainingActorRemoteSpectator(argP2TrainingAddress, argP2TrainingPort, argTrainingSyncMode == 2, actorP2, argBinaryState, argP2TrainingUnixPath);
 
             trainingManager = new TrainingManager(argIsTrainingEnv, argTrainingSyncMode > 0, actorP1, actorP2);
 
-            trainingRemoteControl = new TrainingRemoteControl(argRemoteControlAddress, argRemoteControlPort, argTrainingSyncMode == 2);
+            trainingRemoteControl = new TrainingRemoteControl(argRemoteControlAddress, argRemoteControlPort, argTrainingSyncMode == 2, argRemoteControlUnixPath);
+        }
+
+        // Signal the training environment that the game is listening for its connections, on the given ports.
+        // Since ports may be chosen by the system, this is the only way for the environment to know them in that case
+        public void SignalReady(int p1Port, int p2Port, int remoteControlPort)
+        {
+            if (readyPort < 0) { return; }
+
+            ReadyMessage message = new() { p1Port = p1Port, p2Port = p2Port, remoteControlPort = remoteControlPort };
+            if (!SocketHelper.SendOnce(readyAddress, readyPort, Encoding.UTF8.GetBytes(JsonUtility.ToJson(message))))
+            {
+                Debug.Log("ERROR: could not signal readiness to address '" + readyAddress + "' with port " + readyPort + "! Quitting...");
+                Application.Quit();
+            }
         }
 
         private void Start()
@@ -0,0 +1,167 @@
+using System;
+using System.Diagnostics;
+using System.IO;
+using System.IO.MemoryMappedFiles;
+using System.Net.Sockets;
+using System.Text;
+using System.Threading;
+
+namespace Footsies
+{
+    // The game's end of the shared memory transport (footsies_gym/envs/shm.py), through which the agent's states and actions go.
+    // Messages go through ring buffers in a memory-mapped file created by the environment, and the connected socket is only used
+    // to wake up whichever end is waiting for a message
+    public class SharedMemoryChannel : IDisposable
+    {
+        public const int FILE_HEADER_SIZE = 64;
+        public const int RING_HEADER_SIZE = 64;
+        public const int WRITE_COUNT_OFFSET = 0;
+        public const int WAITING_OFFSET = 8;
+        public const int READ_COUNT_OFFSET = 32;
+        public const uint VERSION = 1;
+
+        // The ring of messages from the game to the environment (states) comes first, followed by the ring of messages from the environment to the game (actions)
+        private const int GAME_TO_ENV = 0;
+        private const int ENV_TO_GAME = 1;
+
+        // How often a blocked reader checks the ring on its own, in case a wake-up was missed
+        private const int WAKE_UP_POLL_INTERVAL_MICROSECONDS = 1000;
+
+        private readonly MemoryMappedFile file;
+        private readonly MemoryMappedViewAccessor view;
+        private readonly Socket wakeUpSocket;
+        private readonly double spinTimeSeconds;
+
+        private readonly int capacity;
+        private readonly int slotSize;
+        private readonly long inbound;
+        private readonly long outbound;
+        private ulong readCount;
+        private ulong writeCount;
+
+        public SharedMemoryChannel(string path, Socket wakeUpSocket, double spinTimeSeconds = 50e-6)
+        {
+            file = MemoryMappedFile.CreateFromFile(path, FileMode.Open, null, 0, MemoryMappedFileAccess.ReadWrite);
+            view = file.CreateViewAccessor(0, 0, MemoryMappedFileAccess.ReadWrite);
+            this.wakeUpSocket = wakeUpSocket;
+            // Spinning only helps if the environment runs on another processor meanwhile
+            this.spinTimeSeconds = Environment.ProcessorCount > 1 ? spinTimeSeconds : 0.0;
+
+            byte[] magic = new byte[4];
+            view.ReadArray(0, magic, 0, 4);
+            if (Encoding.ASCII.GetString(magic) != "FTSM")
+                throw new InvalidDataException("invalid shared memory file '" + path + "'");
+            uint version = view.ReadUInt32(4);
+            if (version != VERSION)
+                throw new InvalidDataException("the shared memory file uses protocol version " + version + ", but version " + VERSION + " is expected");
+
+            capacity = (int)view.ReadUInt32(8);
+            slotSize = (int)view.ReadUInt32(12);
+            inbound = RingOffset(ENV_TO_GAME);
+            outbound = RingOffset(GAME_TO_ENV);
+            readCount = view.ReadUInt64(inbound + READ_COUNT_OFFSET);
+            writeCount = view.ReadUInt64(outbound + WRITE_COUNT_OFFSET);
+        }
+
+        private long RingOffset(int ring)
+        {
+            return FILE_HEADER_SIZE + ring * (RING_HEADER_SIZE + (long)capacity * slotSize);
+        }
+
+        private long SlotOffset(long ring, ulong index)
+        {
+            return ring + RING_HEADER_SIZE + (long)(index % (ulong)capacity) * slotSize;
+        }
+
+        private bool InboundAvailable()
+        {
+            Thread.MemoryBarrier();
+            return view.ReadUInt64(inbound + WRITE_COUNT_OFFSET) > readCount;
+        }
+
+        private void SetWaiting(bool waiting)
+        {
+            view.Write(inbound + WAITING_OFFSET, waiting ? 1u : 0u);
+            Thread.MemoryBarrier();
+        }
+
+        // Receive the next message, blocking until there is one. Returns null if the environment closed the connection
+        public byte[] Receive()
+        {
+            Stopwatch spin = Stopwatch.StartNew();
+            while (!InboundAvailable() && spin.Elapsed.TotalSeconds < spinTimeSeconds) { }
+
+            if (!InboundAvailable())
+            {
+                SetWaiting(true);
+                try
+                {
+                    byte[] wakeUps = new byte[64];
+                    // Check again after marking ourselves as waiting, since the message may have been published right before
+                    while (!InboundAvailable())
+                    {
+                        if (wakeUpSocket.Poll(WAKE_UP_POLL_INTERVAL_MICROSECONDS, SelectMode.SelectRead) && wakeUpSocket.Receive(wakeUps) == 0)
+                            return null;
+                    }
+                }
+                catch (SocketException)
+                {
+                    return null;
+                }
+                finally
+                {
+                    SetWaiting(false);
+                }
+            }
+
+            long offset = SlotOffset(inbound, readCount);
+            int size = (int)view.ReadUInt32(offset);
+            if (size > slotSize - 4)
+                throw new InvalidDataException("received message of " + size + " bytes through shared memory, which doesn't fit in a slot of " + slotSize + " bytes");
+
+            byte[] message = new byte[size];
+            view.ReadArray(offset + 4, message, 0, size);
+
+            // The message was copied out, so its slot can be reused by the environment
+            readCount++;
+            Thread.MemoryBarrier();
+            view.Write(inbound + READ_COUNT_OFFSET, readCount);
+
+            return message;
+        }
+
+        // Send a message, waiting for a free slot if the environment is behind by a full ring
+        public void Send(byte[] message)
+        {
+            if (message.Length > slotSize - 4)
+                throw new ArgumentException("message of " + message.Length + " bytes doesn't fit in a slot of " + slotSize + " bytes");
+
+            while (true)
+            {
+                Thread.MemoryBarrier();
+                if (writeCount - view.ReadUInt64(outbound + READ_COUNT_OFFSET) < (ulong)capacity)
+                    break;
+                Thread.Yield();
+            }
+
+            long offset = SlotOffset(outbound, writeCount);
+            view.Write(offset, (uint)message.Length);
+            view.WriteArray(offset + 4, message, 0, message.Length);
+
+            // Publish the message only once it's complete
+            writeCount++;
+            Thread.MemoryBarrier();
+            view.Write(outbound + WRITE_COUNT_OFFSET, writeCount);
+            Thread.MemoryBarrier();
+
+            if (view.ReadUInt32(outbound + WAITING_OFFSET) != 0)
+                wakeUpSocket.Send(new byte[] { 1 }, SocketFlags.None);
+        }
+
+        public void Dispose()
+        {
+            view.Dispose();
+            file.Dispose();
+        }
+    }
+}
@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.IO;
 using System.Net;
 using System.Net.Sockets;
 using System.Threading.Tasks;
@@ -10,19 +11,12 @@ namespace Footsies
     public class SocketHelper
     {
 
-        public static async Task<Socket> AcceptConnectionAsync(string address, int port)
+        // Start listening for a connection on the given address and port. If the port is 0, a free one is chosen by the system,
+        // which can be queried with GetPort(). Returns null if no IPv4 address was found for the given address
+        public static Socket Listen(string address, int port)
         {
             // Setup Socket server to listen for the agent's actions
-            IPAddress hostIPAddress = null;
-            foreach (var hostAddress in Dns.GetHostAddresses(address))
-            {
-                // Only accept IPv4 addresses
-                if (hostAddress.AddressFamily == AddressFamily.InterNetwork)
-                {
-                    hostIPAddress = hostAddress;
-                    break; // return the first one found
-                }
-            }
+            IPAddress hostIPAddress = GetIPv4Address(address);
             if (hostIPAddress == null)
             {
                 return null;
@@ -32,13 +26,97 @@ namespace Footsies
             Socket listener = new(ipEndPoint.AddressFamily, SocketType.Stream, ProtocolType.Tcp);
             listener.Bind(ipEndPoint);
             listener.Listen(1); // maximum queue length of 1, we only want 1 connection
-            
+
+            return listener;
+        }
+
+        // Start listening for a connection on a Unix domain socket with the given path, which is replaced if it already exists
+        public static Socket ListenUnix(string path)
+        {
+            if (File.Exists(path))
+                File.Delete(path);
+
+            Socket listener = new(AddressFamily.Unix, SocketType.Stream, ProtocolType.Unspecified);
+            listener.Bind(new UnixDomainSocketEndPoint(path));
+            listener.Listen(1); // maximum queue length of 1, we only want 1 connection
+
+            return listener;
+        }
+
+        // Start listening for a connection on the Unix domain socket path if there is one, or on the address and port otherwise
+        public static Socket Listen(string address, int port, string unixPath)
+        {
+            return unixPath != null ? ListenUnix(unixPath) : Listen(address, port);
+        }
+
+        // The port to which a listening socket is bound, or 0 if it's not bound to a port (Unix domain sockets)
+        public static int GetPort(Socket listener)
+        {
+            return listener.LocalEndPoint is IPEndPoint ipEndPoint ? ipEndPoint.Port : 0;
+        }
+
+        public static async Task<Socket> AcceptConnectionAsync(Socket listener)
+        {
             Socket socket = await listener.AcceptAsync().ConfigureAwait(false);
             listener.Close();
 
+            // Messages are tiny (actions are only a few bytes), so send them right away rather than waiting to coalesce them (Nagle's algorithm)
+            if (socket.AddressFamily == AddressFamily.InterNetwork)
+                socket.NoDelay = true;
+
             return socket;
         }
 
+        public static async Task<Socket> AcceptConnectionAsync(string address, int port)
+        {
+            Socket listener = Listen(address, port);
+            if (listener == null)
+            {
+                return null;
+            }
+
+            return await AcceptConnectionAsync(listener).ConfigureAwait(false);
+        }
+
+        // Connect to the given address and port and send a single message, closing the connection afterwards.
+        // Returns whether the message could be sent
+        public static bool SendOnce(string address, int port, byte[] message)
+        {
+            IPAddress hostIPAddress = GetIPv4Address(address);
+            if (hostIPAddress == null)
+            {
+                return false;
+            }
+
+            using Socket socket = new(hostIPAddress.AddressFamily, SocketType.Stream, ProtocolType.Tcp);
+            try
+            {
+                socket.Connect(new IPEndPoint(hostIPAddress, port));
+                SendWithSizeSuffix(socket, message);
+                socket.Shutdown(SocketShutdown.Both);
+            }
+            catch (SocketException)
+            {
+                return false;
+            }
+
+            return true;
+        }
+
+        private static IPAddress GetIPv4Address(string address)
+        {
+            foreach (var hostAddress in Dns.GetHostAddresses(address))
+            {
+                // Only accept IPv4 addresses
+                if (hostAddress.AddressFamily == AddressFamily.InterNetwork)
+                {
+                    return hostAddress; // return the first one found
+                }
+            }
+
+            return null;
+        }
+
         public static void SendWithSizeSuffix(Socket socket, byte[] message)
         {
             byte[] messageWithSuffix = AddSizeSuffix(message);
@@ -4,6 +4,10 @@ namespace Footsies
 {
     public interface TrainingActor
     {
+        // Start listening for remote connections, if any, before they are accepted in Setup().
+        // Returns the port on which the actor is listening, or -1 if it doesn't need a connection
+        int Listen();
+
         // Setup any necessary resources before beginning training
         Task Setup();
 
@@ -1,4 +1,5 @@
 using UnityEngine;
+using System;
 using System.Net.Sockets;
 using System.Text;
 using System.Threading.Tasks;
@@ -12,9 +13,16 @@ namespace Footsies
     {
         public string address { get; private set; }
         public int port { get; private set; }
+        // If not null, the path of the Unix domain socket on which to listen instead of the address and port
+        public string unixPath { get; private set; }
         public bool syncedComms { get; private set; }
+        public bool binaryState { get; private set; }
+        // How many binary states are sent together in each message. The spectator doesn't act on the states, so they don't need to be sent right away
+        public int stateBatch { get; private set; }
 
         private Task<int> stateRequest = null;
+        private byte[] stateBatchBuffer;
+        private int stateBatchCount = 0;
         private bool connected = false;
 
         private Socket trainingListener;
@@ -29,31 +37,55 @@ namespace Footsies
             this.syncedComms = syncedComms;
         }
 
-        public TrainingActorRemoteSpectator(string address, int port, bool syncedComms, TrainingActor actor)
+        public TrainingActorRemoteSpectator(string address, int port, bool syncedComms, TrainingActor actor, bool binaryState = false, string unixPath = null, int stateBatch = 1)
         {
             this.address = address;
             this.port = port;
+            this.unixPath = unixPath;
             this.syncedComms = syncedComms;
             this.actor = actor;
+            this.binaryState = binaryState;
+            this.stateBatch = binaryState ? Math.Max(1, stateBatch) : 1;
         }
 
         public void SetTrainingActor(TrainingActor actor) {
             this.actor = actor;
         }
 
-        public async Task Setup()
+        public int Listen()
         {
-            await actor.Setup().ConfigureAwait(false);
+            actor.Listen();
 
-            Debug.Log("Waiting for the agent to connect to address '" + address + "' with port " + port + "...");
-            trainingSocket = await SocketHelper.AcceptConnectionAsync(address, port).ConfigureAwait(false);
-            if (trainingSocket == null)
+            if (trainingListener == null)
             {
-                Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
-                Application.Quit();
+                trainingListener = SocketHelper.Listen(address, port, unixPath);
+                if (trainingListener == null)
+                {
+                    Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
+                    Application.Quit();
+                    return -1;
+                }
+                // The port may have been chosen by the system
+                port = SocketHelper.GetPort(trainingListener);
             }
+
+            return port;
+        }
+
+        public async Task Setup()
+        {
+            await actor.Setup().ConfigureAwait(false);
+
+            if (Listen() < 0)
+                return;
+
+            Debug.Log("Waiting for the agent to connect to " + (unixPath != null ? "Unix domain socket '" + unixPath + "'" : "address '" + address + "' with port " + port) + "...");
+            trainingSocket = await SocketHelper.AcceptConnectionAsync(trainingListener).ConfigureAwait(false);
             Debug.Log("Agent connection received!");
 
+            if (binaryState)
+                SocketHelper.SendWithSizeSuffix(trainingSocket, EnvironmentState.ProtocolHandshake());
+
             connected = true;
         }
 
@@ -71,8 +103,25 @@ namespace Footsies
         {
             actor.UpdateCurrentState(state, battleOver);
 
-            string stateJson = JsonUtility.ToJson(state);
-            byte[] stateBytes = Encoding.UTF8.GetBytes(stateJson);
+            byte[] stateBytes;
+            if (stateBatch > 1)
+            {
+                stateBatchBuffer ??= new byte[stateBatch * EnvironmentState.BINARY_SIZE];
+                state.WriteBytes(new Span<byte>(stateBatchBuffer, stateBatchCount * EnvironmentState.BINARY_SIZE, EnvironmentState.BINARY_SIZE));
+                stateBatchCount++;
+                if (stateBatchCount < stateBatch)
+                    return;
+
+                // The buffer is handed over to the send, so the next batch gets a new one. Batches must not be interleaved on the socket
+                stateBytes = stateBatchBuffer;
+                stateBatchBuffer = null;
+                stateBatchCount = 0;
+                stateRequest?.Wait();
+            }
+            else
+            {
+                stateBytes = binaryState ? state.ToBytes() : Encoding.UTF8.GetBytes(JsonUtility.ToJson(state));
+            }
 
             stateRequest = SocketHelper.SendWithSizeSuffixAsync(trainingSocket, stateBytes);
             if (syncedComms)
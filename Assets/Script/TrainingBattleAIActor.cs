@@ -21,6 +21,8 @@ namespace Footsies
             return battleAI;
         }
 
+        public int Listen() { return -1; }
+
         public Task Setup() { return Task.CompletedTask; }
 
         public void Close() {}
@@ -26,6 +26,14 @@ namespace Footsies
             this.actorP2 = actorP2;
         }
 
+        // Start listening for the actors' remote connections, returning the ports on which they are listening (-1 if they don't need any)
+        public (int, int) Listen()
+        {
+            if (!isTraining || isAlreadySetup) { return (-1, -1); }
+
+            return (actorP1.Listen(), actorP2.Listen());
+        }
+
         public async Task<bool> Setup()
         {
             if (!isTraining) { return false; }
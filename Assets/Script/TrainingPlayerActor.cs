@@ -11,6 +11,8 @@ namespace Footsies
             this.player1 = player1;
         }
 
+        public int Listen() { return -1; }
+
         public Task Setup() { return Task.CompletedTask; }
 
         public void Close() {}
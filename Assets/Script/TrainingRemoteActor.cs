@@ -1,5 +1,6 @@
 using UnityEngine;
 using System;
+using System.Buffers.Binary;
 using System.Net.Sockets;
 using System.Text;
 using System.Threading.Tasks;
@@ -8,37 +9,87 @@ namespace Footsies
 {
     public class TrainingRemoteActor : TrainingActor
     {
+        // Action messages are 3 bytes (left, right, attack). With action repeat, they have 3 more bytes:
+        // the stop conditions (1 byte, bit flags) and the maximum number of frames for which the action is held (2 bytes, big-endian)
+        public const int ACTION_MESSAGE_SIZE = 3;
+        public const int ACTION_REPEAT_MESSAGE_SIZE = 6;
+        // Stop holding the action once the agent can act again, i.e. it isn't in the middle of a move (that hasn't hit the opponent) nor being hit
+        public const byte ACTION_REPEAT_UNTIL_ACTIONABLE = 1;
+
         public string address { get; private set; }
         public int port { get; private set; }
+        // If not null, the path of the Unix domain socket on which to listen instead of the address and port
+        public string unixPath { get; private set; }
+        // If not null, the path of the shared memory file through which states and actions go instead of the socket, which only carries wake-ups
+        public string shmPath { get; private set; }
         public bool syncedComms { get; private set; }
         public bool noState { get; private set; }
+        public bool binaryState { get; private set; }
+        public bool actionRepeat { get; private set; }
 
         private bool connected = false;
         private int input = 0;
+        // State of the action being held, if action repeat is enabled. The environment state is only sent once it's no longer held
+        private int repeatFramesLeft = 0;
+        private byte repeatStopConditions = 0;
+        private EnvironmentState repeatStartState;
         private Task inputRequest;
         private Task<int> stateRequest;
 
+        private Socket trainingListener;
         private Socket trainingSocket;
+        private SharedMemoryChannel sharedMemory;
 
-        public TrainingRemoteActor(string address, int port, bool syncedComms, bool noState)
+        public TrainingRemoteActor(string address, int port, bool syncedComms, bool noState, bool binaryState = false, bool actionRepeat = false, string unixPath = null, string shmPath = null)
         {
             this.address = address;
             this.port = port;
+            this.unixPath = unixPath;
+            this.shmPath = shmPath;
             this.syncedComms = syncedComms;
             this.noState = noState;
+            this.binaryState = binaryState;
+            this.actionRepeat = actionRepeat;
         }
 
-        public async Task Setup()
+        public int Listen()
         {
-            Debug.Log("Waiting for the agent to connect to address '" + address + "' with port " + port + "...");
-            trainingSocket = await SocketHelper.AcceptConnectionAsync(address, port).ConfigureAwait(false);
-            if (trainingSocket == null)
+            if (trainingListener == null)
             {
-                Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
-                Application.Quit();
+                trainingListener = SocketHelper.Listen(address, port, unixPath);
+                if (trainingListener == null)
+                {
+                    Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
+                    Application.Quit();
+                    return -1;
+                }
+                // The port may have been chosen by the system
+                port = SocketHelper.GetPort(trainingListener);
             }
+
+            return port;
+        }
+
+        public async Task Setup()
+        {
+            if (Listen() < 0)
+                return;
+
+            Debug.Log("Waiting for the agent to connect to " + (unixPath != null ? "Unix domain socket '" + unixPath + "'" : "address '" + address + "' with port " + port) + "...");
+            trainingSocket = await SocketHelper.AcceptConnectionAsync(trainingListener).ConfigureAwait(false);
             Debug.Log("Agent connection received!");
 
+            if (shmPath != null)
+                sharedMemory = new SharedMemoryChannel(shmPath, trainingSocket);
+
+            if (binaryState && !noState)
+            {
+                if (sharedMemory != null)
+                    sharedMemory.Send(EnvironmentState.ProtocolHandshake());
+                else
+                    SocketHelper.SendWithSizeSuffix(trainingSocket, EnvironmentState.ProtocolHandshake());
+            }
+
             connected = true;
         }
 
@@ -46,20 +97,38 @@ namespace Footsies
         {
             trainingSocket.Shutdown(SocketShutdown.Both);
             trainingSocket.Close();
+            sharedMemory?.Dispose();
 
             connected = false;
         }
 
         public void UpdateCurrentState(EnvironmentState state, bool battleOver)
         {
-            if (!noState)
+            if (repeatFramesLeft > 0)
             {
-                string stateJson = JsonUtility.ToJson(state);
-                byte[] stateBytes = Encoding.UTF8.GetBytes(stateJson);
+                repeatFramesLeft--;
+                if (repeatFramesLeft > 0 && !battleOver && !ShouldStopRepeat(state))
+                    return;
+
+                repeatFramesLeft = 0;
+            }
+            repeatStartState = state;
 
-                stateRequest = SocketHelper.SendWithSizeSuffixAsync(trainingSocket, stateBytes);
-                if (syncedComms)
-                    stateRequest.Wait();
+            if (!noState)
+            {
+                byte[] stateBytes = binaryState ? state.ToBytes() : Encoding.UTF8.GetBytes(JsonUtility.ToJson(state));
+
+                if (sharedMemory != null)
+                {
+                    // Written straight into the mapping, there's nothing to wait for
+                    sharedMemory.Send(stateBytes);
+                }
+                else
+                {
+                    stateRequest = SocketHelper.SendWithSizeSuffixAsync(trainingSocket, stateBytes);
+                    if (syncedComms)
+                        stateRequest.Wait();
+                }
             }
         }
 
@@ -68,9 +137,12 @@ namespace Footsies
             return input;
         }
 
-        // no-op if a request is still unfulfilled
+        // no-op if a request is still unfulfilled, or if the previous input is still being held
         public void RequestNextInput()
         {
+            if (repeatFramesLeft > 0)
+                return;
+
             // recycle the same input request if the previous one hasn't completed yet
             if (inputRequest != null && !inputRequest.IsCompleted)
             {
@@ -90,14 +162,54 @@ namespace Footsies
             return connected && (inputRequest == null || inputRequest.IsCompleted);
         }
 
+        // Whether the held action should stop being held at this state. It's also stopped whenever a guard is damaged, so that the agent sees every change in guard
+        private bool ShouldStopRepeat(EnvironmentState state)
+        {
+            if (state.p1Guard < repeatStartState.p1Guard || state.p2Guard < repeatStartState.p2Guard)
+                return true;
+
+            if ((repeatStopConditions & ACTION_REPEAT_UNTIL_ACTIONABLE) != 0)
+            {
+                // Same as the frame skipping of the Python environment, where the number of frames since the start of moves that last indefinitely is always 0
+                bool p1MoveIndefinite = state.p1Move == (int)CommonActionID.STAND
+                    || state.p1Move == (int)CommonActionID.FORWARD
+                    || state.p1Move == (int)CommonActionID.BACKWARD;
+                bool p1InMove = !p1MoveIndefinite && state.p1MoveFrame != 0;
+                bool p2HitOrGuarding = state.p2Move == (int)CommonActionID.DAMAGE
+                    || state.p2Move == (int)CommonActionID.GUARD_M
+                    || state.p2Move == (int)CommonActionID.GUARD_STAND
+                    || state.p2Move == (int)CommonActionID.GUARD_CROUCH
+                    || state.p2Move == (int)CommonActionID.GUARD_BREAK;
+                bool p1Hit = state.p1Move == (int)CommonActionID.DAMAGE;
+
+                return !((p1InMove && !p2HitOrGuarding) || p1Hit);
+            }
+
+            return false;
+        }
+
         private async Task RequestTrainingInput()
         {
-            byte[] actionMessageContent = {0, 0, 0};
-            ArraySegment<byte> actionMessage = new(actionMessageContent);
+            int messageSize = actionRepeat ? ACTION_REPEAT_MESSAGE_SIZE : ACTION_MESSAGE_SIZE;
+            byte[] actionMessageContent = new byte[messageSize];
+            int bytesReceived;
 
-            // Corrected implementation of ReceiveAsync with a cancellation token... (https://github.com/mono/mono/issues/20902)
-            var receiveTask = trainingSocket.ReceiveAsync(actionMessage, SocketFlags.None);
-            int bytesReceived = await receiveTask.ConfigureAwait(false);
+            if (sharedMemory != null)
+            {
+                // Waiting for the action may block on the socket, so don't do it on the main thread
+                byte[] received = await Task.Run(() => sharedMemory.Receive()).ConfigureAwait(false);
+                bytesReceived = received != null ? received.Length : 0;
+                if (received != null)
+                    Array.Copy(received, actionMessageContent, Math.Min(received.Length, messageSize));
+            }
+            else
+            {
+                ArraySegment<byte> actionMessage = new(actionMessageContent);
+
+                // Corrected implementation of ReceiveAsync with a cancellation token... (https://github.com/mono/mono/issues/20902)
+                var receiveTask = trainingSocket.ReceiveAsync(actionMessage, SocketFlags.None);
+                bytesReceived = await receiveTask.ConfigureAwait(false);
+            }
 
             // EOF has been reached, communication has likely been stopped on the agent's side
             if (bytesReceived == 0)
@@ -105,15 +217,21 @@ namespace Footsies
                 Debug.Log("Training agent has ceased communication, quitting...");
                 Application.Quit();
             }
-            else if (bytesReceived != 3)
+            else if (bytesReceived != messageSize)
             {
-                Debug.Log("ERROR: abnormal number of bytes received from agent's action message (sent " + bytesReceived + ", expected 3)");
+                Debug.Log("ERROR: abnormal number of bytes received from agent's action message (sent " + bytesReceived + ", expected " + messageSize + ")");
             }
 
             input = 0;
             input |= actionMessageContent[0] != 0 ? (int)InputDefine.Left : 0;
             input |= actionMessageContent[1] != 0 ? (int)InputDefine.Right : 0;
             input |= actionMessageContent[2] != 0 ? (int)InputDefine.Attack : 0;
+
+            if (actionRepeat)
+            {
+                repeatStopConditions = actionMessageContent[3];
+                repeatFramesLeft = Math.Max(1, (int)BinaryPrimitives.ReadUInt16BigEndian(new ReadOnlySpan<byte>(actionMessageContent, 4, 2)));
+            }
         }
     }
 }
\ No newline at end of file
@@ -15,6 +15,9 @@ namespace Footsies
         // - StateSave: request a copy of the current state
         // - StateLoad: request the game to load a specific state
         // - P2Bot: toggle between the initial actor and the in-game bot for player 2
+        // - Seed: set the random number generator's seed
+        // - StateSaveSlot: keep a copy of the current state in the game, in the specified slot
+        // - StateLoadSlot: load the state kept in the specified slot
         public enum Command
         {
             NONE = 0,
@@ -23,6 +26,8 @@ namespace Footsies
             STATE_LOAD = 3,
             P2_BOT = 4,
             SEED = 5,
+            STATE_SAVE_SLOT = 6,
+            STATE_LOAD_SLOT = 7,
         }
 
         [Serializable]
@@ -34,6 +39,8 @@ namespace Footsies
 
         public string address { get; private set; }
         public int port { get; private set; }
+        // If not null, the path of the Unix domain socket on which to listen instead of the address and port
+        public string unixPath { get; private set; }
         public bool syncedComms { get; private set; }
 
         private BattleState battleState;
@@ -41,27 +48,47 @@ namespace Footsies
         public TrainingBattleAIActor p2Bot { get; private set; }
         public bool isP2Bot { get; private set; }
         public int seed { get; private set; }
+        public int stateSlot { get; private set; }
 
+        private Socket managerListener;
         private Socket managerSocket;
 
         private bool connected;
 
-        public TrainingRemoteControl(string address, int port, bool syncedComms)
+        public TrainingRemoteControl(string address, int port, bool syncedComms, string unixPath = null)
         {
             this.address = address;
             this.port = port;
+            this.unixPath = unixPath;
             this.syncedComms = syncedComms;
         }
 
-        public async Task Setup()
+        // Start listening for the agent's connection, returning the port on which it's listening (-1 if it couldn't)
+        public int Listen()
         {
-            Debug.Log("Waiting for the agent to connect to address '" + address + "' with port " + port + "...");
-            managerSocket = await SocketHelper.AcceptConnectionAsync(address, port).ConfigureAwait(false);
-            if (managerSocket == null)
+            if (managerListener == null)
             {
-                Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
-                Application.Quit();
+                managerListener = SocketHelper.Listen(address, port, unixPath);
+                if (managerListener == null)
+                {
+                    Debug.Log("ERROR: could not find any suitable IPv4 address for '" + address + "'! Quitting...");
+                    Application.Quit();
+                    return -1;
+                }
+                // The port may have been chosen by the system
+                port = SocketHelper.GetPort(managerListener);
             }
+
+            return port;
+        }
+
+        public async Task Setup()
+        {
+            if (Listen() < 0)
+                return;
+
+            Debug.Log("Waiting for the agent to connect to " + (unixPath != null ? "Unix domain socket '" + unixPath + "'" : "address '" + address + "' with port " + port) + "...");
+            managerSocket = await SocketHelper.AcceptConnectionAsync(managerListener).ConfigureAwait(false);
             Debug.Log("Agent connection received!");
 
             connected = true;
@@ -101,6 +128,11 @@ namespace Footsies
                 case Command.SEED:
                     seed = int.Parse(message.value);
                     break;
+
+                case Command.STATE_SAVE_SLOT:
+                case Command.STATE_LOAD_SLOT:
+                    stateSlot = int.Parse(message.value);
+                    break;
             }
 
             return command;
@@ -3,5 +3,6 @@ from gymnasium.envs.registration import register
 register(
     id="FootsiesEnv-v0",
     entry_point="footsies_gym.envs.footsies:FootsiesEnv",
+    vector_entry_point="footsies_gym.envs.footsies_vector:FootsiesVectorEnv",
     nondeterministic=True,
 )
@@ -0,0 +1,362 @@
+import dataclasses
+import json
+import os
+import queue
+import shutil
+import threading
+import numpy as np
+from os import path
+from typing import Dict, Iterator, List
+from .moves import FootsiesMove, is_p1_actionable
+from .wrappers.normalization import FootsiesNormalized
+from .wrappers.recorder import (
+    RECORDING_CHUNK_INDEX_FILE,
+    RECORDING_COLUMN_FILE_SUFFIX,
+    RECORDING_METADATA_FILE,
+    RECORDED_INFO_FIELDS,
+    read_recording_metadata,
+    recording_chunk_file,
+)
+
+# Number of moves in the observations, which excludes the end-of-round moves (as `FootsiesEnv.observation_space`)
+_NUM_OBSERVED_MOVES = len(set(FootsiesMove) - {FootsiesMove.WIN, FootsiesMove.DEAD})
+# Size of the observations in the "array" format, without and with one-hot encoding (as `FootsiesEnv._setup_observation_array`)
+_ARRAY_OBSERVATION_SIZE = 8
+_ONE_HOT_ARRAY_OBSERVATION_SIZE = 8 + 2 * _NUM_OBSERVED_MOVES + 4
+# Number of rows that are read at once when building the index
+_INDEX_BLOCK_ROWS = 1 << 20
+
+
+@dataclasses.dataclass(slots=True)
+class FootsiesDatasetBatch:
+    """
+    A minibatch of transitions, as arrays whose first dimension is the sample. For sequences, the second dimension is the time step.
+    Observations are in the format the dataset was configured with
+    """
+
+    # The observation on which each action was taken, and the observation that followed
+    observations: "dict | np.ndarray"
+    next_observations: "dict | np.ndarray"
+    actions: np.ndarray
+    # The reward received after each action (summed over the skipped steps, with frame skip)
+    rewards: np.ndarray
+    terminated: np.ndarray
+    truncated: np.ndarray
+    # The recorded `info` fields of the observations (`RECORDED_INFO_FIELDS`)
+    infos: Dict[str, np.ndarray]
+
+
+def decompress_recording(recording_path: str, destination: str):
+    """Write a compressed recording to `destination` as an uncompressed one, which can be memory-mapped. Only one chunk is in memory at a time"""
+    metadata, chunk_rows = read_recording_metadata(recording_path)
+    if not metadata["compressed"]:
+        raise ValueError(f"the recording in '{recording_path}' is not compressed")
+
+    os.makedirs(destination, exist_ok=True)
+    column_files = {name: open(path.join(destination, name + RECORDING_COLUMN_FILE_SUFFIX), "wb") for name in metadata["columns"]}
+    try:
+        for index in range(len(chunk_rows)):
+            with np.load(path.join(recording_path, recording_chunk_file(index))) as chunk:
+                for name, f in column_files.items():
+                    chunk[name].tofile(f)
+    finally:
+        for f in column_files.values():
+            f.close()
+
+    shutil.copyfile(path.join(recording_path, RECORDING_CHUNK_INDEX_FILE), path.join(destination, RECORDING_CHUNK_INDEX_FILE))
+    with open(path.join(destination, RECORDING_METADATA_FILE), "wt") as f:
+        json.dump({**metadata, "compressed": False}, f, indent=4)
+
+
+class FootsiesDataset:
+    def __init__(
+        self,
+        recording_path: str,
+        frame_delay: int = 0,
+        frame_skip: bool = False,
+        obs_format: str = "dict",
+        obs_one_hot: bool = False,
+        normalize: bool = False,
+        normalize_guard: bool = True,
+        seed: int | None = None,
+    ):
+        """
+        Dataset of the trajectories recorded with `FootsiesRecorder`, serving random minibatches of transitions or sequences.
+        The columns are memory-mapped rather than loaded, and only the episode boundaries (and, with frame skip, the steps on which the agent acts) are indexed in memory.
+        Compressed recordings should be decompressed first, with `decompress_recording()`
+
+        Observations are decoded into the same layout as those of `FootsiesEnv` with the same `obs_format` and `obs_one_hot`, or those of `FootsiesNormalized` with `normalize`,
+        regardless of the format in which they were recorded. The recording is assumed to be made without frame delay nor observation wrappers
+
+        Parameters
+        ----------
+        recording_path: str
+            the directory of the recording
+        frame_delay: int
+            with how many frames of delay the observations are given, as `FootsiesEnv` would. At the start of each episode, the first observation is repeated
+        frame_skip: bool
+            whether to skip the steps on which the agent can't act, as `FootsiesFrameSkipped`. Only supported with the "dict" observation format
+        obs_format: str
+            the format of the observations, either "dict" or "array"
+        obs_one_hot: bool
+            whether the guard and move of each player are one-hot encoded in the "array" observation format
+        normalize: bool
+            whether to normalize the observations as `FootsiesNormalized`. Only supported with the "dict" observation format
+        normalize_guard: bool
+            whether to normalize the guard as well, if normalizing
+        seed: int
+            the seed of the random number generator that picks the samples
+        """
+        if frame_delay < 0:
+            raise ValueError(f"the frame delay can't be negative, got {frame_delay}")
+        valid_obs_formats = {"dict", "array"}
+        if obs_format not in valid_obs_formats:
+            raise ValueError(f"observation format '{obs_format}' is invalid, must be one of {valid_obs_formats}")
+        if obs_format != "dict" and (frame_skip or normalize):
+            raise ValueError("frame skip and normalization are only supported with the 'dict' observation format, as with the environment wrappers")
+
+        metadata, chunk_rows = read_recording_metadata(recording_path)
+        if metadata["compressed"]:
+            raise ValueError(f"the recording in '{recording_path}' is compressed and can't be memory-mapped, it should be decompressed first with `decompress_recording()`")
+
+        self.recording_path = recording_path
+        self.frame_delay = frame_delay
+        self.frame_skip = frame_skip
+        self.obs_format = obs_format
+        self.obs_one_hot = obs_one_hot
+        self.normalize = normalize
+        self.normalize_guard = normalize_guard
+        self.rng = np.random.default_rng(seed)
+
+        # Rows past the last indexed chunk are ignored, they may be incomplete
+        self.num_rows = sum(chunk_rows)
+        if self.num_rows == 0:
+            raise ValueError(f"the recording in '{recording_path}' is empty")
+
+        self._columns: Dict[str, np.memmap] = {
+            name: np.memmap(
+                path.join(recording_path, name + RECORDING_COLUMN_FILE_SUFFIX),
+                dtype=np.dtype(column["dtype"]),
+                mode="r",
+                shape=(self.num_rows, *column["shape"]),
+            )
+            for name, column in metadata["columns"].items()
+        }
+        if "observation" in self._columns:
+            size = self._columns["observation"].shape[1]
+            if size not in (_ARRAY_OBSERVATION_SIZE, _ONE_HOT_ARRAY_OBSERVATION_SIZE):
+                raise ValueError(f"the recorded observations have an unknown layout, with size {size}")
+            self._recorded_one_hot = size == _ONE_HOT_ARRAY_OBSERVATION_SIZE
+
+        # The first and final row of each episode. Rows of an episode that was cut short by the end of the recording are not used
+        self.episode_starts = np.flatnonzero(self._columns["episode_start"])
+        self.episode_ends = np.flatnonzero(self._columns["episode_end"])
+        self.episode_starts = self.episode_starts[self.episode_starts <= (self.episode_ends[-1] if len(self.episode_ends) else -1)]
+        self.num_episodes = len(self.episode_ends)
+
+        if frame_skip:
+            self._build_frame_skip_index()
+        else:
+            self._steps = None
+            self._episode_first_steps = self.episode_starts
+            self._episode_end_steps = self.episode_ends
+
+    def _build_frame_skip_index(self):
+        """Index the steps on which the agent acts, which are the only ones kept with frame skip, along with the rewards and flags of the transitions between them"""
+        decisions = []
+        for start in range(0, self.num_rows, _INDEX_BLOCK_ROWS):
+            rows = np.arange(start, min(start + _INDEX_BLOCK_ROWS, self.num_rows))
+            obs = self._read_raw_observations(self._delayed_rows(rows))
+            acts = is_p1_actionable(obs["move"], obs["move_frame"]) | self._columns["episode_start"][rows] | self._columns["episode_end"][rows]
+            decisions.append(rows[acts])
+
+        # Steps are indexed by their row
+        self._steps = np.concatenate(decisions)
+        self._episode_first_steps = np.searchsorted(self._steps, self.episode_starts)
+        self._episode_end_steps = np.searchsorted(self._steps, self.episode_ends)
+
+        # The transition from each step to the next one accumulates the rewards of the skipped steps, and ends with the flags of the last of them
+        self._step_rewards = np.add.reduceat(self._columns["reward"][:], self._steps).astype(np.float64)
+        next_rows = np.append(self._steps[1:], self.num_rows) - 1
+        self._step_terminated = np.asarray(self._columns["terminated"][next_rows])
+        self._step_truncated = np.asarray(self._columns["truncated"][next_rows])
+
+    @property
+    def num_transitions(self) -> int:
+        """The number of transitions from which samples are drawn"""
+        return int(np.sum(self._episode_end_steps - self._episode_first_steps[:self.num_episodes]))
+
+    def _row_episodes(self, rows: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.episode_starts, rows, side="right") - 1
+
+    def _delayed_rows(self, rows: np.ndarray) -> np.ndarray:
+        """The rows of the observations given in place of those of `rows` with frame delay, which don't go further back than the start of their episode"""
+        if self.frame_delay == 0:
+            return rows
+        episodes = np.maximum(self._row_episodes(rows), 0)
+        return np.maximum(rows - self.frame_delay, self.episode_starts[episodes])
+
+    def _read_raw_observations(self, rows: np.ndarray) -> dict:
+        """The recorded observations of the rows, in the unnormalized dictionary layout"""
+        if "observation" not in self._columns:
+            return {key: np.asarray(self._columns["observation." + key][rows]) for key in ("guard", "move", "move_frame", "position")}
+
+        array = np.asarray(self._columns["observation"][rows])
+        if self._recorded_one_hot:
+            moves_end = 8 + 2 * _NUM_OBSERVED_MOVES
+            return {
+                "guard": np.stack([array[:, 0:4].argmax(axis=1), array[:, 4:8].argmax(axis=1)], axis=1),
+                "move": np.stack([array[:, 8:8 + _NUM_OBSERVED_MOVES].argmax(axis=1), array[:, 8 + _NUM_OBSERVED_MOVES:moves_end].argmax(axis=1)], axis=1),
+                "move_frame": array[:, moves_end:moves_end + 2],
+                "position": array[:, moves_end + 2:moves_end + 4],
+            }
+        return {
+            "guard": array[:, 0:2].astype(np.int64),
+            "move": array[:, 2:4].astype(np.int64),
+            "move_frame": array[:, 4:6],
+            "position": array[:, 6:8],
+        }
+
+    def _observations(self, rows: np.ndarray) -> "dict | np.ndarray":
+        """The observations of the rows (of any shape), in the configured format"""
+        shape = rows.shape
+        obs = self._read_raw_observations(self._delayed_rows(rows.reshape(-1)))
+
+        if self.obs_format == "array":
+            if self.obs_one_hot:
+                array = np.zeros((len(obs["guard"]), _ONE_HOT_ARRAY_OBSERVATION_SIZE), dtype=np.float32)
+                samples = np.arange(len(array))[:, np.newaxis]
+                offsets = np.array([0, 4, 8, 8 + _NUM_OBSERVED_MOVES])
+                array[samples, offsets + np.concatenate([obs["guard"], obs["move"]], axis=1)] = 1.0
+                array[:, -4:] = np.concatenate([obs["move_frame"], obs["position"]], axis=1)
+            else:
+                array = np.concatenate([obs["guard"], obs["move"], obs["move_frame"], obs["position"]], axis=1).astype(np.float32)
+            return array.reshape((*shape, -1))
+
+        if self.normalize:
+            obs = FootsiesNormalized.normalize(obs, normalize_guard=self.normalize_guard, inplace=True)
+        if self.frame_skip:
+            # Player 1's move progress is not observed with frame skip
+            obs["move_frame"] = obs["move_frame"][:, 1:]
+        return {key: value.reshape((*shape, *value.shape[1:])) for key, value in obs.items()}
+
+    def _batch(self, steps: np.ndarray) -> FootsiesDatasetBatch:
+        """The transitions from each of the steps (of any shape) to the next one"""
+        rows = steps if self._steps is None else self._steps[steps]
+        next_rows = steps + 1 if self._steps is None else self._steps[steps + 1]
+
+        if self._steps is None:
+            rewards = np.asarray(self._columns["reward"][rows])
+            terminated = np.asarray(self._columns["terminated"][rows])
+            truncated = np.asarray(self._columns["truncated"][rows])
+        else:
+            rewards = self._step_rewards[steps]
+            terminated = self._step_terminated[steps]
+            truncated = self._step_truncated[steps]
+
+        info_rows = self._delayed_rows(rows.reshape(-1))
+        return FootsiesDatasetBatch(
+            observations=self._observations(rows),
+            next_observations=self._observations(next_rows),
+            actions=np.asarray(self._columns["action"][rows]),
+            rewards=rewards,
+            terminated=terminated,
+            truncated=truncated,
+            infos={field: np.asarray(self._columns["info." + field][info_rows]).reshape((*rows.shape, *shape)) for field, (_, shape) in RECORDED_INFO_FIELDS.items()},
+        )
+
+    def _sample_starts(self, batch_size: int, length: int, rng: np.random.Generator) -> np.ndarray:
+        """Sample steps from which `length` transitions follow within the same episode, uniformly"""
+        first = self._episode_first_steps[:self.num_episodes]
+        counts = np.maximum(self._episode_end_steps - first - length + 1, 0)
+        cumulative = np.cumsum(counts)
+        if len(cumulative) == 0 or cumulative[-1] == 0:
+            raise ValueError(f"the recording has no sequences of {length} transitions")
+
+        samples = rng.integers(0, cumulative[-1], size=batch_size)
+        episodes = np.searchsorted(cumulative, samples, side="right")
+        return first[episodes] + samples - (cumulative[episodes] - counts[episodes])
+
+    def sample_transitions(self, batch_size: int, rng: np.random.Generator | None = None) -> FootsiesDatasetBatch:
+        """Sample a minibatch of transitions uniformly, with arrays of shape `(batch_size, ...)`"""
+        return self._batch(self._sample_starts(batch_size, 1, self.rng if rng is None else rng))
+
+    def sample_sequences(self, batch_size: int, length: int, rng: np.random.Generator | None = None) -> FootsiesDatasetBatch:
+        """Sample a minibatch of sequences of `length` consecutive transitions of the same episode uniformly, with arrays of shape `(batch_size, length, ...)`"""
+        if length < 1:
+            raise ValueError(f"the sequence length must be positive, got {length}")
+        starts = self._sample_starts(batch_size, length, self.rng if rng is None else rng)
+        return self._batch(starts[:, np.newaxis] + np.arange(length))
+
+    def prefetch(self, batch_size: int, length: int | None = None, num_threads: int = 2, queue_size: int = 8) -> "FootsiesDatasetPrefetcher":
+        """
+        Sample minibatches in background threads, which are taken from the returned iterator. Transitions are sampled if `length` is `None`, or else sequences of `length` transitions.
+        Each thread has its own random number generator, spawned from the dataset's
+        """
+        return FootsiesDatasetPrefetcher(self, batch_size, length, num_threads, queue_size)
+
+    def close(self):
+        """Release the memory-mapped columns. The files are unmapped once no arrays sliced from them remain"""
+        self._columns.clear()
+
+
+class FootsiesDatasetPrefetcher:
+    def __init__(self, dataset: FootsiesDataset, batch_size: int, length: int | None = None, num_threads: int = 2, queue_size: int = 8):
+        """Endless iterator of minibatches of a `FootsiesDataset`, sampled in background threads ahead of time. Should be closed once no longer needed"""
+        if num_threads < 1:
+            raise ValueError(f"the number of threads must be positive, got {num_threads}")
+
+        self.dataset = dataset
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._work, args=(rng, batch_size, length), name=f"footsies-prefetch-{i}", daemon=True)
+            for i, rng in enumerate(dataset.rng.spawn(num_threads))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _put(self, item: "FootsiesDatasetBatch | Exception"):
+        """Put an item in the queue once there's room, unless stopped in the meantime"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+    def _work(self, rng: np.random.Generator, batch_size: int, length: int | None):
+        try:
+            while not self._stop.is_set():
+                if length is None:
+                    batch = self.dataset.sample_transitions(batch_size, rng)
+                else:
+                    batch = self.dataset.sample_sequences(batch_size, length, rng)
+                self._put(batch)
+
+        except Exception as e:
+            # Raised on the consumer's side instead
+            self._put(e)
+
+    def __iter__(self) -> Iterator[FootsiesDatasetBatch]:
+        return self
+
+    def __next__(self) -> FootsiesDatasetBatch:
+        if self._stop.is_set():
+            raise StopIteration
+        batch = self._queue.get()
+        if isinstance(batch, Exception):
+            self.close()
+            raise batch
+        return batch
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self) -> "FootsiesDatasetPrefetcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
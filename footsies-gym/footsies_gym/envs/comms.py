@@ -0,0 +1,210 @@
+import errno
+import os
+import selectors
+import socket
+import struct
+from time import monotonic
+from typing import Iterable, Tuple
+from .exceptions import FootsiesGameClosedError
+
+# Connection errors that mean the game isn't listening yet (or, for Unix domain sockets, hasn't created the socket yet), after which the connection is attempted again
+_RETRY_ERRNOS = {errno.ECONNREFUSED, errno.ECONNABORTED, errno.ECONNRESET, errno.ENOENT}
+# Connection errors that mean a non-blocking connection attempt is still in progress
+_IN_PROGRESS_ERRNOS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+
+
+def connect_all(
+    connections: Iterable[Tuple[socket.socket, tuple]],
+    initial_retry_delay: float = 0.01,
+    max_retry_delay: float = 0.5,
+    timeout: float | None = None,
+):
+    """
+    Connect each socket to its address, with all connection attempts in flight at the same time.
+    Refused connections are attempted again with exponential backoff, waiting `initial_retry_delay` seconds at first and doubling up to `max_retry_delay`.
+    Raises `TimeoutError` if the sockets are not all connected after `timeout` seconds, or never if `None`. The sockets keep their original timeouts
+    """
+    connections = list(connections)
+    timeouts = [sckt.gettimeout() for sckt, _ in connections]
+    deadline = None if timeout is None else monotonic() + timeout
+
+    now = monotonic()
+    # Connections that are waiting to be attempted (again), with the time of the next attempt and the delay before the one after that
+    retries = {index: (now, initial_retry_delay) for index in range(len(connections))}
+    selector = selectors.DefaultSelector()
+
+    def retry_later(index: int, delay: float):
+        retries[index] = (monotonic() + delay, min(2 * delay, max_retry_delay))
+
+    try:
+        for sckt, _ in connections:
+            sckt.setblocking(False)
+
+        while retries or selector.get_map():
+            now = monotonic()
+            for index, (attempt_time, delay) in list(retries.items()):
+                if attempt_time > now:
+                    continue
+
+                del retries[index]
+                sckt, address = connections[index]
+                error = sckt.connect_ex(address)
+                if error in _IN_PROGRESS_ERRNOS:
+                    selector.register(sckt, selectors.EVENT_WRITE, (index, delay))
+                elif error in _RETRY_ERRNOS:
+                    retry_later(index, delay)
+                elif error not in (0, errno.EISCONN):
+                    raise OSError(error, os.strerror(error))
+
+            if not retries and not selector.get_map():
+                break
+
+            now = monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError(f"could not connect to {[address for _, address in connections]} in {timeout} seconds")
+
+            wait = min((attempt_time for attempt_time, _ in retries.values()), default=None)
+            if deadline is not None:
+                wait = deadline if wait is None else min(wait, deadline)
+            for key, _ in selector.select(None if wait is None else max(wait - now, 0.0)):
+                selector.unregister(key.fileobj)
+                error = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error in _RETRY_ERRNOS:
+                    retry_later(*key.data)
+                elif error != 0:
+                    raise OSError(error, os.strerror(error))
+
+    finally:
+        selector.close()
+        for (sckt, _), sckt_timeout in zip(connections, timeouts):
+            sckt.settimeout(sckt_timeout)
+
+
+class BufferedMessageReader:
+    """
+    Reads size-prefixed messages from a socket into a reusable, preallocated buffer.
+
+    Data is received with `recv_into` as it becomes available, so the size header, the payload and
+    any message that has already arrived after it are usually picked up in a single system call.
+    The returned messages are views into the internal buffer, and are only valid until the next read
+    """
+
+    MESSAGE_SIZE_STRUCT = struct.Struct("!I")
+
+    def __init__(self, sckt: socket.socket, capacity: int = 4096):
+        self.sckt = sckt
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        # Unread data lies in [_start, _end)
+        self._start = 0
+        self._end = 0
+
+    def _make_room(self, size: int):
+        """Guarantee that `size` bytes, counting from the start of the unread data, fit in the buffer"""
+        unread = self._end - self._start
+        if size > len(self._buffer):
+            new_buffer = bytearray(max(size, 2 * len(self._buffer)))
+            new_buffer[:unread] = self._view[self._start:self._end]
+            self._buffer = new_buffer
+            self._view = memoryview(self._buffer)
+        else:
+            # Slicing the bytearray makes a copy, so overlapping regions are not a problem
+            self._buffer[:unread] = self._buffer[self._start:self._end]
+        self._start = 0
+        self._end = unread
+
+    def _fill(self, size: int):
+        """Receive from the socket until at least `size` bytes are unread. Raises `FootsiesGameClosedError` if a problem occurred"""
+        if self._start + size > len(self._buffer):
+            self._make_room(size)
+
+        try:
+            while self._end - self._start < size:
+                received = self.sckt.recv_into(self._view[self._end:])
+                # The communication is assumed to work correctly, so if a message wasn't received then the game must have closed
+                if received == 0:
+                    raise FootsiesGameClosedError("game has closed")
+                self._end += received
+
+        except TimeoutError:
+            raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+
+    def _consume(self, size: int) -> memoryview:
+        data = self._view[self._start:self._start + size]
+        self._start += size
+        # Rewind when everything has been read, so that we rarely need to move data around
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
+        return data
+
+    def recv_bytes(self, size: int) -> memoryview:
+        """Receive exactly `size` bytes"""
+        self._fill(size)
+        return self._consume(size)
+
+    def recv_message(self) -> memoryview:
+        """Receive a message prefixed with its size"""
+        header_size = self.MESSAGE_SIZE_STRUCT.size
+        self._fill(header_size)
+        message_size = self.MESSAGE_SIZE_STRUCT.unpack_from(self._buffer, self._start)[0]
+        self._fill(header_size + message_size)
+        self._start += header_size
+        return self._consume(message_size)
+
+    def has_buffered_message(self) -> bool:
+        """Whether a complete message has already been received, and can be read without touching the socket"""
+        header_size = self.MESSAGE_SIZE_STRUCT.size
+        unread = self._end - self._start
+        if unread < header_size:
+            return False
+        message_size = self.MESSAGE_SIZE_STRUCT.unpack_from(self._buffer, self._start)[0]
+        return unread >= header_size + message_size
+
+
+if __name__ == "__main__":
+    # Round-trip latency comparison of the transports, measured as the time taken by each step
+    import argparse
+    import numpy as np
+    from time import perf_counter
+    from .footsies import FootsiesEnv
+
+    import sys
+    parser = argparse.ArgumentParser(description="Compare the round-trip latency per step of the TCP, Unix domain socket and shared memory transports")
+    parser.add_argument("--game-path", type=str, default="Build/FOOTSIES.exe")
+    parser.add_argument("--standin", action="store_true", help="use the Python stand-in for the game (`footsies_gym.sim.standin`) instead of a game build")
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--port-start", type=int, default=11000)
+    parser.add_argument("--state-format", type=str, default="binary", choices=["json", "binary"])
+    args = parser.parse_args()
+
+    transports = ["tcp", "unix"] if hasattr(socket, "AF_UNIX") else ["tcp"]
+    if hasattr(socket, "AF_UNIX") and args.state_format == "binary":
+        transports.append("shm")
+    game_path = [sys.executable, "-m", "footsies_gym.sim.standin"] if args.standin else args.game_path
+    for transport in transports:
+        env = FootsiesEnv(
+            game_path=game_path,
+            fast_forward=True,
+            sync_mode="synced_non_blocking",
+            state_format=args.state_format,
+            transport=transport,
+            **(FootsiesEnv.find_ports(start=args.port_start) if transport == "tcp" else {}),
+        )
+        latencies = np.empty((args.steps,), dtype=np.float64)
+        try:
+            env.reset(seed=0)
+            for i in range(args.steps):
+                time_start = perf_counter()
+                _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+                latencies[i] = perf_counter() - time_start
+                if terminated or truncated:
+                    env.reset()
+        finally:
+            env.close()
+
+        latencies *= 1e6
+        print(
+            f"{transport:>4}: mean {latencies.mean():>8.1f} us | median {np.median(latencies):>8.1f} us | "
+            f"p99 {np.percentile(latencies, 99):>8.1f} us ({args.steps} steps)"
+        )
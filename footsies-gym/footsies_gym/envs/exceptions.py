@@ -1,2 +1,6 @@
 class FootsiesGameClosedError(RuntimeError):
-    pass
\ No newline at end of file
+    pass
+
+
+class FootsiesProtocolError(RuntimeError):
+    pass
@@ -1,17 +1,33 @@
 from collections import deque
 import socket
 import json
+import shutil
 import subprocess
+import tempfile
 import struct
 import gymnasium as gym
+import numpy as np
 from os import path
-from typing import Callable, Tuple, Dict, Union
-from time import sleep, monotonic
+from typing import Callable, Tuple, Dict, List, Sequence, Union
+from time import monotonic, perf_counter
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
 from enum import Enum
 from gymnasium import spaces
-from ..state import FootsiesState, FootsiesBattleState
-from ..moves import FootsiesMove, FOOTSIES_MOVE_ID_TO_INDEX
-from .exceptions import FootsiesGameClosedError
+from ..state import FootsiesState, FootsiesBattleState, FOOTSIES_STATE_STRUCT
+from ..moves import FootsiesMove, FOOTSIES_MOVE_ID_TO_INDEX, FOOTSIES_MOVE_INDEFINITE, is_p1_actionable
+from ..sim import FootsiesBattle, BattleAI, action_to_input
+from .exceptions import FootsiesGameClosedError, FootsiesProtocolError
+from .comms import BufferedMessageReader, connect_all
+from .shm import SharedMemoryChannel
+from .timing import StepTimer, TimingHook
+
+# Move index in the observations of each move ID. In the terminal state, the defeated opponent gets into a move (DEAD) that doesn't occur
+# throughout the game, so in that case we default to STAND, and likewise for the winner
+_OBSERVED_MOVE_ID_TO_INDEX = {
+    **FOOTSIES_MOVE_ID_TO_INDEX,
+    FootsiesMove.DEAD.value.id: FOOTSIES_MOVE_ID_TO_INDEX[FootsiesMove.STAND.value.id],
+    FootsiesMove.WIN.value.id: FOOTSIES_MOVE_ID_TO_INDEX[FootsiesMove.STAND.value.id],
+}
 
 # TODO: move training agent input reading (through socket comms) to Update() instead of FixedUpdate()
 # TODO: dynamically change the game's timeScale value depending on the estimated framerate
@@ -22,6 +38,18 @@ class FootsiesEnv(gym.Env):
     
     STATE_MESSAGE_SIZE_BYTES = 4
     COMM_TIMEOUT = 10
+    # How long to wait for the game to signal that it's ready, when it chooses its own ports
+    STARTUP_TIMEOUT = 60
+
+    # Binary state protocol. The game sends a handshake message with the magic bytes and the protocol version right after connecting
+    PROTOCOL_MAGIC = b"FTSS"
+    PROTOCOL_VERSION = 1
+    PROTOCOL_HANDSHAKE_STRUCT = struct.Struct("!4sI")
+
+    # Action message with action repeat: the action, the stop conditions (bit flags) and the maximum number of frames for which the game holds the action
+    ACTION_REPEAT_MESSAGE_STRUCT = struct.Struct("!3BBH")
+    ACTION_REPEAT_UNTIL_ACTIONABLE = 1
+    ACTION_REPEAT_MAX_FRAMES = 0xFFFF
 
     class RemoteControlCommand(Enum):
         NONE = 0
@@ -30,12 +58,14 @@ class FootsiesEnv(gym.Env):
         STATE_LOAD = 3
         P2_BOT = 4
         SEED = 5
+        STATE_SAVE_SLOT = 6
+        STATE_LOAD_SLOT = 7
 
     def __init__(
         self,
         frame_delay: int = 0,
         render_mode: str | None = None,
-        game_path: str = "./Build/FOOTSIES",
+        game_path: "str | Sequence[str]" = "./Build/FOOTSIES",
         game_address: str = "localhost",
         game_port: int = 11000,
         skip_instancing: bool = False,
@@ -50,6 +80,18 @@ class FootsiesEnv(gym.Env):
         dense_reward: bool = True,
         log_file: str | None = None,
         log_file_overwrite: bool = False,
+        state_format: str = "json",
+        backend: str = "unity",
+        obs_format: str = "dict",
+        obs_one_hot: bool = False,
+        action_repeat: bool = False,
+        pipelined_opponent: bool = False,
+        opponent_executor: Executor | None = None,
+        instance_pool: "FootsiesInstancePool | None" = None,
+        ephemeral_ports: bool = False,
+        transport: str = "tcp",
+        timing: bool = False,
+        timing_in_info: bool = False,
     ):
         """
         FOOTSIES training environment
@@ -60,8 +102,9 @@ class FootsiesEnv(gym.Env):
             with how many frames of delay should environment states be sent to the agent (meant for human reaction time emulation)
         render_mode: str
             how should the environment be rendered
-        game_path: str
-            path to the FOOTSIES executable. Preferably a fully qualified path
+        game_path: str | Sequence[str]
+            path to the FOOTSIES executable. Preferably a fully qualified path.
+            May also be the command that launches the game, as a sequence of arguments (such as the Python stand-in, `footsies_gym.sim.standin`)
         game_address: str
             address of the FOOTSIES instance
         game_port: int
@@ -94,6 +137,53 @@ class FootsiesEnv(gym.Env):
             path of the log file to which the FOOTSIES instance logs will be written. If `None` logs will be written to the default Unity location
         log_file_overwrite: bool
             whether to overwrite the specified log file if it already exists
+        state_format: str
+            one of "json" or "binary", the encoding of the environment states sent by the game:
+            - "json": human-readable, works with any version of the game
+            - "binary": fixed-layout binary encoding, which is much cheaper to decode. The game and the environment must agree on the protocol version, which is checked on connection
+        backend: str
+            one of "unity" or "python", what runs the battle:
+            - "unity": a FOOTSIES game instance, with which the environment communicates through sockets
+            - "python": an in-process port of the game's battle rules (`footsies_gym.sim`), which produces the same environment states without launching the game.
+            The arguments related to the game instance and its communication are ignored. The in-game bot is replaced by its Python port (`footsies_gym.sim.BattleAI`), and a human opponent is not supported
+        obs_format: str
+            one of "dict" or "array", the format of the observations:
+            - "dict": a dictionary of tuples, with keys "guard", "move", "move_frame" and "position"
+            - "array": a flat float32 array with the same values, in that order and with player 1 first. The same read-only array is returned at every step and is overwritten by the next one, so it should be copied if it needs to be kept.
+            The info keeps the observation in the dictionary format. The wrappers in `footsies_gym.wrappers` only support the dictionary format
+        obs_one_hot: bool
+            whether the guard and move of each player are one-hot encoded in the "array" observation format. The array is then laid out as `gymnasium.spaces.flatten` would lay out the dictionary observation
+        action_repeat: bool
+            whether the game can hold the agent's action for multiple frames on its own, so that `step_n()` only needs one message exchange with the game.
+            Only used by `step_n()` if there is no custom opponent, `frame_delay` is 0 and `by_example` is disabled, otherwise the frames are stepped one by one
+        pipelined_opponent: bool
+            whether to compute the custom opponent's next action in the background, as soon as the observation it's based on is available.
+            The opponent's policy then runs while the agent's own policy does, rather than after the agent's action is sent, and `step()` only waits for it if it's not done yet.
+            The opponent is called with exactly the same observations and infos, in the same order, as without pipelining, and calls of the same environment never overlap.
+            The only exception is that the call made on the most recent observation is discarded if the episode is reset before terminating, the opponent is replaced with `set_opponent()` or the environment is closed.
+            The opponent's policy should be safe to run in another thread alongside the agent's code. The time hidden by pipelining is reported by `opponent_timing()`
+        opponent_executor: Executor
+            the executor on which the pipelined opponent runs, which may be shared between environments (such as a thread pool). If `None`, the environment creates its own thread.
+            Only used if `pipelined_opponent` is enabled
+        instance_pool: FootsiesInstancePool
+            if not `None`, the pool from which a running game instance is leased, rather than launched, and to which it's given back on `close()`, rather than killed.
+            The game's ports are then chosen by the pool, and `skip_instancing`, `log_file` and `log_file_overwrite` are ignored
+        ephemeral_ports: bool
+            whether the game chooses free ports on its own, rather than using `game_port`, `opponent_port` and `remote_control_port`.
+            The game reports the ports back once it's listening on all of them, and only then does the environment connect, so many environments can be launched at the same time without port collisions nor `find_ports()`.
+            Requires a game build that supports the readiness signal. Not supported with `skip_instancing`
+        transport: str
+            one of "tcp", "unix" or "shm", how the environment communicates with the game:
+            - "tcp": TCP sockets on `game_address` and the game's ports. Nagle's algorithm is disabled on both ends, so that the small action messages are sent right away
+            - "unix": Unix domain sockets in a temporary directory, for a game running on the same machine. Cheaper than TCP, and no ports are needed
+            - "shm": like "unix", but the agent's states and actions go through ring buffers in a memory-mapped file (`footsies_gym.envs.shm`), and states are decoded in place.
+            The socket is only used to wake up whichever side is waiting, after spinning for a short while. Requires the "binary" state format, and `by_example` is not supported.
+            With "unix" and "shm", the game's address and ports are ignored. They are not supported with `skip_instancing` nor `ephemeral_ports`, nor on platforms without Unix domain sockets
+        timing: bool
+            whether to time the phases of each `step()`, `step_n()` and `reset()` (sending the actions, running the opponent, waiting for the game, decoding the state, extracting the observation and computing the reward),
+            which are summarized in fixed-size histograms by `timing_stats()` and passed to the hooks added with `add_timing_hook()`. Without timing, the cost on each step is a few attribute checks
+        timing_in_info: bool
+            whether to include the time spent in each phase of the step (or reset) in the info, under the "timing" key. Requires `timing`
 
         WARNING: if the environment has an unexpected error or closes incorrectly, it's possible the game process will still be running in the background. It should be closed manually in that case
         """
@@ -106,8 +196,61 @@ class FootsiesEnv(gym.Env):
             raise ValueError(
                 "custom opponent and human opponent can't be specified together"
             )
+        valid_backends = {"unity", "python"}
+        if backend not in valid_backends:
+            raise ValueError(
+                f"backend '{backend}' is invalid, must be one of {valid_backends}"
+            )
+        if backend == "python" and vs_player:
+            raise ValueError(
+                "human opponents are not supported with the 'python' backend"
+            )
+        valid_state_formats = {"json", "binary"}
+        if state_format not in valid_state_formats:
+            raise ValueError(
+                f"state format '{state_format}' is invalid, must be one of {valid_state_formats}"
+            )
+        valid_obs_formats = {"dict", "array"}
+        if obs_format not in valid_obs_formats:
+            raise ValueError(
+                f"observation format '{obs_format}' is invalid, must be one of {valid_obs_formats}"
+            )
+        if obs_one_hot and obs_format != "array":
+            raise ValueError(
+                "one-hot encoding is only supported with the 'array' observation format"
+            )
+        if opponent_executor is not None and not pipelined_opponent:
+            raise ValueError(
+                "an opponent executor can only be specified with a pipelined opponent"
+            )
+        if ephemeral_ports and skip_instancing:
+            raise ValueError(
+                "the game can only choose its own ports if the environment launches it"
+            )
+        valid_transports = {"tcp", "unix", "shm"}
+        if transport not in valid_transports:
+            raise ValueError(
+                f"transport '{transport}' is invalid, must be one of {valid_transports}"
+            )
+        if transport != "tcp" and not hasattr(socket, "AF_UNIX"):
+            raise ValueError(
+                f"the '{transport}' transport is not supported on this platform"
+            )
+        if transport != "tcp" and (skip_instancing or ephemeral_ports):
+            raise ValueError(
+                f"the '{transport}' transport is only supported if the environment launches the game, and no ports are used"
+            )
+        if transport == "shm" and (state_format != "binary" or by_example):
+            raise ValueError(
+                "the 'shm' transport requires the 'binary' state format, and doesn't support `by_example`"
+            )
+        if timing_in_info and not timing:
+            raise ValueError(
+                "the timing can only be included in the info if timing is enabled"
+            )
 
-        self.game_path = game_path
+        # Kept hashable, since the launch arguments identify the game instances of the instance pool
+        self.game_path = game_path if isinstance(game_path, str) else tuple(game_path)
         self.game_address = game_address
         self.game_port = game_port
         self.skip_instancing = skip_instancing
@@ -122,6 +265,34 @@ class FootsiesEnv(gym.Env):
         self.dense_reward = dense_reward
         self.log_file = log_file
         self.log_file_overwrite = log_file_overwrite
+        self.state_format = state_format
+        self.backend = backend
+        self.obs_format = obs_format
+        self.obs_one_hot = obs_one_hot
+        self.action_repeat = action_repeat
+        self.pipelined_opponent = pipelined_opponent
+        self.instance_pool = instance_pool
+        self.ephemeral_ports = ephemeral_ports
+        self.transport = transport
+        self.timing_in_info = timing_in_info
+
+        # The opponent's next action when pipelined, which is being computed in the background
+        self._own_opponent_executor = pipelined_opponent and opponent_executor is None
+        self._opponent_executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="footsies-opponent")
+            if self._own_opponent_executor
+            else opponent_executor
+        )
+        self._opponent_future: Future | None = None
+        # Time spent running the opponent's policy, and time that the environment spent waiting for it, in seconds.
+        # Pipelined calls whose actions were discarded are accounted separately
+        self._opponent_calls = 0
+        self._opponent_policy_time = 0.0
+        self._opponent_wait_time = 0.0
+        self._opponent_discarded_calls = 0
+        self._opponent_discarded_time = 0.0
+        # Timer of the phases of each step and reset, if timing is enabled
+        self._timer: StepTimer | None = StepTimer() if timing else None
 
         # Create a queue containing the last `frame_delay` frames so that we can send delayed frames to the agent
         # The actual capacity has one extra space to accomodate for the case that `frame_delay` is 0, so that
@@ -133,21 +304,48 @@ class FootsiesEnv(gym.Env):
         assert render_mode is None or render_mode in self.metadata["render_modes"]
         self.render_mode = render_mode
 
-        self.comm = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.comm.settimeout(self.COMM_TIMEOUT)
-        self.remote_control_comm = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.remote_control_comm.settimeout(self.COMM_TIMEOUT)
         self._connected = False
         self._game_instance = None
-
-        self.opponent_comm = (
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            if self.opponent is not None
-            else None
-        )
-        if self.opponent_comm is not None:
-            self.opponent_comm.settimeout(self.COMM_TIMEOUT)
         self._opponent_connected = False
+        # The game instance leased from the instance pool, and the first state of the episode it started, which the environment didn't receive yet
+        self._leased_instance = None
+        self._pending_first_state: FootsiesState | None = None
+        # Socket on which the game signals that it's ready, when it chooses its own ports
+        self._ready_listener: socket.socket | None = None
+        # Time spent in each phase of starting up the game, and when the most recent phase ended
+        self._startup_timing: Dict[str, float] = {}
+        self._startup_mark: float | None = None
+        # Directory of the game's Unix domain sockets (and shared memory file), with the "unix" and "shm" transports
+        self._unix_socket_dir: str | None = None
+
+        if self.backend == "python":
+            # The battle is simulated in-process, so there is no game to communicate with
+            self._battle = FootsiesBattle()
+            # Python ports of the in-game bot, playing whenever the game's bot would
+            self._p1_bot = BattleAI(is_player1=True) if self.by_example else None
+            self._p2_bot = BattleAI(is_player1=False)
+            # Battle states saved in slots, as the game keeps them
+            self._battle_state_slots: Dict[int, FootsiesBattleState] = {}
+            self.comm = None
+            self.remote_control_comm = None
+            self.opponent_comm = None
+            self._comm_reader = None
+            self._remote_control_reader = None
+        else:
+            self._battle = None
+            self._p1_bot = None
+            self._p2_bot = None
+            self.comm = self._create_socket()
+            self.remote_control_comm = self._create_socket()
+            # Receive buffers, reused for every message
+            self._comm_reader = BufferedMessageReader(self.comm)
+            self._remote_control_reader = BufferedMessageReader(self.remote_control_comm)
+
+            self.opponent_comm = (
+                self._create_socket()
+                if self.opponent is not None
+                else None
+            )
 
         # Don't consider the end-of-round moves
         relevant_moves = set(FootsiesMove) - {FootsiesMove.WIN, FootsiesMove.DEAD}
@@ -167,6 +365,9 @@ class FootsiesEnv(gym.Env):
             }
         )
 
+        if self.obs_format == "array":
+            self._setup_observation_array(len(relevant_moves), maximum_move_duration)
+
         # 3 actions, which can be combined: left, right, attack
         self.action_space = spaces.MultiBinary(3)
 
@@ -177,6 +378,9 @@ class FootsiesEnv(gym.Env):
         # Useful to differentiate between the previous and current environment state
         self._current_state = None
 
+        # The environment state of each battle state that the game keeps in a slot, to continue from when it's loaded
+        self._battle_state_slot_states: Dict[int, FootsiesState] = {}
+
         # The latest observation and info that the agent saw
         # Required in order to communicate to the opponent the same observation and info
         self._most_recent_observation = None
@@ -190,179 +394,342 @@ class FootsiesEnv(gym.Env):
         # Necessary when calling reset() when it isn't finished, which will require a hard reset
         self.has_terminated = True
 
+        if self.instance_pool is not None:
+            self.instance_pool._check_supported(self)
+
+    def _create_socket(self) -> socket.socket:
+        """Create a socket for one of the channels with the game, according to the transport"""
+        if self.transport != "tcp":
+            sckt = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sckt = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # Actions are only a few bytes, so they should be sent right away rather than coalesced (Nagle's algorithm)
+            sckt.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sckt.settimeout(self.COMM_TIMEOUT)
+        return sckt
+
+    def _channel_address(self, channel: str) -> "tuple[str, int] | str":
+        """The address of one of the game's channels ("p1", "p2" or "remote_control"), as given to `socket.connect()`"""
+        if self.transport != "tcp":
+            return path.join(self._unix_socket_dir, f"{channel}.sock")
+
+        port = {"p1": self.game_port, "p2": self.opponent_port, "remote_control": self.remote_control_port}[channel]
+        return (self.game_address, port)
+
+    def _channel_arguments(self, channel: str) -> List[str]:
+        """The game's command-line arguments that specify where it listens for one of the channels ("p1", "p2" or "remote_control")"""
+        option = channel.replace("_", "-")
+        if self.transport == "shm" and channel == "p1":
+            return [f"--{option}-unix-path", self._channel_address(channel), f"--{option}-shm-path", self._shared_memory_path()]
+        if self.transport != "tcp":
+            return [f"--{option}-unix-path", self._channel_address(channel)]
+
+        _, port = self._channel_address(channel)
+        return [f"--{option}-address", self.game_address, f"--{option}-port", str(port)]
+
+    def _shared_memory_path(self) -> str:
+        """Path of the memory-mapped file through which the agent's states and actions go, with the "shm" transport"""
+        return path.join(self._unix_socket_dir, "p1.shm")
+
     def _instantiate_game(self):
         """
         Start the FOOTSIES process in the background, with the specified render mode.
-        No-op if already instantiated or instantiation is skipped
+        No-op if already instantiated or instantiation is skipped, or if the battle is simulated in-process.
+        If there is an instance pool, the game instance is leased from it instead, already connected
         """
+        if self.backend == "python":
+            return
+
+        if self.instance_pool is not None:
+            if self._leased_instance is None:
+                self.instance_pool._lease(self)
+            return
+
         if self.skip_instancing:
             return
         
         if self._game_instance is None:
-            args = [
-                self.game_path,
-                "--mute",
-                "--training",
-                "--p1-address",
-                self.game_address,
-                "--p1-port",
-                str(self.game_port),
-                "--remote-control-address",
-                self.game_address,
-                "--remote-control-port",
-                str(self.remote_control_port),
-                "-force-gfx-direct", # force single threaded rendering
-            ]
-            if self.render_mode is None:
-                args.extend(["-batchmode", "-nographics"])
-            if self.fast_forward:
-                args.extend([
-                    "--fast-forward",
-                    "--fast-forward-speed",
-                    str(self.fast_forward_speed),
-                ])
-            
-            if self.sync_mode == "synced_non_blocking":
-                args.append("--synced-non-blocking")
-            elif self.sync_mode == "synced_blocking":
-                args.append("--synced-blocking")
-
-            if self.by_example:
-                args.append("--p1-bot")
-                args.append("--p1-spectator")
-            
-            if self.vs_player:
-                args.append("--p2-player")
-            elif self.opponent is None:
-                args.append("--p2-bot")
-            else:
-                args.extend(
-                    [
-                        "--p2-address",
-                        self.game_address,
-                        "--p2-port",
-                        str(self.opponent_port),
-                        "--p2-no-state",
-                    ]
-                )
-            if self.log_file is not None:
-                if not self.log_file_overwrite and path.exists(self.log_file):
-                    raise FileExistsError(
-                        f"the log file '{self.log_file}' already exists and the environment was set to not overwrite it"
-                    )
-                args.extend(["-logFile", self.log_file])
-            else:
-                args.append("-nolog")
+            self._startup_mark = perf_counter()
+            if self.ephemeral_ports:
+                # The actual ports are only known once the game signals that it's ready
+                self.game_port = self.opponent_port = self.remote_control_port = 0
+                self._ready_listener = socket.create_server((self.game_address, 0))
+            if self.transport != "tcp" and self._unix_socket_dir is None:
+                self._unix_socket_dir = tempfile.mkdtemp(prefix="footsies-")
+            if self.transport == "shm":
+                SharedMemoryChannel.create(self._shared_memory_path())
+
+            args = self._game_arguments()
 
             self._game_instance = subprocess.Popen(
                 args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
             )
+            self._record_startup_phase("launch")
+
+    def _game_arguments(self) -> List[str]:
+        """The command with which the game is launched, including its command-line arguments"""
+        args = [
+            *((self.game_path,) if isinstance(self.game_path, str) else self.game_path),
+            "--mute",
+            "--training",
+            *self._channel_arguments("p1"),
+            *self._channel_arguments("remote_control"),
+            "-force-gfx-direct", # force single threaded rendering
+        ]
+        if self.render_mode is None:
+            args.extend(["-batchmode", "-nographics"])
+        if self.fast_forward:
+            args.extend([
+                "--fast-forward",
+                "--fast-forward-speed",
+                str(self.fast_forward_speed),
+            ])
+        
+        if self.state_format == "binary":
+            args.append("--binary-state")
 
-    def _socket_connect(self, sckt: socket.socket, address: tuple, retry_delay: float = 0.5):
-        connected = False
-        while not connected:
-            try:
-                sckt.connect(address)
-                connected = True
+        if self.action_repeat and not self.by_example:
+            args.append("--action-repeat")
 
-            except (ConnectionRefusedError, ConnectionAbortedError):
-                sleep(
-                    retry_delay
-                )  # avoid constantly pestering the game for a connection
-                continue
+        if self.sync_mode == "synced_non_blocking":
+            args.append("--synced-non-blocking")
+        elif self.sync_mode == "synced_blocking":
+            args.append("--synced-blocking")
+
+        if self.by_example:
+            args.append("--p1-bot")
+            args.append("--p1-spectator")
+        
+        if self.vs_player:
+            args.append("--p2-player")
+        elif self.opponent is None:
+            args.append("--p2-bot")
+        else:
+            args.extend(self._channel_arguments("p2"))
+            args.append("--p2-no-state")
+        if self._ready_listener is not None:
+            args.extend(
+                [
+                    "--ready-address",
+                    self.game_address,
+                    "--ready-port",
+                    str(self._ready_listener.getsockname()[1]),
+                ]
+            )
+        if self.log_file is not None:
+            if not self.log_file_overwrite and path.exists(self.log_file):
+                raise FileExistsError(
+                    f"the log file '{self.log_file}' already exists and the environment was set to not overwrite it"
+                )
+            args.extend(["-logFile", self.log_file])
+        else:
+            args.append("-nolog")
+
+        return args
+
+    def _record_startup_phase(self, phase: str):
+        """Account the time since the previous startup phase ended to `phase`"""
+        now = perf_counter()
+        if self._startup_mark is not None:
+            self._startup_timing[phase] = self._startup_timing.get(phase, 0.0) + now - self._startup_mark
+        self._startup_mark = now
+
+    def _wait_for_ready(self):
+        """
+        Wait for the game to signal that it's listening for the environment's connections, and take the ports it's listening on.
+        No-op if the game doesn't choose its own ports, or if it has already signaled
+        """
+        if self._ready_listener is None:
+            return
+
+        listener, self._ready_listener = self._ready_listener, None
+        with listener:
+            # Poll so that we notice if the game closes before signaling
+            listener.settimeout(0.5)
+            deadline = monotonic() + self.STARTUP_TIMEOUT
+            while True:
+                try:
+                    ready_comm, _ = listener.accept()
+                    break
+
+                except TimeoutError:
+                    if self._game_instance.poll() is not None:
+                        raise FootsiesGameClosedError("game has closed before signaling that it's ready")
+                    if monotonic() > deadline:
+                        raise FootsiesGameClosedError("game took too long to signal that it's ready, will assume it's closed")
+
+        with ready_comm:
+            ready_comm.settimeout(self.COMM_TIMEOUT)
+            ports = json.loads(str(BufferedMessageReader(ready_comm).recv_message(), "utf-8"))
+
+        self.game_port = ports["p1Port"]
+        self.remote_control_port = ports["remoteControlPort"]
+        if ports["p2Port"] >= 0:
+            self.opponent_port = ports["p2Port"]
+
+        self._record_startup_phase("ready")
 
     def _connect_to_game(self, retry_delay: float = 0.5):
         """
-        Connect to the FOOTSIES instance specified by the environment's address and port.
-        If the connection is refused, wait `retry_delay` seconds before trying again.
+        Connect to the FOOTSIES instance specified by the environment's address and port, establishing all channels at the same time.
+        If the connection is refused, try again with exponential backoff, waiting at most `retry_delay` seconds between attempts.
         No-op if already connected.
 
         If an opponent was supplied, then try establishing a connection for the opponent as well.
         """
+        if self.backend == "python":
+            return
+
+        self._wait_for_ready()
+
+        connections = []
         if not self._connected:
-            self._socket_connect(self.comm, (self.game_address, self.game_port), retry_delay)
-            self._socket_connect(self.remote_control_comm, (self.game_address, self.remote_control_port), retry_delay)
+            connections.append((self.comm, self._channel_address("p1")))
+            connections.append((self.remote_control_comm, self._channel_address("remote_control")))
+        if self.opponent is not None and not self._opponent_connected:
+            connections.append((self.opponent_comm, self._channel_address("p2")))
+
+        if not connections:
+            return
+
+        if self._startup_mark is None:
+            # The game wasn't launched by the environment
+            self._startup_mark = perf_counter()
+        connect_all(connections, max_retry_delay=retry_delay)
+        if not self._connected and self.transport == "shm":
+            # States are received (and actions sent) through shared memory, the socket only wakes up the other side
+            self._comm_reader = SharedMemoryChannel(self._shared_memory_path(), self.comm, timeout=self.COMM_TIMEOUT)
+        self._record_startup_phase("connect")
+
+        if not self._connected:
+            if self.state_format == "binary":
+                self._check_protocol_handshake()
+                self._record_startup_phase("handshake")
             self._connected = True
 
         if self.opponent is not None:
-            if not self._opponent_connected:
-                self._socket_connect(self.opponent_comm, (self.game_address, self.opponent_port), retry_delay)
-                self._opponent_connected = True
+            self._opponent_connected = True
 
-    def _game_recv_bytes(self, sckt: socket.socket, size: int) -> bytes:
-        """Receive a message of the given size from the FOOTSIES instance. Raises `FootsiesGameClosedError` if a problem occurred"""
-        try:
-            res = bytes()
-            while len(res) < size:
-                inc = sckt.recv(size - len(res))
-                # The communication is assumed to work correctly, so if a message wasn't received then the game must have closed
-                if len(inc) == 0:
-                    raise FootsiesGameClosedError("game has closed")
-                res += inc
+    def _game_recv_message(self, reader: BufferedMessageReader) -> memoryview:
+        """Receive a message from the FOOTSIES instance through the given reader. The message is only valid until the next one is received. Raises `FootsiesGameClosedError` if a problem occurred"""
+        return reader.recv_message()
 
-        except TimeoutError:
-            raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+    def _game_recv_text_message(self, reader: BufferedMessageReader) -> str:
+        """Receive an UTF-8 message from the FOOTSIES instance through the given reader"""
+        return str(self._game_recv_message(reader), "utf-8")
 
-        return res
+    def _check_protocol_handshake(self):
+        """Receive the binary protocol handshake from the FOOTSIES instance, and make sure both sides use the same protocol version. Raises `FootsiesProtocolError` otherwise"""
+        self._check_protocol_handshake_message(self._game_recv_message(self._comm_reader))
 
-    def _game_recv_message(self, sckt: socket.socket) -> str:
-        """Receive an UTF-8 message from the given socket"""
-        message_size_bytes = self._game_recv_bytes(sckt, self.STATE_MESSAGE_SIZE_BYTES)
-        message_size = struct.unpack("!I", message_size_bytes)[0]
+    def _check_protocol_handshake_message(self, message):
+        """Make sure the binary protocol handshake message was sent by a game that uses the same protocol version. Raises `FootsiesProtocolError` otherwise"""
+        message_size = len(message)
+        if message_size != self.PROTOCOL_HANDSHAKE_STRUCT.size:
+            raise FootsiesProtocolError(f"unexpected protocol handshake of {message_size} bytes (expected {self.PROTOCOL_HANDSHAKE_STRUCT.size}), is the game build too old to support the binary state format?")
 
-        return self._game_recv_bytes(sckt, message_size).decode("utf-8")
+        magic, version = self.PROTOCOL_HANDSHAKE_STRUCT.unpack(message)
+        if magic != self.PROTOCOL_MAGIC:
+            raise FootsiesProtocolError(f"invalid protocol handshake (magic bytes {magic!r}, expected {self.PROTOCOL_MAGIC!r})")
+        if version != self.PROTOCOL_VERSION:
+            raise FootsiesProtocolError(f"the game uses protocol version {version}, but the environment expects version {self.PROTOCOL_VERSION}")
 
     def _receive_and_update_state(self) -> FootsiesState:
         """Receive the environment state from the FOOTSIES instance"""
-        state_json = self._game_recv_message(self.comm)
+        if self.backend == "python":
+            self._current_state = self._battle.advance()
+            if self._timer is not None:
+                self._timer.mark("receive")
+            return self._current_state
+
+        message = self._game_recv_message(self._comm_reader)
+        if self._timer is not None:
+            self._timer.mark("receive")
+        self._current_state = self._decode_state(message)
+        if self._timer is not None:
+            self._timer.mark("decode")
+        return self._current_state
 
-        self._current_state = FootsiesState(**json.loads(state_json))
+    def _decode_state(self, message) -> FootsiesState:
+        """Decode an environment state message sent by the FOOTSIES instance, according to the state format"""
+        if self.state_format == "binary":
+            if len(message) != FOOTSIES_STATE_STRUCT.size:
+                raise FootsiesProtocolError(f"received binary state of {len(message)} bytes, expected {FOOTSIES_STATE_STRUCT.size}")
+            return FootsiesState.from_bytes(message)
 
-        return self._current_state
+        return FootsiesState(**json.loads(str(message, "utf-8")))
+
+    def _action_message(self, action: "tuple[bool, bool, bool]", is_opponent: bool = False, frames: int = 1, stop_conditions: int = 0) -> bytes:
+        """The message of an action, held for up to `frames` frames with the given stop conditions if the game holds the agent's actions"""
+        if self.action_repeat and not is_opponent:
+            return self.ACTION_REPEAT_MESSAGE_STRUCT.pack(*(bool(a) for a in action), stop_conditions, frames)
+        return bytes(bytearray(action))
 
     def _send_action(
-        self, action: "tuple[bool, bool, bool]", is_opponent: bool = False
+        self, action: "tuple[bool, bool, bool]", is_opponent: bool = False, frames: int = 1, stop_conditions: int = 0
     ):
-        """Send an action to the FOOTSIES instance"""
-        action_message = bytearray(action)
+        """Send an action to the FOOTSIES instance. Only the agent's action may be held for multiple frames, and only if `action_repeat` is enabled"""
+        if self.backend == "python":
+            if is_opponent:
+                self._battle.p2_input = action_to_input(action)
+            else:
+                self._battle.p1_input = action_to_input(action)
+            return
+
+        action_message = self._action_message(action, is_opponent, frames, stop_conditions)
         try:
             if is_opponent:
                 self.opponent_comm.sendall(action_message)
+            elif self.transport == "shm":
+                self._comm_reader.send(action_message)
             else:
                 self.comm.sendall(action_message)
         except OSError:
             raise FootsiesGameClosedError
 
+    def _setup_observation_array(self, num_moves: int, maximum_move_duration: int):
+        """Replace the observation space with its flat array version, and preallocate the array to which observations are written"""
+        if self.obs_one_hot:
+            # Offsets of the one-hot encodings of the guard and move of each player, in the same layout as `spaces.flatten`
+            self._one_hot_offsets = np.array([0, 4, 8, 8 + num_moves])
+            low = np.concatenate([np.zeros(8 + 2 * num_moves), [0.0, 0.0, -4.6, -4.6]])
+            high = np.concatenate([np.ones(8 + 2 * num_moves), [maximum_move_duration] * 2 + [4.6, 4.6]])
+        else:
+            self._one_hot_offsets = None
+            low = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -4.6, -4.6])
+            high = np.array([3.0, 3.0, num_moves - 1, num_moves - 1, maximum_move_duration, maximum_move_duration, 4.6, 4.6])
+
+        self.observation_space = spaces.Box(low=low.astype(np.float32), high=high.astype(np.float32), dtype=np.float32)
+
+        self._observation_array = np.zeros(self.observation_space.shape, dtype=np.float32)
+        # The agent is given a read-only view, so that it can't modify the observation seen by the opponent
+        self._observation_array_view = self._observation_array.view()
+        self._observation_array_view.flags.writeable = False
+
+    def _write_obs_array(self, obs: dict) -> np.ndarray:
+        """Write the dictionary observation into the preallocated observation array, returning a view of it"""
+        array = self._observation_array
+        if self._one_hot_offsets is not None:
+            array[:-4] = 0.0
+            array[self._one_hot_offsets + (*obs["guard"], *obs["move"])] = 1.0
+            array[-4:] = (*obs["move_frame"], *obs["position"])
+        else:
+            array[:] = (*obs["guard"], *obs["move"], *obs["move_frame"], *obs["position"])
+
+        return self._observation_array_view
+
     def _extract_obs(self, state: FootsiesState) -> dict:
         """Extract the relevant observation data from the environment state"""
+        p1_move = _OBSERVED_MOVE_ID_TO_INDEX[state.p1Move]
+        p2_move = _OBSERVED_MOVE_ID_TO_INDEX[state.p2Move]
+
         # Simplify the number of frames since the start of the move for moves that last indefinitely
-        p1_move_frame_simple = (
-            0
-            if state.p1Move
-            in {
-                FootsiesMove.STAND.value.id,
-                FootsiesMove.FORWARD.value.id,
-                FootsiesMove.BACKWARD.value.id,
-            }
-            else state.p1MoveFrame
-        )
-        p2_move_frame_simple = (
-            0
-            if state.p2Move
-            in {
-                FootsiesMove.STAND.value.id,
-                FootsiesMove.FORWARD.value.id,
-                FootsiesMove.BACKWARD.value.id,
-            }
-            else state.p2MoveFrame
-        )
+        p1_move_frame_simple = 0 if FOOTSIES_MOVE_INDEFINITE[p1_move] else state.p1MoveFrame
+        p2_move_frame_simple = 0 if FOOTSIES_MOVE_INDEFINITE[p2_move] else state.p2MoveFrame
 
         return {
             "guard": (state.p1Guard, state.p2Guard),
-            "move": (
-                FOOTSIES_MOVE_ID_TO_INDEX[state.p1Move],
-                FOOTSIES_MOVE_ID_TO_INDEX[state.p2Move],
-            ),
+            "move": (p1_move, p2_move),
             "move_frame": (p1_move_frame_simple, p2_move_frame_simple),
             "position": (state.p1Position, state.p2Position),
         }
@@ -412,36 +779,102 @@ class FootsiesEnv(gym.Env):
         since the game will be most of the time waiting for the agent to send an action rather
         than waiting for a command.
         """
+        if self.backend == "python":
+            return self._simulated_remote_control_command(command, value)
+
         if self.sync_mode == "synced_blocking":
             raise RuntimeError("remote control is not supported in 'synced_blocking' mode")
             
         if command == self.RemoteControlCommand.NONE:
             return
-        
+
+        self.remote_control_comm.sendall(self._remote_control_message(command, value))
+
+        if command == self.RemoteControlCommand.STATE_SAVE:
+            battle_state_json = self._game_recv_text_message(self._remote_control_reader)
+            return FootsiesBattleState.from_json(battle_state_json)
+
+    def _simulated_remote_control_command(self, command: RemoteControlCommand, value: str = "") -> "any":
+        """Carry out a remote control command on the in-process battle, as the game would"""
+        if command == self.RemoteControlCommand.RESET:
+            self._battle.reset()
+
+        elif command == self.RemoteControlCommand.STATE_SAVE:
+            return self._battle.save_state()
+
+        elif command == self.RemoteControlCommand.STATE_LOAD:
+            self._battle.load_state(FootsiesBattleState.from_json(value))
+
+        elif command == self.RemoteControlCommand.STATE_SAVE_SLOT:
+            self._battle_state_slots[int(value)] = self._battle.save_state()
+
+        elif command == self.RemoteControlCommand.STATE_LOAD_SLOT:
+            # Like the game, ignore slots in which nothing was saved
+            if int(value) in self._battle_state_slots:
+                self._battle.load_state(self._battle_state_slots[int(value)])
+
+        elif command == self.RemoteControlCommand.SEED:
+            self._p2_bot.seed(int(value))
+            if self._p1_bot is not None:
+                # Different random numbers for each bot, or else they would mirror each other
+                self._p1_bot.seed([int(value), 1])
+
+        # Whether player 2 is the bot is decided when sending the actions, so the P2_BOT command has no effect
+
+    def _remote_control_message(self, command: RemoteControlCommand, value: str = "") -> bytes:
+        """Build the message of a remote control command, prefixed with its size"""
         message = {"command": command.value, "value": value}
         message_json = json.dumps(message).encode("utf-8")
         
         size_suffix = struct.pack("!I", len(message_json))
 
-        self.remote_control_comm.sendall(size_suffix + message_json)
-
-        if command == self.RemoteControlCommand.STATE_SAVE:
-            battle_state_json = self._game_recv_message(self.remote_control_comm)
-            return FootsiesBattleState.from_json(battle_state_json)
+        return size_suffix + message_json
 
-    def save_battle_state(self) -> FootsiesBattleState:
-        """Save the current game state"""
+    def save_battle_state(self, slot: int | None = None) -> "FootsiesBattleState | int":
+        """
+        Save the current game state. If `slot` is `None`, the whole state is sent by the game and returned.
+        Otherwise, the game keeps the state in that slot (replacing any state saved there before) without sending it, and the slot is returned as the state's handle
+        """
         self._instantiate_game()
         self._connect_to_game()
-    
-        return self._remote_control_send_command(self.RemoteControlCommand.STATE_SAVE)
 
-    def load_battle_state(self, battle_state: FootsiesBattleState):
-        """Make the game load a specific battle state"""
-        self._instantiate_game()
-        self._connect_to_game()
-    
-        self._remote_control_send_command(self.RemoteControlCommand.STATE_LOAD, battle_state.json())
+        if slot is None:
+            return self._remote_control_send_command(self.RemoteControlCommand.STATE_SAVE)
+
+        self._remote_control_send_command(self.RemoteControlCommand.STATE_SAVE_SLOT, str(int(slot)))
+        self._battle_state_slot_states[int(slot)] = self._current_state
+        return slot
+
+    def load_battle_state(self, battle_state: FootsiesBattleState | None = None, *, slot: int | None = None) -> "tuple[dict, dict]":
+        """
+        Make the game load a specific battle state, either given in full or kept in the game's `slot` by `save_battle_state(slot=...)`, in which case nothing but the slot is sent.
+        The episode continues from the loaded state, whose observation and info are returned, and the episode's dense reward is accounted from it.
+        If the episode has terminated, a new one is started first, since battle states can only be loaded in the middle of a round
+        """
+        if (battle_state is None) == (slot is None):
+            raise ValueError("exactly one of the battle state or the slot should be specified")
+        if slot is not None and int(slot) not in self._battle_state_slot_states:
+            raise ValueError(f"no battle state was saved in slot {slot}")
+
+        if self.has_terminated:
+            self._request_episode_start()
+            self._receive_episode_start()
+
+        if slot is None:
+            self._remote_control_send_command(self.RemoteControlCommand.STATE_LOAD, battle_state.json())
+            state = FootsiesState.from_battle_state(battle_state)
+        else:
+            self._remote_control_send_command(self.RemoteControlCommand.STATE_LOAD_SLOT, str(int(slot)))
+            state = self._battle_state_slot_states[int(slot)]
+
+        return self._continue_from_state(state)
+
+    def _continue_from_state(self, state: FootsiesState) -> "tuple[dict, dict]":
+        """Continue the episode from the given environment state, such as that of a battle state that was just loaded, returning its observation and info"""
+        self._current_state = state
+        self.delayed_frame_queue.clear()
+        self._cummulative_episode_reward = 0.0
+        return self._start_episode(state)
 
     def _request_reset(self):
         """Request an environment reset"""
@@ -466,14 +899,15 @@ class FootsiesEnv(gym.Env):
         self._connect_to_game()
 
         # TODO: maybe try making this not a requirement
-        if self.opponent_comm is None:
+        if self.backend == "unity" and self.opponent_comm is None:
             raise RuntimeError("the environment needs to be created with a custom opponent before calling this method")
 
         require_request = (opponent is not None and self.opponent is None) or (
             opponent is None and self.opponent is not None
         )
 
-        # Update the internal custom opponent policy
+        # Update the internal custom opponent policy. The next action of the previous opponent, if being computed, is no longer needed
+        self._discard_opponent_action()
         self.opponent = opponent
 
         if require_request:
@@ -481,6 +915,20 @@ class FootsiesEnv(gym.Env):
 
     def reset(self, *, seed: int = None, options: dict = None) -> "tuple[dict, dict]":
         super().reset(seed=seed)
+        if self._timer is None or not self._timer.begin("reset"):
+            self._request_episode_start(seed)
+            return self._receive_episode_start()
+
+        try:
+            self._request_episode_start(seed)
+            self._timer.mark("request")
+            return self._finish_timing(self._receive_episode_start())
+        except BaseException:
+            self._timer.cancel()
+            raise
+
+    def _request_episode_start(self, seed: int = None):
+        """First half of `reset()`: make sure the game is running and request a new episode, without waiting for it"""
         self._instantiate_game()
         self._connect_to_game()
 
@@ -493,10 +941,26 @@ class FootsiesEnv(gym.Env):
         self.delayed_frame_queue.clear()
         self._cummulative_episode_reward = 0.0
 
+    def _receive_episode_start(self) -> "tuple[dict, dict]":
+        """Second half of `reset()`: wait for the first state of the new episode"""
+        if self._pending_first_state is not None:
+            # Already received when the game instance was leased
+            first_state, self._pending_first_state = self._pending_first_state, None
+            self._current_state = first_state
+            return self._start_episode(first_state)
+
         first_state = self._receive_and_update_state()
         # Guarantee it's the first environment state
         while first_state.globalFrame != -1:
             first_state = self._receive_and_update_state()
+
+        if "connect" in self._startup_timing and "first_state" not in self._startup_timing:
+            self._record_startup_phase("first_state")
+
+        return self._start_episode(first_state)
+
+    def _start_episode(self, first_state: FootsiesState) -> "tuple[dict, dict]":
+        """Set up the new episode from its first state, returning the initial observation and info"""
         # We leave a space at the end of the queue since insertion of the most recent state happens before popping the oldest state.
         # This is done so that the case when `frame_delay` is 0 is correctly handled
         while len(self.delayed_frame_queue) < self.delayed_frame_queue.maxlen - 1:
@@ -509,48 +973,166 @@ class FootsiesEnv(gym.Env):
 
         obs = self._extract_obs(first_state)
         info = self._extract_info(first_state, obs)
-        # Create a copy of this observation (make sure it's not edited because 'obs' was changed afterwards, which may happen with wrappers)
-        self._most_recent_observation = obs.copy()
-        self._most_recent_info = info.copy()
+        obs = self._keep_most_recent(obs, info)
+        if self._timer is not None:
+            self._timer.mark("observation")
+        self._start_opponent_action()
         return obs, info
 
+    def _keep_most_recent(self, obs: dict, info: dict) -> "dict | np.ndarray":
+        """Keep the observation and info that the agent is about to see, returning the observation in the configured format"""
+        # A pipelined opponent call that is still running may be reading the previous observation, which is about to be overwritten in the "array" format
+        self._discard_opponent_action()
+        # Create a copy of this info (make sure it's not edited because 'info' was changed afterwards, which may happen with wrappers)
+        self._most_recent_info = info.copy()
+        if self.obs_format == "array":
+            # The array view is read-only, so there is no need for a copy
+            obs = self._write_obs_array(obs)
+            self._most_recent_observation = obs
+        else:
+            self._most_recent_observation = obs.copy()
+
+        return obs
+
     # Step already assumes that the queue of delayed frames is full from reset()
     def step(
         self, action: "tuple[bool, bool, bool]"
     ) -> "tuple[dict, float, bool, bool, dict]":
-        # Send action
+        if self._timer is None or not self._timer.begin("step"):
+            self._send_step_actions(action)
+            return self._receive_step()
+
+        try:
+            self._send_step_actions(action)
+            return self._finish_timing(self._receive_step())
+        except BaseException:
+            self._timer.cancel()
+            raise
+
+    def _finish_timing(self, result: tuple) -> tuple:
+        """Finish timing the step or reset whose result is given, whose info is the last element"""
+        durations = self._timer.finish()
+        if self.timing_in_info:
+            result[-1]["timing"] = durations
+        return result
+
+    def step_n(
+        self, action: "tuple[bool, bool, bool]", n: int, until_actionable: bool = False
+    ) -> "tuple[dict, float, bool, bool, dict]":
+        """
+        Hold `action` for up to `n` frames, as `n` calls to `step()` would. Only the observation and info of the last frame are returned,
+        along with the sum of the rewards of all frames.
+
+        Holding the action stops early when the episode terminates, when the guard of either player is damaged,
+        or, if `until_actionable`, when player 1 is able to act again (not in the middle of a move that hasn't hit the opponent, nor being hit).
+        With `action_repeat`, the game holds the action itself and only sends the last environment state,
+        which saves one message exchange per frame during long moves
+        """
+        if n < 1:
+            raise ValueError(f"the number of frames must be positive, got {n}")
+
+        if self._game_holds_actions():
+            # Only timed as a whole if the game holds the action, otherwise each step is timed on its own
+            timed = self._timer is not None and self._timer.begin("step_n")
+            try:
+                stop_conditions = self.ACTION_REPEAT_UNTIL_ACTIONABLE if until_actionable else 0
+                reward = 0.0
+                terminated = truncated = False
+                # Actions that are held for too long have to be split into multiple messages
+                while n > 0 and not (terminated or truncated):
+                    frames = min(n, self.ACTION_REPEAT_MAX_FRAMES)
+                    self._send_action(action, is_opponent=False, frames=frames, stop_conditions=stop_conditions)
+                    if timed:
+                        self._timer.mark("send")
+                    frame_before = self._current_state.globalFrame
+                    obs, step_reward, terminated, truncated, info = self._receive_step()
+                    reward += step_reward
+                    # The game stopped holding the action early
+                    if self._current_state.globalFrame - frame_before < frames:
+                        break
+                    n -= frames
+            except BaseException:
+                if timed:
+                    self._timer.cancel()
+                raise
+
+            if timed:
+                return self._finish_timing((obs, reward, terminated, truncated, info))
+            return obs, reward, terminated, truncated, info
+
+        reward = 0.0
+        guard = self._most_recent_info["guard"]
+        for _ in range(n):
+            obs, step_reward, terminated, truncated, info = self.step(action)
+            reward += step_reward
+            if (
+                terminated
+                or truncated
+                or info["guard"][0] < guard[0]
+                or info["guard"][1] < guard[1]
+                or (until_actionable and is_p1_actionable(info["move"], info["move_frame"]))
+            ):
+                break
+
+        return obs, reward, terminated, truncated, info
+
+    def _game_holds_actions(self) -> bool:
+        """Whether the game can hold the agent's action for multiple frames without sending the environment states in between"""
+        return (
+            self.action_repeat
+            and self.backend == "unity"
+            and self.opponent is None
+            and not self.by_example
+            and self.delayed_frame_queue.maxlen == 1
+        )
+
+    def _send_step_actions(self, action: "tuple[bool, bool, bool]", opponent_action: "tuple[bool, bool, bool] | None" = None):
+        """
+        First half of `step()`: send the agent's and the opponent's actions, without waiting for the game to respond.
+        The opponent's action may be given directly, in which case the custom opponent policy is not called
+        """
         if not self.by_example:
             self._send_action(action, is_opponent=False)
+        elif self.backend == "python":
+            # The bots see the battle as it is, without frame delay
+            self._battle.p1_input = int(self._p1_bot.get_state_inputs([self._current_state])[0])
+        if self._timer is not None:
+            self._timer.mark("send")
 
-        if self.opponent is not None:
-            opponent_action = self.opponent(self._most_recent_observation, self._most_recent_info)
+        if opponent_action is not None:
             self._send_action(opponent_action, is_opponent=True)
-
+        elif self.opponent is not None:
+            opponent_action = self._opponent_action()
+            if self._timer is not None:
+                self._timer.mark("opponent")
+            self._send_action(opponent_action, is_opponent=True)
+        elif self.backend == "python":
+            self._battle.p2_input = int(self._p2_bot.get_state_inputs([self._current_state])[0])
+            if self._timer is not None:
+                self._timer.mark("opponent")
+        if self._timer is not None:
+            self._timer.mark("send")
+
+    def _receive_step(self) -> "tuple[dict, float, bool, bool, dict]":
+        """Second half of `step()`: wait for the next environment state and compute the step's results"""
         # Save the state before the environment step for later
         previous_state = self._current_state
+        most_recent_state = self._receive_and_update_state()
 
+        return self._advance_step(previous_state, most_recent_state)
+
+    def _advance_step(self, previous_state: FootsiesState, most_recent_state: FootsiesState) -> "tuple[dict, float, bool, bool, dict]":
+        """Compute the results of the environment step from the states before and after it"""
         # Store the most recent state first and then take the oldest one
-        most_recent_state = self._receive_and_update_state()
         self.delayed_frame_queue.append(most_recent_state)
         state = self.delayed_frame_queue.popleft()
 
-        # In the terminal state, the defeated opponent gets into a move (DEAD) that doesn't occur throughout the game, so in that case we default to STAND
-        state.p1Move = (
-            state.p1Move
-            if state.p1Move
-            not in {FootsiesMove.DEAD.value.id, FootsiesMove.WIN.value.id}
-            else FootsiesMove.STAND.value.id
-        )
-        state.p2Move = (
-            state.p2Move
-            if state.p2Move
-            not in {FootsiesMove.DEAD.value.id, FootsiesMove.WIN.value.id}
-            else FootsiesMove.STAND.value.id
-        )
-
         # Get next observation, info and reward
         obs = self._extract_obs(state)
         info = self._extract_info(state, obs)
+        obs = self._keep_most_recent(obs, info)
+        if self._timer is not None:
+            self._timer.mark("observation")
 
         terminated = most_recent_state.p1Vital == 0 or most_recent_state.p2Vital == 0
         reward = (
@@ -558,27 +1140,170 @@ class FootsiesEnv(gym.Env):
             if self.dense_reward
             else self._get_sparse_reward(previous_state, most_recent_state, terminated)
         )
+        if self._timer is not None:
+            self._timer.mark("reward")
 
         # Enable reset() without requesting a forceful reset if episode terminated normally on this step
         self.has_terminated = terminated
-
-        # Create a copy of this observation and info, as is done in reset()
-        self._most_recent_observation = obs.copy()
-        self._most_recent_info = info.copy()
+        # The opponent doesn't act on the terminal observation
+        if not terminated:
+            self._start_opponent_action()
 
         # Environment is never truncated
         return obs, reward, terminated, False, info
 
+    @staticmethod
+    def _timed_opponent(opponent: Callable[[dict, dict], Tuple[bool, bool, bool]], obs: "dict | np.ndarray", info: dict) -> "tuple[tuple[bool, bool, bool], float]":
+        """The opponent's action, and the time its policy took"""
+        start = perf_counter()
+        action = opponent(obs, info)
+        return action, perf_counter() - start
+
+    def _start_opponent_action(self):
+        """If the opponent is pipelined, start computing its action on the most recent observation in the background"""
+        if not self.pipelined_opponent or self.opponent is None:
+            return
+
+        # Make sure the opponent is never called concurrently, even on a shared executor
+        self._discard_opponent_action()
+        self._opponent_future = self._opponent_executor.submit(
+            self._timed_opponent, self.opponent, self._most_recent_observation, self._most_recent_info
+        )
+
+    def _discard_opponent_action(self):
+        """Wait for the opponent's action being computed in the background, if any, and discard it"""
+        if self._opponent_future is not None:
+            future, self._opponent_future = self._opponent_future, None
+            wait((future,))
+            if future.exception() is None:
+                self._opponent_discarded_calls += 1
+                self._opponent_discarded_time += future.result()[1]
+
+    def _opponent_action(self) -> "tuple[bool, bool, bool]":
+        """The opponent's action on the most recent observation, either computed now or collected from the background"""
+        start = perf_counter()
+        if self._opponent_future is not None:
+            future, self._opponent_future = self._opponent_future, None
+            action, policy_time = future.result()
+        else:
+            action, policy_time = self._timed_opponent(self.opponent, self._most_recent_observation, self._most_recent_info)
+        self._opponent_wait_time += perf_counter() - start
+        self._opponent_policy_time += policy_time
+        self._opponent_calls += 1
+
+        return action
+
+    def opponent_timing(self, reset: bool = False) -> Dict[str, float]:
+        """
+        Timing of the custom opponent's policy since creation (or the last reset of the timing), in seconds:
+        - "calls": the number of opponent actions that were used
+        - "policy_time": the total time spent running the opponent's policy for the actions that were used
+        - "wait_time": the total time that `step()` spent waiting for the opponent's actions
+        - "hidden_time": the policy time that was overlapped with other work by pipelining (`policy_time - wait_time`), which is about 0 if the opponent is not pipelined
+        - "discarded_calls": the number of pipelined calls whose actions were discarded (see `pipelined_opponent`)
+        - "discarded_time": the total time spent running the opponent's policy in those calls, which is neither part of the policy time nor of the hidden time
+        """
+        timing = {
+            "calls": self._opponent_calls,
+            "policy_time": self._opponent_policy_time,
+            "wait_time": self._opponent_wait_time,
+            "hidden_time": max(self._opponent_policy_time - self._opponent_wait_time, 0.0),
+            "discarded_calls": self._opponent_discarded_calls,
+            "discarded_time": self._opponent_discarded_time,
+        }
+
+        if reset:
+            self._opponent_calls = 0
+            self._opponent_policy_time = 0.0
+            self._opponent_wait_time = 0.0
+            self._opponent_discarded_calls = 0
+            self._opponent_discarded_time = 0.0
+
+        return timing
+
+    def startup_timing(self) -> Dict[str, float]:
+        """
+        The time spent in each phase of starting up the game, in seconds. Only the phases that took place are included:
+        - "launch": starting the game process
+        - "ready": waiting for the game to signal that it's listening, if it chooses its own ports
+        - "connect": connecting all channels, which includes waiting for the game to start listening if it doesn't signal it
+        - "handshake": receiving the binary protocol handshake
+        - "first_state": waiting for the first state of the first episode
+        """
+        return dict(self._startup_timing)
+
+    def timing_stats(self, reset: bool = False) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Summary of the time spent in each phase of the steps and resets since creation (or the last reset of the timing), in seconds, if `timing` is enabled.
+        Indexed by event ("step", "reset", and "step_n" if the game holds the actions) and then by phase, each with the "count", "total", "mean", "min", "max",
+        and the "p50", "p90" and "p99" percentiles estimated from a histogram (`footsies_gym.envs.timing.TimingHistogram`). Only the phases that took place are included:
+        - "request": making sure the game is running and requesting a new episode, on reset
+        - "send": sending the actions (and, with `by_example` and the "python" backend, running player 1's bot)
+        - "opponent": getting the custom opponent's action (or running the in-game bot's port, with the "python" backend), as the time waited for with a pipelined opponent
+        - "receive": waiting for the game to simulate the frame and send the state (or simulating it, with the "python" backend)
+        - "decode": decoding the state message
+        - "observation": extracting the observation and info
+        - "reward": computing the reward
+        - "other": the rest, such as starting a pipelined opponent's next action
+        - "total": the whole step or reset
+        """
+        if self._timer is None:
+            return {}
+
+        stats = {
+            event: {phase: histogram.summary() for phase, histogram in histograms.items()}
+            for event, histograms in self._timer.histograms.items()
+        }
+
+        if reset:
+            self._timer.histograms.clear()
+
+        return stats
+
+    def add_timing_hook(self, hook: TimingHook):
+        """
+        Add a hook that is called after each timed step or reset with the event's name ("step", "step_n" or "reset") and a dictionary with the time spent in each of its phases, in seconds,
+        as described in `timing_stats()`. Meant for external profilers and loggers. Enables timing if it wasn't already
+        """
+        if self._timer is None:
+            self._timer = StepTimer()
+        self._timer.hooks.append(hook)
+
+    def remove_timing_hook(self, hook: TimingHook):
+        """Remove a hook added with `add_timing_hook()`"""
+        if self._timer is None or hook not in self._timer.hooks:
+            raise ValueError("the hook was not added")
+        self._timer.hooks.remove(hook)
+
     def close(self):
+        self._discard_opponent_action()
+        if self._own_opponent_executor:
+            self._opponent_executor.shutdown()
+
+        if self.backend == "python":
+            return
+
+        if self._leased_instance is not None:
+            self.instance_pool._release(self)
+            return
+
+        if self._ready_listener is not None:
+            self._ready_listener.close()
+            self._ready_listener = None
+        if isinstance(self._comm_reader, SharedMemoryChannel):
+            self._comm_reader.close()
         self.comm.close()  # game should close as well after socket is closed
         self.remote_control_comm.close()
         if self.opponent_comm is not None:
             self.opponent_comm.close()
         if self._game_instance is not None:
             self._game_instance.kill()  # just making sure the game is closed
+        if self._unix_socket_dir is not None:
+            shutil.rmtree(self._unix_socket_dir, ignore_errors=True)
+            self._unix_socket_dir = None
 
     @property
-    def most_recent_observation(self) -> dict:
+    def most_recent_observation(self) -> "dict | np.ndarray":
         """The most recent observation received by the environment after `reset` or `step`."""
         return self._most_recent_observation
 
@@ -613,6 +1338,18 @@ class FootsiesEnv(gym.Env):
             "remote_control_port": ports[2],
         }
 
+    @staticmethod
+    def find_ports_multiple(num_instances: int, start: int, step: int = 1, stop: Union[int, None] = None) -> List[Dict[str, int]]:
+        """Find available ports for `num_instances` new instances of `FootsiesEnv`, without overlap between them. The `psutil` module is required."""
+        ports = []
+        for _ in range(num_instances):
+            instance_ports = FootsiesEnv.find_ports(start=start, step=step, stop=stop)
+            ports.append(instance_ports)
+            # The game instances haven't started yet, so we can't rely on the ports being in use already
+            start = max(instance_ports.values()) + step
+
+        return ports
+
 
 if __name__ == "__main__":
     import pprint
@@ -628,6 +1365,8 @@ if __name__ == "__main__":
         log_file_overwrite=True,
         frame_delay=0,
         skip_instancing=False,
+        timing=True,
+        timing_in_info=True,
     )
 
     # Keep track of how many frames/steps were processed each second so that we can adjust how fast the game runs
@@ -648,12 +1387,11 @@ if __name__ == "__main__":
             terminated, truncated = False, False
             observation, info = env.reset(seed=0)
             while not (terminated or truncated):
-                time_current = monotonic()  # for fps tracking
                 action = (False, False, False) # env.action_space.sample()
                 next_observation, reward, terminated, truncated, info = env.step(action)
 
                 frames = (frames * fps_counter_decay) + 1
-                seconds = (seconds * fps_counter_decay) + monotonic() - time_current
+                seconds = (seconds * fps_counter_decay) + info["timing"]["total"]
                 wins_counter += 1 if terminated and reward > 0 else 0
                 print(
                     f"Episode {episode_counter:>3} | {0 if seconds == 0 else frames / seconds:>7.2f} fps | P1 {wins_counter / (episode_counter) if episode_counter > 0 else 0:>7.2%} win rate",
@@ -689,4 +1427,7 @@ if __name__ == "__main__":
         )
 
     finally:
+        print("Step timing (mean | p99, in milliseconds)")
+        for phase, stats in env.timing_stats().get("step", {}).items():
+            print(f" {phase:>11}: {stats['mean'] * 1000:>7.3f} | {stats['p99'] * 1000:>7.3f}")
         env.close()
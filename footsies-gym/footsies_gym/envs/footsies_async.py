@@ -0,0 +1,298 @@
+import asyncio
+import inspect
+import shutil
+import struct
+import gymnasium as gym
+from time import perf_counter
+from typing import Awaitable, Callable, Tuple, Union
+from ..state import FootsiesBattleState, FootsiesState
+from ..moves import is_p1_actionable
+from .footsies import FootsiesEnv
+from .exceptions import FootsiesGameClosedError
+
+
+class AsyncFootsiesEnv(FootsiesEnv):
+    def __init__(self, *args, **kwargs):
+        """
+        FOOTSIES training environment with an `asyncio` interface. All communication with the game goes through `asyncio` streams,
+        so a single event loop can drive many game instances and overlap their I/O with other work.
+
+        Accepts the same arguments as `FootsiesEnv`. The methods that communicate with the game are coroutines:
+
+        ```python
+        obs, info = await env.reset()
+        obs, reward, terminated, truncated, info = await env.step(action)
+        ```
+
+        The `opponent` policy may be either a regular function or a coroutine function.
+        Only the "unity" backend is supported.
+        """
+        super().__init__(*args, **kwargs)
+        if self.backend != "unity":
+            raise ValueError("the asyncio environment only supports the 'unity' backend")
+        if self.instance_pool is not None:
+            raise ValueError("the asyncio environment doesn't support instance pools")
+        if self.pipelined_opponent:
+            raise ValueError("the asyncio environment doesn't support pipelined opponents, a coroutine function opponent should be used instead")
+        if self.transport == "shm":
+            raise ValueError("the asyncio environment doesn't support the 'shm' transport")
+        if self._timer is not None:
+            raise ValueError("the asyncio environment doesn't support timing, since the waits for the game overlap with other coroutines")
+
+        # The blocking sockets of the base environment are not used
+        self.comm.close()
+        self.remote_control_comm.close()
+        if self.opponent_comm is not None:
+            self.opponent_comm.close()
+        self.comm = None
+        self.remote_control_comm = None
+        self.opponent_comm = None
+        self._comm_reader = None
+        self._remote_control_reader = None
+
+        self._streams: dict[str, Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = {}
+        self._opponent_channel = self.opponent is not None
+
+    async def _stream_connect(self, address: "tuple[str, int] | str", retry_delay: float = 0.5) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        delay = 0.01
+        while True:
+            try:
+                # Nagle's algorithm is disabled by asyncio on TCP connections
+                if self.transport == "unix":
+                    return await asyncio.open_unix_connection(address)
+                return await asyncio.open_connection(*address)
+
+            except (ConnectionRefusedError, ConnectionAbortedError, FileNotFoundError):
+                await asyncio.sleep(delay)  # avoid constantly pestering the game for a connection
+                delay = min(2 * delay, retry_delay)
+
+    async def _connect_to_game(self, retry_delay: float = 0.5):
+        """
+        Connect to the FOOTSIES instance, establishing all channels concurrently.
+        If the connection is refused, try again with exponential backoff, waiting at most `retry_delay` seconds between attempts.
+        No-op if already connected.
+        """
+        if self._ready_listener is not None:
+            await asyncio.to_thread(self._wait_for_ready)
+
+        channels = {}
+        if not self._connected:
+            channels["agent"] = self._channel_address("p1")
+            channels["remote_control"] = self._channel_address("remote_control")
+        if self._opponent_channel and not self._opponent_connected:
+            channels["opponent"] = self._channel_address("p2")
+
+        if not channels:
+            return
+
+        if self._startup_mark is None:
+            # The game wasn't launched by the environment
+            self._startup_mark = perf_counter()
+        streams = await asyncio.gather(*(self._stream_connect(address, retry_delay) for address in channels.values()))
+        self._streams.update(zip(channels.keys(), streams))
+        self._record_startup_phase("connect")
+
+        if "agent" in channels:
+            if self.state_format == "binary":
+                self._check_protocol_handshake_message(await self._game_recv_message("agent"))
+                self._record_startup_phase("handshake")
+            self._connected = True
+        if "opponent" in channels:
+            self._opponent_connected = True
+
+    async def _game_recv_message(self, channel: str) -> bytes:
+        """Receive a message from the FOOTSIES instance through the given channel. Raises `FootsiesGameClosedError` if a problem occurred"""
+        reader, _ = self._streams[channel]
+        try:
+            header = await asyncio.wait_for(reader.readexactly(self.STATE_MESSAGE_SIZE_BYTES), self.COMM_TIMEOUT)
+            message_size = struct.unpack("!I", header)[0]
+            return await asyncio.wait_for(reader.readexactly(message_size), self.COMM_TIMEOUT)
+
+        except asyncio.IncompleteReadError:
+            raise FootsiesGameClosedError("game has closed")
+
+        except asyncio.TimeoutError:
+            raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+
+    async def _game_send(self, channel: str, message: bytes):
+        _, writer = self._streams[channel]
+        try:
+            writer.write(message)
+            await writer.drain()
+        except OSError:
+            raise FootsiesGameClosedError
+
+    async def _receive_and_update_state(self):
+        self._current_state = self._decode_state(await self._game_recv_message("agent"))
+        return self._current_state
+
+    async def _send_action(self, action: "tuple[bool, bool, bool]", is_opponent: bool = False, frames: int = 1, stop_conditions: int = 0):
+        await self._game_send("opponent" if is_opponent else "agent", self._action_message(action, is_opponent, frames, stop_conditions))
+
+    async def _remote_control_send_command(self, command: FootsiesEnv.RemoteControlCommand, value: str = "") -> "any":
+        if self.sync_mode == "synced_blocking":
+            raise RuntimeError("remote control is not supported in 'synced_blocking' mode")
+
+        if command == self.RemoteControlCommand.NONE:
+            return
+
+        await self._game_send("remote_control", self._remote_control_message(command, value))
+
+        if command == self.RemoteControlCommand.STATE_SAVE:
+            battle_state_json = await self._game_recv_message("remote_control")
+            return FootsiesBattleState.from_json(battle_state_json.decode("utf-8"))
+
+    async def save_battle_state(self, slot: int | None = None) -> "FootsiesBattleState | int":
+        """Save the current game state, either returning it or keeping it in the game's `slot`, as `FootsiesEnv.save_battle_state`"""
+        self._instantiate_game()
+        await self._connect_to_game()
+
+        if slot is None:
+            return await self._remote_control_send_command(self.RemoteControlCommand.STATE_SAVE)
+
+        await self._remote_control_send_command(self.RemoteControlCommand.STATE_SAVE_SLOT, str(int(slot)))
+        self._battle_state_slot_states[int(slot)] = self._current_state
+        return slot
+
+    async def load_battle_state(self, battle_state: FootsiesBattleState | None = None, *, slot: int | None = None) -> "tuple[dict, dict]":
+        """Make the game load a specific battle state, either given in full or kept in the game's `slot`, and continue the episode from it, as `FootsiesEnv.load_battle_state`"""
+        if (battle_state is None) == (slot is None):
+            raise ValueError("exactly one of the battle state or the slot should be specified")
+        if slot is not None and int(slot) not in self._battle_state_slot_states:
+            raise ValueError(f"no battle state was saved in slot {slot}")
+
+        if self.has_terminated:
+            await self.reset()
+
+        if slot is None:
+            await self._remote_control_send_command(self.RemoteControlCommand.STATE_LOAD, battle_state.json())
+            state = FootsiesState.from_battle_state(battle_state)
+        else:
+            await self._remote_control_send_command(self.RemoteControlCommand.STATE_LOAD_SLOT, str(int(slot)))
+            state = self._battle_state_slot_states[int(slot)]
+
+        return self._continue_from_state(state)
+
+    async def _request_reset(self):
+        await self._remote_control_send_command(self.RemoteControlCommand.RESET)
+
+    async def _request_opponent_change(self, bot: bool):
+        await self._remote_control_send_command(self.RemoteControlCommand.P2_BOT, str(bot))
+
+    async def _request_seed_set(self, seed: int):
+        await self._remote_control_send_command(self.RemoteControlCommand.SEED, str(seed))
+
+    async def set_opponent(self, opponent: Callable[[dict, dict], Union[Tuple[bool, bool, bool], Awaitable[Tuple[bool, bool, bool]]]] | None):
+        """
+        Set the agent's opponent to the specified custom policy, or `None` if the default environment opponent should be used.
+
+        WARNING: the environment needs to be set up with a custom opponent on creation (may be a dummy one), or else this method will raise an exception.
+        """
+        self._instantiate_game()
+        await self._connect_to_game()
+
+        if not self._opponent_channel:
+            raise RuntimeError("the environment needs to be created with a custom opponent before calling this method")
+
+        require_request = (opponent is not None and self.opponent is None) or (
+            opponent is None and self.opponent is not None
+        )
+
+        self.opponent = opponent
+
+        if require_request:
+            await self._request_opponent_change(bot=self.opponent is None)
+
+    async def reset(self, *, seed: int = None, options: dict = None) -> "tuple[dict, dict]":
+        gym.Env.reset(self, seed=seed)
+        self._instantiate_game()
+        await self._connect_to_game()
+
+        if seed is not None:
+            await self._request_seed_set(seed)
+
+        if not self.has_terminated:
+            await self._request_reset()
+
+        self.delayed_frame_queue.clear()
+        self._cummulative_episode_reward = 0.0
+
+        first_state = await self._receive_and_update_state()
+        # Guarantee it's the first environment state
+        while first_state.globalFrame != -1:
+            first_state = await self._receive_and_update_state()
+
+        if "connect" in self._startup_timing and "first_state" not in self._startup_timing:
+            self._record_startup_phase("first_state")
+
+        return self._start_episode(first_state)
+
+    async def step(self, action: "tuple[bool, bool, bool]") -> "tuple[dict, float, bool, bool, dict]":
+        if not self.by_example:
+            await self._send_action(action, is_opponent=False)
+
+        if self.opponent is not None:
+            opponent_action = self.opponent(self._most_recent_observation, self._most_recent_info)
+            if inspect.isawaitable(opponent_action):
+                opponent_action = await opponent_action
+            await self._send_action(opponent_action, is_opponent=True)
+
+        previous_state = self._current_state
+        most_recent_state = await self._receive_and_update_state()
+
+        return self._advance_step(previous_state, most_recent_state)
+
+    async def step_n(self, action: "tuple[bool, bool, bool]", n: int, until_actionable: bool = False) -> "tuple[dict, float, bool, bool, dict]":
+        if n < 1:
+            raise ValueError(f"the number of frames must be positive, got {n}")
+
+        if self._game_holds_actions():
+            stop_conditions = self.ACTION_REPEAT_UNTIL_ACTIONABLE if until_actionable else 0
+            reward = 0.0
+            terminated = truncated = False
+            while n > 0 and not (terminated or truncated):
+                frames = min(n, self.ACTION_REPEAT_MAX_FRAMES)
+                await self._send_action(action, is_opponent=False, frames=frames, stop_conditions=stop_conditions)
+                previous_state = self._current_state
+                most_recent_state = await self._receive_and_update_state()
+                obs, step_reward, terminated, truncated, info = self._advance_step(previous_state, most_recent_state)
+                reward += step_reward
+                if most_recent_state.globalFrame - previous_state.globalFrame < frames:
+                    break
+                n -= frames
+
+            return obs, reward, terminated, truncated, info
+
+        reward = 0.0
+        guard = self._most_recent_info["guard"]
+        for _ in range(n):
+            obs, step_reward, terminated, truncated, info = await self.step(action)
+            reward += step_reward
+            if (
+                terminated
+                or truncated
+                or info["guard"][0] < guard[0]
+                or info["guard"][1] < guard[1]
+                or (until_actionable and is_p1_actionable(info["move"], info["move_frame"]))
+            ):
+                break
+
+        return obs, reward, terminated, truncated, info
+
+    async def close(self):
+        for _, writer in self._streams.values():
+            writer.close()  # game should close as well after socket is closed
+        for _, writer in self._streams.values():
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        self._streams.clear()
+        if self._ready_listener is not None:
+            self._ready_listener.close()
+            self._ready_listener = None
+        if self._game_instance is not None:
+            self._game_instance.kill()  # just making sure the game is closed
+        if self._unix_socket_dir is not None:
+            shutil.rmtree(self._unix_socket_dir, ignore_errors=True)
+            self._unix_socket_dir = None
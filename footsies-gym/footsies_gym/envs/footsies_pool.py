@@ -0,0 +1,247 @@
+import dataclasses
+import shutil
+import socket
+import subprocess
+from typing import Dict, List, Tuple
+from ..state import FootsiesState
+from .footsies import FootsiesEnv
+from .exceptions import FootsiesGameClosedError
+from .comms import BufferedMessageReader
+from .shm import SharedMemoryChannel
+
+
+def _pooled_opponent_placeholder(obs: dict, info: dict) -> "tuple[bool, bool, bool]":
+    """Custom opponent with which pooled game instances are launched, so that they can play against either the in-game bot or a custom opponent"""
+    raise RuntimeError("pooled game instances are only launched with this opponent, it's never called")
+
+
+@dataclasses.dataclass(slots=True)
+class _PooledInstance:
+    """A running game instance and its connections, which are moved between environments"""
+
+    process: subprocess.Popen
+    ports: Dict[str, int]
+    comm: socket.socket
+    remote_control_comm: socket.socket
+    opponent_comm: socket.socket
+    comm_reader: BufferedMessageReader | SharedMemoryChannel
+    remote_control_reader: BufferedMessageReader
+    # The first state of the episode that the game has started, which was already received
+    first_state: FootsiesState
+    # Directory of the game's Unix domain sockets (and shared memory file), with the "unix" and "shm" transports
+    unix_socket_dir: str | None = None
+
+    def kill(self):
+        for sckt in (self.comm, self.remote_control_comm, self.opponent_comm):
+            sckt.close()
+        self.process.kill()
+        if isinstance(self.comm_reader, SharedMemoryChannel):
+            self.comm_reader.close()
+        if self.unix_socket_dir is not None:
+            shutil.rmtree(self.unix_socket_dir, ignore_errors=True)
+
+
+class FootsiesInstancePool:
+    # The environment arguments that game instances are launched with. An instance can only be leased to environments with the same arguments
+    LAUNCH_ARGUMENTS = (
+        "game_path",
+        "game_address",
+        "render_mode",
+        "fast_forward",
+        "fast_forward_speed",
+        "sync_mode",
+        "state_format",
+        "action_repeat",
+        "by_example",
+        "ephemeral_ports",
+        "transport",
+    )
+
+    def __init__(self, max_idle: int = 4, port_start: int = 11000, port_step: int = 1, port_stop: int | None = None):
+        """
+        Pool of running and connected FOOTSIES game instances, which are leased to environments rather than launched and killed by each of them.
+        An environment created with `instance_pool` leases an instance when it first needs the game, and gives it back when closed.
+        Game instances are only shared between environments with the same launch arguments (`LAUNCH_ARGUMENTS`), and all of them can
+        play against either the in-game bot or a custom opponent, which is set for each environment through remote control, as are seeds.
+
+        Instances are health-checked when given back, by starting a new episode, and when leased, by checking that the process is still running.
+        Instances that fail are killed.
+
+        Only the "unity" backend and the "synced_non_blocking" sync mode are supported, since remote control is required. Human opponents are not supported
+
+        Parameters
+        ----------
+        max_idle: int
+            the maximum number of idle instances that are kept running. Instances that are given back when the pool is full are killed
+        port_start: int
+            the port from which to start searching for free ports for new game instances. The `psutil` module is required, unless the instances choose their own ports (`ephemeral_ports`)
+        port_step: int
+            the step with which to search for free ports
+        port_stop: int
+            the port at which to stop searching for free ports
+        """
+        if max_idle < 0:
+            raise ValueError(f"the maximum number of idle instances can't be negative, got {max_idle}")
+
+        self.max_idle = max_idle
+        self.port_step = port_step
+        self.port_stop = port_stop
+
+        self._next_port = port_start
+        self._idle: Dict[Tuple, List[_PooledInstance]] = {}
+        self._closed = False
+
+    @classmethod
+    def _launch_config(cls, env: FootsiesEnv) -> Tuple:
+        return tuple((argument, getattr(env, argument)) for argument in cls.LAUNCH_ARGUMENTS)
+
+    @staticmethod
+    def _check_supported(env: FootsiesEnv):
+        if env.backend != "unity":
+            raise ValueError("the instance pool only supports the 'unity' backend")
+        if env.sync_mode != "synced_non_blocking":
+            raise ValueError("the instance pool only supports the 'synced_non_blocking' sync mode, since remote control is required")
+        if env.vs_player:
+            raise ValueError("the instance pool doesn't support human opponents")
+
+    def _launch(self, config: Tuple) -> _PooledInstance:
+        """Launch a new game instance with the given launch arguments, and wait for it to start the first episode"""
+        if dict(config)["ephemeral_ports"] or dict(config)["transport"] != "tcp":
+            # The game instance chooses its own ports, which are known once it's ready, or doesn't use any
+            ports = {}
+        else:
+            ports = FootsiesEnv.find_ports(start=self._next_port, step=self.port_step, stop=self.port_stop)
+            # The game instance hasn't started yet, so we can't rely on the ports being in use already
+            self._next_port = max(ports.values()) + self.port_step
+
+        launcher = FootsiesEnv(**dict(config), **ports, opponent=_pooled_opponent_placeholder)
+        launcher._instantiate_game()
+        try:
+            launcher._connect_to_game()
+            first_state = launcher._receive_and_update_state()
+            while first_state.globalFrame != -1:
+                first_state = launcher._receive_and_update_state()
+
+        except (FootsiesGameClosedError, OSError):
+            launcher.close()
+            raise
+
+        return _PooledInstance(
+            process=launcher._game_instance,
+            ports={
+                "game_port": launcher.game_port,
+                "opponent_port": launcher.opponent_port,
+                "remote_control_port": launcher.remote_control_port,
+            },
+            comm=launcher.comm,
+            remote_control_comm=launcher.remote_control_comm,
+            opponent_comm=launcher.opponent_comm,
+            comm_reader=launcher._comm_reader,
+            remote_control_reader=launcher._remote_control_reader,
+            first_state=first_state,
+            unix_socket_dir=launcher._unix_socket_dir,
+        )
+
+    def prelaunch(self, num_instances: int, **env_kwargs):
+        """Launch `num_instances` game instances for environments created with `env_kwargs`, so that they don't have to wait for them. Limited by `max_idle`"""
+        env = FootsiesEnv(**env_kwargs)
+        try:
+            self._check_supported(env)
+            config = self._launch_config(env)
+        finally:
+            env.close()
+
+        idle = self._idle.setdefault(config, [])
+        for _ in range(min(num_instances, self.max_idle - self.num_idle)):
+            idle.append(self._launch(config))
+
+    def _lease(self, env: FootsiesEnv):
+        """Give a game instance to the environment, which becomes connected to it"""
+        if self._closed:
+            raise RuntimeError("the instance pool is closed")
+        self._check_supported(env)
+
+        config = self._launch_config(env)
+        idle = self._idle.get(config, [])
+        instance = None
+        while idle and instance is None:
+            instance = idle.pop()
+            if instance.process.poll() is not None:
+                instance.kill()
+                instance = None
+
+        if instance is None:
+            instance = self._launch(config)
+
+        # The environment's own sockets are not used
+        for sckt in (env.comm, env.remote_control_comm, env.opponent_comm):
+            if sckt is not None:
+                sckt.close()
+
+        env.comm = instance.comm
+        env.remote_control_comm = instance.remote_control_comm
+        env.opponent_comm = instance.opponent_comm
+        env._comm_reader = instance.comm_reader
+        env._remote_control_reader = instance.remote_control_reader
+        env._game_instance = instance.process
+        env.game_port = instance.ports["game_port"]
+        env.opponent_port = instance.ports["opponent_port"]
+        env.remote_control_port = instance.ports["remote_control_port"]
+        env._connected = True
+        env._opponent_connected = True
+        env._leased_instance = instance
+
+        # The game has already started an episode, whose first state will be the first one the environment receives
+        env.has_terminated = True
+        env._pending_first_state = instance.first_state
+        env._request_opponent_change(bot=env.opponent is None)
+
+    def _release(self, env: FootsiesEnv):
+        """Take the game instance back from the environment, which is no longer connected to it"""
+        instance: _PooledInstance = env._leased_instance
+        try:
+            if env._pending_first_state is not None:
+                # The environment never started the episode that the game did
+                first_state = env._pending_first_state
+            else:
+                # Start a new episode, which also checks that the game is still responsive
+                if not env.has_terminated:
+                    env._request_reset()
+                first_state = env._receive_and_update_state()
+                while first_state.globalFrame != -1:
+                    first_state = env._receive_and_update_state()
+
+            instance.first_state = first_state
+            healthy = True
+
+        except (FootsiesGameClosedError, OSError):
+            healthy = False
+
+        env.comm = None
+        env.remote_control_comm = None
+        env.opponent_comm = None
+        env._comm_reader = None
+        env._remote_control_reader = None
+        env._game_instance = None
+        env._connected = False
+        env._opponent_connected = False
+        env._leased_instance = None
+        env._pending_first_state = None
+
+        if healthy and not self._closed and self.num_idle < self.max_idle:
+            self._idle.setdefault(self._launch_config(env), []).append(instance)
+        else:
+            instance.kill()
+
+    @property
+    def num_idle(self) -> int:
+        """The number of idle game instances"""
+        return sum(len(instances) for instances in self._idle.values())
+
+    def close(self):
+        """Kill all idle game instances. Instances that are still leased are killed when given back"""
+        self._closed = True
+        for instances in self._idle.values():
+            for instance in instances:
+                instance.kill()
+        self._idle.clear()
@@ -0,0 +1,126 @@
+import dataclasses
+import numpy as np
+from gymnasium import spaces
+from ..state import FootsiesBattleState
+from .footsies_vector import FootsiesVectorEnv
+
+
+@dataclasses.dataclass(slots=True)
+class FootsiesRollouts:
+    """Trajectories of rollouts from the same battle state, as arrays whose first dimension is the rollout and second dimension (if any) is the time step"""
+
+    # The observation after each step, in the environment's format. The observations after a rollout has terminated are 0
+    observations: "dict | np.ndarray"
+    # The reward of each step, which is 0 after a rollout has terminated
+    rewards: np.ndarray
+    # Whether each rollout terminated before its actions ran out
+    terminated: np.ndarray
+    # The number of steps of each rollout
+    lengths: np.ndarray
+    # The discounted sum of the rewards of each rollout
+    returns: np.ndarray
+
+
+def _empty_trajectories(space: spaces.Space, shape: "tuple[int, ...]") -> "dict | np.ndarray":
+    if isinstance(space, spaces.Dict):
+        return {key: _empty_trajectories(subspace, shape) for key, subspace in space.items()}
+    return np.zeros(shape + space.shape, dtype=space.dtype)
+
+
+def _write_trajectories(trajectories: "dict | np.ndarray", observations: "dict | np.ndarray", rollouts: np.ndarray, t: int, rows: np.ndarray):
+    if isinstance(trajectories, dict):
+        for key, value in trajectories.items():
+            _write_trajectories(value, observations[key], rollouts, t, rows)
+    else:
+        trajectories[rollouts, t] = observations[rows]
+
+
+class FootsiesRolloutPool:
+    def __init__(self, envs: FootsiesVectorEnv, slot: int = 0):
+        """
+        Rollouts of many action sequences from the same battle state, meant for planning agents (such as MCTS or lookahead).
+        The rollouts are spread across the game instances of a vectorized environment, which play them in parallel.
+        Within each call to `rollout()`, the battle state is only sent once to each game instance, which keeps it in a snapshot slot for the following rollouts
+
+        The opponent is the vectorized environment's opponent. The opponent's own state (such as the in-game bot's) is not part of the battle state, so it's carried over between rollouts
+
+        Parameters
+        ----------
+        envs: FootsiesVectorEnv
+            the pool of game instances. Its episodes are interrupted by the rollouts, and it's reset on creation.
+            Frame delay is not supported
+        slot: int
+            the game's snapshot slot in which the battle state is kept during rollouts
+        """
+        if any(env.delayed_frame_queue.maxlen != 1 for env in envs.envs):
+            raise ValueError("rollouts are not supported with frame delay")
+
+        self.envs = envs
+        self.slot = slot
+
+        self.envs.reset()
+
+    def rollout(self, battle_state: FootsiesBattleState, actions: np.ndarray, discount: float = 1.0) -> FootsiesRollouts:
+        """
+        Play each sequence of actions from `battle_state`, until the actions run out or the episode terminates.
+
+        Parameters
+        ----------
+        battle_state: FootsiesBattleState
+            the state from which all rollouts start, as returned by `FootsiesEnv.save_battle_state()`
+        actions: np.ndarray
+            the agent's actions of each rollout at each step, with shape `(num_rollouts, num_steps, 3)`
+        discount: float
+            the discount factor of the returns
+        """
+        actions = np.asarray(actions, dtype=np.bool_)
+        if actions.ndim != 3 or actions.shape[2] != 3:
+            raise ValueError(f"the actions should have shape (num_rollouts, num_steps, 3), got {actions.shape}")
+
+        num_rollouts, num_steps = actions.shape[:2]
+        num_envs = self.envs.num_envs
+
+        observations = _empty_trajectories(self.envs.single_observation_space, (num_rollouts, num_steps))
+        rewards = np.zeros((num_rollouts, num_steps), dtype=np.float64)
+        terminated = np.zeros((num_rollouts,), dtype=np.bool_)
+        lengths = np.zeros((num_rollouts,), dtype=np.int64)
+
+        step_actions = np.zeros((num_envs, 3), dtype=np.bool_)
+        for start in range(0, num_rollouts, num_envs):
+            rollouts = np.arange(start, min(start + num_envs, num_rollouts))
+            active = np.zeros((num_envs,), dtype=np.bool_)
+            active[:len(rollouts)] = True
+
+            if start == 0:
+                self.envs.load_battle_state(battle_state, mask=active)
+                self.envs.save_battle_state(self.slot, mask=active)
+            else:
+                self.envs.load_battle_state(slot=self.slot, mask=active)
+
+            for t in range(num_steps):
+                rows = np.flatnonzero(active)
+                step_actions[rows] = actions[rollouts[rows], t]
+                obs, step_rewards, step_terminations, step_truncations, _ = self.envs.step_masked(step_actions, active)
+
+                _write_trajectories(observations, obs, rollouts[rows], t, rows)
+                rewards[rollouts[rows], t] = step_rewards[rows]
+                lengths[rollouts[rows]] += 1
+
+                done = np.flatnonzero(active & (step_terminations | step_truncations))
+                terminated[rollouts[done]] = step_terminations[done]
+                active[done] = False
+                if not active.any():
+                    break
+
+        returns = rewards @ (discount ** np.arange(num_steps, dtype=np.float64))
+
+        return FootsiesRollouts(
+            observations=observations,
+            rewards=rewards,
+            terminated=terminated,
+            lengths=lengths,
+            returns=returns,
+        )
+
+    def close(self):
+        self.envs.close()
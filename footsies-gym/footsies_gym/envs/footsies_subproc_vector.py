@@ -0,0 +1,358 @@
+import multiprocessing as mp
+import traceback
+import numpy as np
+import gymnasium as gym
+from copy import deepcopy
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Sequence, Tuple
+from gymnasium import spaces
+from gymnasium.vector import AutoresetMode
+from gymnasium.vector.utils import batch_space, CloudpickleWrapper
+
+# The info fields of `FootsiesEnv` that are transferred through shared memory, with their dtype and shape.
+# Any other info field added by wrappers is not transferred
+FOOTSIES_SHARED_INFO_FIELDS = {
+    "frame": (np.int64, ()),
+    "p1_action": (np.bool_, (3,)),
+    "p2_action": (np.bool_, (3,)),
+    "p1_hitstun": (np.int64, ()),
+    "p2_hitstun": (np.int64, ()),
+}
+
+
+def _space_array_specs(space: spaces.Space) -> Dict[str | None, Tuple[np.dtype, tuple]]:
+    """The dtype and shape of the arrays that hold values of `space`, by key (`None` if `space` is not a dictionary)"""
+    if isinstance(space, spaces.Dict):
+        return {key: _space_array_specs(subspace)[None] for key, subspace in space.spaces.items()}
+    if isinstance(space, (spaces.Box, spaces.MultiDiscrete, spaces.MultiBinary)):
+        return {None: (space.dtype, space.shape)}
+    if isinstance(space, spaces.Discrete):
+        return {None: (space.dtype, ())}
+
+    raise ValueError(f"spaces of type {type(space).__name__} are not supported by the shared memory vectorized environment")
+
+
+class _SharedArrays:
+    """A group of arrays, with one row per sub-environment, backed by shared memory blocks that other processes can attach to by name"""
+
+    def __init__(self, specs: Dict[str | None, Tuple[np.dtype, tuple]], num_envs: int, names: Dict[str | None, str] | None = None):
+        self.specs = specs
+        self.num_envs = num_envs
+        self.owner = names is None
+        self.blocks: Dict[str | None, SharedMemory] = {}
+        self.arrays: Dict[str | None, np.ndarray] = {}
+
+        for key, (dtype, shape) in specs.items():
+            full_shape = (num_envs, *shape)
+            size = max(int(np.prod(full_shape)) * np.dtype(dtype).itemsize, 1)
+            block = SharedMemory(create=True, size=size) if self.owner else SharedMemory(name=names[key])
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(full_shape, dtype=dtype, buffer=block.buf)
+            if self.owner:
+                self.arrays[key].fill(0)
+
+    @property
+    def names(self) -> Dict[str | None, str]:
+        return {key: block.name for key, block in self.blocks.items()}
+
+    def write(self, index: int, value):
+        if None in self.arrays:
+            self.arrays[None][index] = value
+        else:
+            for key, array in self.arrays.items():
+                array[index] = value[key]
+
+    def read(self, index: int):
+        if None in self.arrays:
+            return self.arrays[None][index]
+        return {key: array[index] for key, array in self.arrays.items()}
+
+    def batch(self):
+        return self.arrays[None] if None in self.arrays else self.arrays
+
+    def close(self):
+        # The numpy views must be released before the memory can be closed
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks.clear()
+
+
+def _worker(
+    pipe,
+    parent_pipe,
+    env_fns: CloudpickleWrapper,
+    env_indices: Sequence[int],
+    num_envs: int,
+    specs: dict,
+    names: dict,
+):
+    """Main loop of a worker process, which owns the sub-environments with indices `env_indices`"""
+    parent_pipe.close()
+    envs = []
+    shared = {}
+
+    try:
+        envs = [env_fn() for env_fn in env_fns.fn]
+        shared = {group: _SharedArrays(specs[group], num_envs, names[group]) for group in specs}
+        observations = shared["observations"]
+        actions = shared["actions"]
+        rewards = shared["rewards"].arrays[None]
+        terminations = shared["terminations"].arrays[None]
+        truncations = shared["truncations"].arrays[None]
+        infos = shared["infos"]
+
+        autoreset = [False] * len(envs)
+
+        def write_info(index: int, info: dict):
+            for key, array in infos.arrays.items():
+                array[index] = info[key]
+
+        while True:
+            command, data = pipe.recv()
+
+            if command == "reset":
+                for j, (env, index) in enumerate(zip(envs, env_indices)):
+                    obs, info = env.reset(seed=data[index])
+                    observations.write(index, obs)
+                    write_info(index, info)
+                    autoreset[j] = False
+                pipe.send(("ok", None))
+
+            elif command == "step":
+                for j, (env, index) in enumerate(zip(envs, env_indices)):
+                    if autoreset[j]:
+                        obs, info = env.reset()
+                        reward, terminated, truncated = 0.0, False, False
+                    else:
+                        action = actions.read(index)
+                        action = action.item() if action.ndim == 0 else tuple(action.tolist())
+                        obs, reward, terminated, truncated, info = env.step(action)
+
+                    observations.write(index, obs)
+                    rewards[index] = reward
+                    terminations[index] = terminated
+                    truncations[index] = truncated
+                    write_info(index, info)
+                    autoreset[j] = terminated or truncated
+                pipe.send(("ok", None))
+
+            elif command == "close":
+                break
+
+            else:
+                raise RuntimeError(f"unknown command '{command}' received by the worker")
+
+    except (KeyboardInterrupt, Exception) as err:
+        pipe.send(("error", (type(err).__name__, str(err), traceback.format_exc())))
+
+    finally:
+        for env in envs:
+            env.close()
+        for group in shared.values():
+            group.close()
+        pipe.close()
+
+
+class FootsiesSubprocVectorEnv(gym.vector.VectorEnv):
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    # How long to wait for the workers to gracefully close, in seconds
+    CLOSE_TIMEOUT = 10
+
+    def __init__(
+        self,
+        env_fns: Sequence[Callable[[], gym.Env]],
+        envs_per_worker: int = 1,
+        context: str | None = None,
+        copy: bool = True,
+    ):
+        """
+        Vectorized FOOTSIES environment, in which the sub-environments run in worker processes.
+
+        Unlike gymnasium's `AsyncVectorEnv`, observations, rewards, terminations and infos are written by the workers into `multiprocessing.shared_memory` arrays,
+        and only small control messages go through the pipes. This is meant for setups where the Python side of the environment is CPU-heavy,
+        such as custom opponents or wrappers like `FootsiesFrameSkipped` and `FootsiesNormalized`.
+        Sub-environments that terminated are automatically reset on the next step (next-step autoreset)
+
+        Parameters
+        ----------
+        env_fns: Sequence[Callable[[], gym.Env]]
+            functions that create each sub-environment, which can be FOOTSIES environments with any wrappers. Each should use different ports (see `FootsiesEnv.find_ports_multiple`)
+        envs_per_worker: int
+            how many sub-environments each worker process owns. Sub-environments of the same worker are stepped one after the other
+        context: str
+            the `multiprocessing` start method (e.g. "spawn" or "fork"). If `None`, the default one is used
+        copy: bool
+            whether to return a copy of the batched observations, rather than the shared memory arrays which are overwritten on every step
+
+        NOTE: only the info fields of `FootsiesEnv` (`FOOTSIES_SHARED_INFO_FIELDS`) are returned, info fields added by wrappers are discarded.
+        The observation space may be a dictionary of `Box`, `MultiDiscrete`, `MultiBinary` or `Discrete` spaces, or one of these spaces
+        """
+        if envs_per_worker < 1:
+            raise ValueError(f"each worker must own at least one environment (requested {envs_per_worker})")
+
+        self.num_envs = len(env_fns)
+        self.copy = copy
+        self.render_mode = None
+
+        # Create a dummy environment to find out the spaces. The game is not launched until reset() is called
+        dummy_env = env_fns[0]()
+        self.single_observation_space = dummy_env.observation_space
+        self.single_action_space = dummy_env.action_space
+        dummy_env.close()
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+        self.action_space = batch_space(self.single_action_space, self.num_envs)
+
+        specs = {
+            "observations": _space_array_specs(self.single_observation_space),
+            "actions": _space_array_specs(self.single_action_space),
+            "rewards": {None: (np.float64, ())},
+            "terminations": {None: (np.bool_, ())},
+            "truncations": {None: (np.bool_, ())},
+            "infos": FOOTSIES_SHARED_INFO_FIELDS,
+        }
+        self._shared = {group: _SharedArrays(group_specs, self.num_envs) for group, group_specs in specs.items()}
+        names = {group: shared.names for group, shared in self._shared.items()}
+
+        ctx = mp.get_context(context)
+        self._pipes = []
+        self._processes = []
+        for start in range(0, self.num_envs, envs_per_worker):
+            env_indices = list(range(start, min(start + envs_per_worker, self.num_envs)))
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                name=f"FootsiesWorker-{len(self._processes)}",
+                args=(
+                    child_pipe,
+                    parent_pipe,
+                    CloudpickleWrapper([env_fns[i] for i in env_indices]),
+                    env_indices,
+                    self.num_envs,
+                    specs,
+                    names,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_pipe.close()
+            self._pipes.append(parent_pipe)
+            self._processes.append(process)
+
+        self._autoreset_envs = np.zeros((self.num_envs,), dtype=np.bool_)
+
+    def _send_all(self, command: str, data=None):
+        for pipe in self._pipes:
+            pipe.send((command, data))
+
+    def _wait_all(self):
+        errors = []
+        for i, pipe in enumerate(self._pipes):
+            status, data = pipe.recv()
+            if status == "error":
+                errors.append((i, data))
+
+        if errors:
+            worker, (error_type, message, worker_traceback) = errors[0]
+            raise RuntimeError(f"worker {worker} raised {error_type}: {message}\n{worker_traceback}")
+
+    def _infos(self) -> dict:
+        infos = {}
+        mask = np.ones((self.num_envs,), dtype=np.bool_)
+        for key, array in self._shared["infos"].arrays.items():
+            infos[key] = np.copy(array)
+            infos[f"_{key}"] = mask.copy()
+        return infos
+
+    def _observations(self):
+        observations = self._shared["observations"].batch()
+        return deepcopy(observations) if self.copy else observations
+
+    def reset(self, *, seed: int | List[int] | None = None, options: dict | None = None) -> "tuple[dict, dict]":
+        super().reset(seed=seed)
+        if seed is None or isinstance(seed, int):
+            seeds = [seed if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = seed
+        if len(seeds) != self.num_envs:
+            raise ValueError(f"{len(seeds)} seeds were specified, but there are {self.num_envs} environments")
+
+        self._send_all("reset", seeds)
+        self._wait_all()
+
+        self._autoreset_envs[:] = False
+        return self._observations(), self._infos()
+
+    def step(self, actions) -> "tuple[dict, np.ndarray, np.ndarray, np.ndarray, dict]":
+        self._shared["actions"].batch()[:] = actions
+
+        self._send_all("step")
+        self._wait_all()
+
+        terminations = np.copy(self._shared["terminations"].batch())
+        truncations = np.copy(self._shared["truncations"].batch())
+        self._autoreset_envs = np.logical_or(terminations, truncations)
+        return (
+            self._observations(),
+            np.copy(self._shared["rewards"].batch()),
+            terminations,
+            truncations,
+            self._infos(),
+        )
+
+    def close_extras(self, **kwargs):
+        for pipe, process in zip(self._pipes, self._processes):
+            if process.is_alive():
+                try:
+                    pipe.send(("close", None))
+                except (BrokenPipeError, EOFError):
+                    pass
+        for pipe, process in zip(self._pipes, self._processes):
+            process.join(timeout=self.CLOSE_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+            pipe.close()
+        for shared in self._shared.values():
+            shared.close()
+
+
+if __name__ == "__main__":
+    # Throughput comparison against gymnasium's AsyncVectorEnv, on the same sub-environments
+    import argparse
+    from functools import partial
+    from time import monotonic
+    from .footsies import FootsiesEnv
+    from ..wrappers import FootsiesNormalized, FootsiesFrameSkipped
+
+    parser = argparse.ArgumentParser(description="Compare the throughput of FootsiesSubprocVectorEnv and AsyncVectorEnv")
+    parser.add_argument("--game-path", type=str, default="Build/FOOTSIES.exe")
+    parser.add_argument("--num-envs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=5000)
+    parser.add_argument("--port-start", type=int, default=11000)
+    args = parser.parse_args()
+
+    def make_env(ports: dict) -> gym.Env:
+        env = FootsiesEnv(game_path=args.game_path, fast_forward=True, sync_mode="synced_non_blocking", **ports)
+        return FootsiesFrameSkipped(FootsiesNormalized(env))
+
+    ports = FootsiesEnv.find_ports_multiple(2 * args.num_envs, start=args.port_start)
+    vector_envs = {
+        "FootsiesSubprocVectorEnv": lambda fns: FootsiesSubprocVectorEnv(fns),
+        "AsyncVectorEnv": lambda fns: gym.vector.AsyncVectorEnv(fns, shared_memory=True),
+    }
+
+    for i, (name, make_vector_env) in enumerate(vector_envs.items()):
+        env_fns = [partial(make_env, p) for p in ports[i * args.num_envs:(i + 1) * args.num_envs]]
+        envs = make_vector_env(env_fns)
+        try:
+            envs.reset(seed=0)
+            time_start = monotonic()
+            for _ in range(args.steps):
+                envs.step(envs.action_space.sample())
+            elapsed = monotonic() - time_start
+            print(f"{name:>26}: {args.steps * args.num_envs / elapsed:>9.2f} steps/s ({args.num_envs} environments)")
+        finally:
+            envs.close()
@@ -0,0 +1,341 @@
+import selectors
+from time import monotonic
+import numpy as np
+from copy import deepcopy
+import gymnasium as gym
+from typing import Any, Callable, Dict, List
+from gymnasium.vector import AutoresetMode
+from gymnasium.vector.utils import batch_space, concatenate, create_empty_array
+from .footsies import FootsiesEnv
+from .shm import SharedMemoryChannel
+from ..state import FootsiesBattleState
+from .exceptions import FootsiesGameClosedError
+from ..sim import BattleAI
+from ..sim.battle import INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK
+
+
+def _batched_opponent_placeholder(obs: dict, info: dict) -> "tuple[bool, bool, bool]":
+    """Custom opponent of the sub-environments when their actions are chosen by a batched opponent, which makes the game expect the opponent's actions"""
+    raise RuntimeError("the opponent's actions are chosen by the vectorized environment's batched opponent")
+
+
+class FootsiesVectorEnv(gym.vector.VectorEnv):
+    metadata = {"render_modes": [], "autoreset_mode": AutoresetMode.NEXT_STEP}
+
+    def __init__(
+        self,
+        num_envs: int,
+        port_start: int = 11000,
+        port_step: int = 1,
+        port_stop: int | None = None,
+        ports: List[Dict[str, int]] | None = None,
+        copy: bool = True,
+        batched_opponent: Callable[[dict, dict], np.ndarray] | None = None,
+        **kwargs,
+    ):
+        """
+        Vectorized FOOTSIES environment, which multiplexes many game instances from a single process.
+
+        At every step, the actions are first sent to all game instances, and only then the environment waits on all sockets at the same time,
+        so that the games run in parallel rather than one after the other (as would happen with `SyncVectorEnv`).
+        Each game instance is managed by a `FootsiesEnv`, so observations, rewards and infos are exactly the same as the single environment's,
+        except for the random choices of the default bot of the "python" backend (see `batched_opponent`).
+        Sub-environments that terminated are automatically reset on the next step (next-step autoreset)
+
+        Parameters
+        ----------
+        num_envs: int
+            the number of game instances
+        port_start: int
+            the port from which to start searching for free ports for the game instances. Ignored if `ports` is specified
+        port_step: int
+            the step with which to search for free ports. Ignored if `ports` is specified
+        port_stop: int
+            the port at which to stop searching for free ports. Ignored if `ports` is specified
+        ports: List[Dict[str, int]]
+            the ports to use for each game instance, as returned by `FootsiesEnv.find_ports`. If `None`, they will be found automatically, which requires the `psutil` module
+        copy: bool
+            whether to return a copy of the batched observations, rather than the same array which is reused between steps
+        batched_opponent: Callable[[dict, dict], np.ndarray]
+            if not `None`, the policy followed by the opponents of all sub-environments, which receives the most recent batched observations and infos and returns
+            the opponents' actions with shape `(num_envs, 3)`, such as `BattleAI.batch`. It's called once per step for all sub-environments, rather than once per sub-environment.
+            On `step_masked`, it's additionally given the `mask` keyword argument with the sub-environments that are stepped, and only their actions are used.
+            Can't be specified together with `opponent` nor `pipelined_opponent`. If the "python" backend is used without any opponent, the Python port of the in-game bot is used as the batched opponent.
+            Like the bot of each `FootsiesEnv`, it sees the battles as they are (without frame delay), but its random choices for all battles come from a single generator,
+            seeded with the first sub-environment's seed, so they differ from those of single environments with the same seeds
+        **kwargs
+            arguments passed to each `FootsiesEnv`. If `log_file` is specified, it's formatted with the instance's `index`.
+            With `pipelined_opponent`, the opponents of all sub-environments compute their actions in the background at the same time, such as on a shared `opponent_executor`
+
+        WARNING: the environments should be synced (`sync_mode` of either "synced_non_blocking" or "synced_blocking"), since we wait for exactly one state per step of each game instance
+        """
+        if kwargs.get("sync_mode", "synced_non_blocking") == "async":
+            raise ValueError("the vectorized environment doesn't support the 'async' sync mode")
+        if batched_opponent is not None and kwargs.get("opponent") is not None:
+            raise ValueError("a custom opponent and a batched opponent can't be specified together")
+        if batched_opponent is not None and kwargs.get("pipelined_opponent", False):
+            raise ValueError("a batched opponent can't be pipelined")
+        if ports is not None and len(ports) != num_envs:
+            raise ValueError(f"the ports of {len(ports)} game instances were specified, but there are {num_envs} environments")
+
+        if ports is None:
+            if kwargs.get("backend", "unity") == "python" or kwargs.get("instance_pool") is not None or kwargs.get("ephemeral_ports", False) or kwargs.get("transport", "tcp") != "tcp":
+                # No game instances to communicate with, their ports are chosen by the instance pool or by the game instances themselves, or no ports are used
+                ports = [{} for _ in range(num_envs)]
+            else:
+                ports = FootsiesEnv.find_ports_multiple(num_envs, start=port_start, step=port_step, stop=port_stop)
+
+        self._default_bot = None
+        if batched_opponent is None and kwargs.get("backend", "unity") == "python" and kwargs.get("opponent") is None and not kwargs.get("vs_player", False):
+            # A single bot playing all battles at once, rather than a bot in each sub-environment
+            self._default_bot = BattleAI(num_envs)
+            batched_opponent = self._default_bot_actions
+        self.batched_opponent = batched_opponent
+        if batched_opponent is not None:
+            kwargs["opponent"] = _batched_opponent_placeholder
+            kwargs["pipelined_opponent"] = False
+
+        log_file = kwargs.pop("log_file", None)
+        self.envs = [
+            FootsiesEnv(
+                **kwargs,
+                **instance_ports,
+                log_file=log_file.format(index=i) if log_file is not None else None,
+            )
+            for i, instance_ports in enumerate(ports)
+        ]
+
+        self.num_envs = num_envs
+        self.copy = copy
+        self.render_mode = None
+
+        self.single_observation_space = self.envs[0].observation_space
+        self.single_action_space = self.envs[0].action_space
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        self._observations = create_empty_array(self.single_observation_space, n=num_envs, fn=np.zeros)
+        self._rewards = np.zeros((num_envs,), dtype=np.float64)
+        self._terminations = np.zeros((num_envs,), dtype=np.bool_)
+        self._truncations = np.zeros((num_envs,), dtype=np.bool_)
+        self._autoreset_envs = np.zeros((num_envs,), dtype=np.bool_)
+        # The most recent infos, given to the batched opponent
+        self._infos = {}
+        # The most recent observation of each sub-environment, since not all of them are stepped on `step_masked`
+        self._single_observations = [None] * num_envs
+
+        self._selector = selectors.DefaultSelector()
+        self._registered = [False] * num_envs
+
+    def _register(self, index: int):
+        """Register the sub-environment's socket in the selector, once it has connected to the game"""
+        if not self._registered[index] and self.envs[index].backend == "unity":
+            self._selector.register(self.envs[index].comm, selectors.EVENT_READ, index)
+            self._registered[index] = True
+
+    def _wait_for_all(self, pending: "set[int]", on_ready):
+        """Call `on_ready(index)` for every pending sub-environment, as soon as its game instance has sent data"""
+        def treat_buffered():
+            for index in list(pending):
+                env = self.envs[index]
+                if env.backend == "python" or env._pending_first_state is not None or env._comm_reader.has_buffered_message():
+                    on_ready(index)
+                    pending.discard(index)
+
+        # Messages that were already received alongside others don't make the sockets readable, so treat them first.
+        # Battles simulated in-process never have to be waited for, and neither do first states received when leasing the game instance
+        treat_buffered()
+
+        # Wake-ups through shared memory may be missed (see `SharedMemoryChannel`), so its rings are checked again every now and then
+        shared_memory = any(env.transport == "shm" for env in self.envs)
+        deadline = monotonic() + FootsiesEnv.COMM_TIMEOUT
+        while pending:
+            events = self._selector.select(timeout=SharedMemoryChannel.WAKE_UP_POLL_INTERVAL if shared_memory else FootsiesEnv.COMM_TIMEOUT)
+            if not events:
+                if shared_memory and monotonic() <= deadline:
+                    treat_buffered()
+                    continue
+                raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+
+            for key, _ in events:
+                index = key.data
+                if index in pending:
+                    on_ready(index)
+                    pending.discard(index)
+            deadline = monotonic() + FootsiesEnv.COMM_TIMEOUT
+
+    def reset(self, *, seed: int | List[int] | None = None, options: dict | None = None) -> "tuple[dict, dict]":
+        super().reset(seed=seed)
+        if seed is None or isinstance(seed, int):
+            seeds = [seed if seed is None else seed + i for i in range(self.num_envs)]
+        else:
+            seeds = seed
+        if len(seeds) != self.num_envs:
+            raise ValueError(f"{len(seeds)} seeds were specified, but there are {self.num_envs} environments")
+
+        if self._default_bot is not None and seeds[0] is not None:
+            self._default_bot.seed(seeds[0])
+
+        # Launch all game instances before connecting to any of them, so that they start up at the same time
+        for env in self.envs:
+            env._instantiate_game()
+
+        for i, (env, env_seed) in enumerate(zip(self.envs, seeds)):
+            gym.Env.reset(env, seed=env_seed)
+            env._request_episode_start(env_seed)
+            self._register(i)
+
+        observations = [None] * self.num_envs
+        infos = {}
+
+        def on_ready(index: int):
+            observations[index], info = self.envs[index]._receive_episode_start()
+            infos.update(self._add_info(infos, info, index))
+
+        self._wait_for_all(set(range(self.num_envs)), on_ready)
+
+        self._autoreset_envs[:] = False
+        self._single_observations = observations
+        self._observations = concatenate(self.single_observation_space, observations, self._observations)
+        self._infos = infos
+        return (self._copy(self._observations), infos)
+
+    def step(self, actions) -> "tuple[dict, np.ndarray, np.ndarray, np.ndarray, dict]":
+        return self._step(actions)
+
+    def _default_bot_actions(self, observations: dict, infos: dict, mask: np.ndarray | None = None) -> np.ndarray:
+        """
+        Actions of the default bot of the "python" backend, from the most recent state of each sub-environment rather than the (possibly delayed) observations.
+        As in `FootsiesEnv`, the bot doesn't act on the terminal states of the sub-environments that are about to be reset
+        """
+        stepped = ~self._autoreset_envs if mask is None else mask & ~self._autoreset_envs
+        inputs = self._default_bot.get_state_inputs([env._current_state for env in self.envs], stepped)
+        return (inputs[:, np.newaxis] & [INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK]) != 0
+
+    def step_masked(self, actions, mask) -> "tuple[dict, np.ndarray, np.ndarray, np.ndarray, dict]":
+        """
+        Step only the sub-environments selected by the boolean `mask`, with shape `(num_envs,)`. The other sub-environments are left untouched:
+        their actions are ignored, their observations are the same as before, their rewards are 0, they are neither terminated nor truncated, and they have no infos
+        """
+        return self._step(actions, np.asarray(mask, dtype=np.bool_))
+
+    def _step(self, actions, mask: np.ndarray | None = None) -> "tuple[dict, np.ndarray, np.ndarray, np.ndarray, dict]":
+        active = range(self.num_envs) if mask is None else np.flatnonzero(mask).tolist()
+        actions = np.asarray(actions).astype(np.bool_).tolist()
+        if self.batched_opponent is None:
+            opponent_actions = [None] * self.num_envs
+        elif mask is None:
+            opponent_actions = np.asarray(self.batched_opponent(self._observations, self._infos)).astype(np.bool_).tolist()
+        else:
+            opponent_actions = np.asarray(self.batched_opponent(self._observations, self._infos, mask=mask)).astype(np.bool_).tolist()
+
+        # Send all actions first, so that the game instances process their frames in parallel
+        for i in active:
+            env = self.envs[i]
+            if self._autoreset_envs[i]:
+                env._request_episode_start()
+            else:
+                env._send_step_actions(tuple(actions[i]), None if opponent_actions[i] is None else tuple(opponent_actions[i]))
+
+        observations = self._single_observations
+        infos = {}
+        if mask is not None:
+            self._rewards[:] = 0.0
+            self._terminations[:] = False
+            self._truncations[:] = False
+
+        def on_ready(index: int):
+            env = self.envs[index]
+            if self._autoreset_envs[index]:
+                observations[index], info = env._receive_episode_start()
+                self._rewards[index] = 0.0
+                self._terminations[index] = False
+                self._truncations[index] = False
+            else:
+                (
+                    observations[index],
+                    self._rewards[index],
+                    self._terminations[index],
+                    self._truncations[index],
+                    info,
+                ) = env._receive_step()
+            infos.update(self._add_info(infos, info, index))
+
+        self._wait_for_all(set(active), on_ready)
+
+        if mask is None:
+            self._autoreset_envs = np.logical_or(self._terminations, self._truncations)
+        else:
+            self._autoreset_envs[mask] = np.logical_or(self._terminations[mask], self._truncations[mask])
+        self._observations = concatenate(self.single_observation_space, observations, self._observations)
+        if mask is None:
+            self._infos = infos
+        else:
+            # The batched opponent should still see the most recent infos of the sub-environments that weren't stepped
+            self._infos = self._merge_infos(self._infos, infos, mask)
+        return (
+            self._copy(self._observations),
+            np.copy(self._rewards),
+            np.copy(self._terminations),
+            np.copy(self._truncations),
+            infos,
+        )
+
+    def load_battle_state(
+        self, battle_state: FootsiesBattleState | None = None, *, slot: int | None = None, mask: np.ndarray | None = None
+    ) -> "tuple[dict, dict]":
+        """
+        Make the game instances of the sub-environments selected by `mask` (all of them if `None`) load a battle state and continue their episodes from it,
+        as `FootsiesEnv.load_battle_state`. Sub-environments whose episodes have terminated start new ones first, in parallel.
+        Returns the batched observations, in which those of the other sub-environments are the same as before, and the infos of the selected sub-environments
+        """
+        mask = np.ones((self.num_envs,), dtype=np.bool_) if mask is None else np.asarray(mask, dtype=np.bool_)
+        rows = np.flatnonzero(mask).tolist()
+
+        # Battle states can only be loaded in the middle of a round
+        starting = {i for i in rows if self._autoreset_envs[i] or self.envs[i].has_terminated}
+        for i in starting:
+            self.envs[i]._request_episode_start()
+            self._register(i)
+        self._wait_for_all(set(starting), lambda i: self.envs[i]._receive_episode_start())
+
+        infos = {}
+        for i in rows:
+            self._single_observations[i], info = self.envs[i].load_battle_state(battle_state, slot=slot)
+            infos = self._add_info(infos, info, i)
+        self._autoreset_envs[mask] = False
+
+        self._observations = concatenate(self.single_observation_space, self._single_observations, self._observations)
+        self._infos = self._merge_infos(self._infos, infos, mask)
+        return (self._copy(self._observations), infos)
+
+    def save_battle_state(self, slot: int, mask: np.ndarray | None = None):
+        """Make the game instances of the sub-environments selected by `mask` (all of them if `None`) keep their current battle states in `slot`, as `FootsiesEnv.save_battle_state`"""
+        mask = np.ones((self.num_envs,), dtype=np.bool_) if mask is None else np.asarray(mask, dtype=np.bool_)
+        for i in np.flatnonzero(mask).tolist():
+            self.envs[i].save_battle_state(slot=slot)
+
+    @staticmethod
+    def _merge_infos(infos: dict, new_infos: dict, mask: np.ndarray) -> dict:
+        """Batched infos in which the infos of the sub-environments in `mask` are replaced by those in `new_infos`. Neither of the given infos are modified"""
+        merged = {}
+        for key in infos.keys() | new_infos.keys():
+            if key not in new_infos:
+                merged[key] = infos[key]
+            elif key not in infos:
+                merged[key] = new_infos[key]
+            elif isinstance(infos[key], dict):
+                merged[key] = FootsiesVectorEnv._merge_infos(infos[key], new_infos[key], mask)
+            else:
+                merged[key] = np.copy(infos[key])
+                merged[key][mask] = new_infos[key][mask]
+
+        return merged
+
+    def _copy(self, observations: Any) -> Any:
+        return deepcopy(observations) if self.copy else observations
+
+    def close_extras(self, **kwargs):
+        self._selector.close()
+        for env in self.envs:
+            env.close()
@@ -0,0 +1,215 @@
+"""
+Shared memory transport of the agent's states and actions, through ring buffers in a memory-mapped file.
+
+Layout of the file (integers in the headers are little-endian):
+- file header (64 bytes): magic bytes "FTSM", protocol version, capacity of each ring (in slots) and size of each slot (in bytes), as 32-bit integers
+- ring of messages from the game to the environment (states), followed by the ring of messages from the environment to the game (actions)
+
+Each ring has a header (64 bytes) with the number of messages written so far (64-bit, offset 0), whether the reader is waiting to be woken up (32-bit, offset 8)
+and the number of messages read so far (64-bit, offset 32), followed by `capacity` slots. Each slot holds a message, prefixed with its size (32-bit).
+Message `i` is written to slot `i % capacity`, and the writer only publishes it (by incrementing the number of messages written) once it's complete.
+
+Both ends also keep a socket connection, through which nothing but wake-ups are sent: a reader that finds its ring empty spins for a short while,
+and then marks itself as waiting and blocks on the socket, to which the writer sends a byte after publishing a message if the reader is waiting.
+"""
+import mmap
+import os
+import select
+import socket
+import struct
+from time import monotonic, perf_counter, sleep
+from .exceptions import FootsiesGameClosedError, FootsiesProtocolError
+
+
+class SharedMemoryChannel:
+    MAGIC = b"FTSM"
+    VERSION = 1
+
+    FILE_HEADER_STRUCT = struct.Struct("<4sIII")
+    FILE_HEADER_SIZE = 64
+    RING_HEADER_SIZE = 64
+    COUNT_STRUCT = struct.Struct("<Q")
+    FLAG_STRUCT = struct.Struct("<I")
+    SIZE_STRUCT = struct.Struct("<I")
+    WRITE_COUNT_OFFSET = 0
+    WAITING_OFFSET = 8
+    READ_COUNT_OFFSET = 32
+
+    GAME_TO_ENV = 0
+    ENV_TO_GAME = 1
+
+    # How often a blocked reader checks the ring on its own, in case a wake-up was missed. Stores to the mapping are not fenced,
+    # so the writer may not see that the reader has just started waiting
+    WAKE_UP_POLL_INTERVAL = 0.001
+
+    # For how long to keep checking for a message before blocking, by default. Spinning only helps if the other end runs on another processor meanwhile
+    DEFAULT_SPIN_TIME = 50e-6 if (os.cpu_count() or 1) > 1 else 0.0
+
+    def __init__(self, path: str, wake_up_socket: socket.socket, is_game: bool = False, spin_time: float = DEFAULT_SPIN_TIME, timeout: float = 10.0):
+        """
+        One end of the shared memory transport, in a file created with `SharedMemoryChannel.create()`.
+        Received messages are views into the mapping, and are only valid until the next one is received, as with `BufferedMessageReader`
+
+        Parameters
+        ----------
+        path: str
+            path of the memory-mapped file
+        wake_up_socket: socket.socket
+            connected socket through which the other end is woken up, and this end is woken up by the other
+        is_game: bool
+            whether this is the game's end, which receives actions and sends states, rather than the environment's end
+        spin_time: float
+            for how long to keep checking for a message before blocking on the socket, in seconds. By default, there is no spinning on single-processor machines
+        timeout: float
+            for how long to wait for a message before assuming the other end is gone, in seconds
+        """
+        with open(path, "r+b") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0)
+        self._view = memoryview(self._mmap)
+
+        magic, version, capacity, slot_size = self.FILE_HEADER_STRUCT.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC:
+            raise FootsiesProtocolError(f"invalid shared memory file (magic bytes {magic!r}, expected {self.MAGIC!r})")
+        if version != self.VERSION:
+            raise FootsiesProtocolError(f"the shared memory file uses protocol version {version}, but version {self.VERSION} is expected")
+
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.wake_up_socket = wake_up_socket
+        self.spin_time = spin_time
+        self.timeout = timeout
+
+        inbound, outbound = (self.ENV_TO_GAME, self.GAME_TO_ENV) if is_game else (self.GAME_TO_ENV, self.ENV_TO_GAME)
+        self._inbound = self._ring_offset(inbound, capacity, slot_size)
+        self._outbound = self._ring_offset(outbound, capacity, slot_size)
+        # Number of messages read and written by this end. Messages are only marked as read once the next one is received, since they are used in place
+        self._read_count = self.COUNT_STRUCT.unpack_from(self._mmap, self._inbound + self.READ_COUNT_OFFSET)[0]
+        self._write_count = self.COUNT_STRUCT.unpack_from(self._mmap, self._outbound + self.WRITE_COUNT_OFFSET)[0]
+        self._waiting = False
+
+    @classmethod
+    def _ring_offset(cls, ring: int, capacity: int, slot_size: int) -> int:
+        return cls.FILE_HEADER_SIZE + ring * (cls.RING_HEADER_SIZE + capacity * slot_size)
+
+    @classmethod
+    def create(cls, path: str, capacity: int = 8, slot_size: int = 128):
+        """Create the memory-mapped file of a new channel, with empty rings of `capacity` slots that fit messages of up to `slot_size` - 4 bytes"""
+        size = cls._ring_offset(2, capacity, slot_size)
+        with open(path, "wb") as f:
+            f.write(cls.FILE_HEADER_STRUCT.pack(cls.MAGIC, cls.VERSION, capacity, slot_size))
+            f.truncate(size)
+
+    def _slot_offset(self, ring_offset: int, index: int) -> int:
+        return ring_offset + self.RING_HEADER_SIZE + (index % self.capacity) * self.slot_size
+
+    def _inbound_available(self) -> bool:
+        return self.COUNT_STRUCT.unpack_from(self._mmap, self._inbound + self.WRITE_COUNT_OFFSET)[0] > self._read_count
+
+    def _set_waiting(self, waiting: bool):
+        self.FLAG_STRUCT.pack_into(self._mmap, self._inbound + self.WAITING_OFFSET, int(waiting))
+        self._waiting = waiting
+
+    def _drain_wake_ups(self, block: bool) -> bool:
+        """Consume the wake-ups sent through the socket, returning whether there were any. Raises `FootsiesGameClosedError` if the other end closed the connection"""
+        readable, _, _ = select.select([self.wake_up_socket], [], [], self.WAKE_UP_POLL_INTERVAL if block else 0.0)
+        if not readable:
+            return False
+
+        try:
+            received = self.wake_up_socket.recv(4096)
+        except OSError:
+            raise FootsiesGameClosedError("game has closed")
+        if not received:
+            raise FootsiesGameClosedError("game has closed")
+        return True
+
+    def _wait_for_message(self):
+        """Wait until there is an unread message in the inbound ring, spinning at first and then blocking on the socket"""
+        spin_end = perf_counter() + self.spin_time
+        while not self._inbound_available():
+            if perf_counter() >= spin_end:
+                break
+        else:
+            if self._waiting:
+                self._set_waiting(False)
+                self._drain_wake_ups(block=False)
+            return
+
+        deadline = monotonic() + self.timeout
+        self._set_waiting(True)
+        try:
+            # Check again after marking ourselves as waiting, since the message may have been published right before
+            while not self._inbound_available():
+                if not self._drain_wake_ups(block=True) and monotonic() > deadline:
+                    raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+
+        finally:
+            self._set_waiting(False)
+
+    def recv_message(self) -> memoryview:
+        """Receive the next message, as a view into the mapping that is only valid until the next message is received"""
+        # The previous message is no longer in use, so its slot can be reused by the writer
+        self.COUNT_STRUCT.pack_into(self._mmap, self._inbound + self.READ_COUNT_OFFSET, self._read_count)
+        self._wait_for_message()
+
+        offset = self._slot_offset(self._inbound, self._read_count)
+        size = self.SIZE_STRUCT.unpack_from(self._mmap, offset)[0]
+        if size > self.slot_size - self.SIZE_STRUCT.size:
+            raise FootsiesProtocolError(f"received message of {size} bytes through shared memory, which doesn't fit in a slot of {self.slot_size} bytes")
+        self._read_count += 1
+
+        start = offset + self.SIZE_STRUCT.size
+        return self._view[start:start + size]
+
+    def has_buffered_message(self, spin: bool = False) -> bool:
+        """
+        Whether a message can be received without waiting. If not, this end is marked as waiting,
+        so that the socket becomes readable once a message arrives and can be waited on with `select`.
+        If `spin`, keep checking for a message for `spin_time` seconds first
+        """
+        spin_end = perf_counter() + self.spin_time if spin else 0.0
+        while not self._inbound_available():
+            if perf_counter() >= spin_end:
+                break
+        else:
+            return True
+
+        self._set_waiting(True)
+        return self._inbound_available()
+
+    def send(self, message: bytes):
+        """Send a message, waiting for a free slot if the other end is behind by a full ring"""
+        size = len(message)
+        if size > self.slot_size - self.SIZE_STRUCT.size:
+            raise ValueError(f"message of {size} bytes doesn't fit in a slot of {self.slot_size} bytes")
+
+        deadline = None
+        while self._write_count - self.COUNT_STRUCT.unpack_from(self._mmap, self._outbound + self.READ_COUNT_OFFSET)[0] >= self.capacity:
+            if deadline is None:
+                deadline = monotonic() + self.timeout
+            elif monotonic() > deadline:
+                raise FootsiesGameClosedError("game took too long to respond, will assume it's closed")
+            sleep(0)
+
+        offset = self._slot_offset(self._outbound, self._write_count)
+        self.SIZE_STRUCT.pack_into(self._mmap, offset, size)
+        start = offset + self.SIZE_STRUCT.size
+        self._view[start:start + size] = message
+
+        # Publish the message only once it's complete
+        self._write_count += 1
+        self.COUNT_STRUCT.pack_into(self._mmap, self._outbound + self.WRITE_COUNT_OFFSET, self._write_count)
+
+        if self.FLAG_STRUCT.unpack_from(self._mmap, self._outbound + self.WAITING_OFFSET)[0]:
+            try:
+                self.wake_up_socket.sendall(b"\x01")
+            except OSError:
+                raise FootsiesGameClosedError("game has closed")
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            # A received message is still in use, the mapping is closed once it's no longer referenced
+            pass
@@ -0,0 +1,151 @@
+import math
+import numpy as np
+from time import perf_counter
+from typing import Callable, Dict, List
+
+# Called after each timed event ("step", "step_n" or "reset") with the event's name and the time spent in each of its phases, in seconds
+TimingHook = Callable[[str, Dict[str, float]], None]
+
+
+class TimingHistogram:
+    def __init__(self, min_time: float = 1e-6, max_time: float = 10.0, num_bins: int = 64):
+        """
+        Fixed-size histogram of durations, with logarithmically spaced bins between `min_time` and `max_time` seconds, plus an underflow and an overflow bin.
+        Percentiles are estimated from the bins, as their upper edge
+
+        Parameters
+        ----------
+        min_time: float
+            the lower edge of the first bin, in seconds
+        max_time: float
+            the upper edge of the last bin, in seconds
+        num_bins: int
+            the number of bins between `min_time` and `max_time`
+        """
+        if not 0 < min_time < max_time:
+            raise ValueError(f"the time range must be positive and non-empty, got [{min_time}, {max_time}]")
+        if num_bins < 1:
+            raise ValueError(f"the number of bins must be positive, got {num_bins}")
+
+        self.min_time = min_time
+        self.num_bins = num_bins
+        # Edges of the bins between `min_time` and `max_time`. The underflow bin is the first one, and the overflow bin is the last one
+        self.edges = np.geomspace(min_time, max_time, num_bins + 1)
+        self._bins_per_log = num_bins / math.log(max_time / min_time)
+        # Kept as a list, since incrementing the elements of a NumPy array is much slower
+        self._counts = [0] * (num_bins + 2)
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, duration: float):
+        if duration < self.min_time:
+            self._counts[0] += 1
+        else:
+            self._counts[min(int(math.log(duration / self.min_time) * self._bins_per_log) + 1, self.num_bins + 1)] += 1
+
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def counts(self) -> np.ndarray:
+        """The number of durations in each bin, starting with the underflow bin and ending with the overflow bin"""
+        return np.array(self._counts, dtype=np.int64)
+
+    def percentile(self, q: float) -> float:
+        """Estimate of the `q`-th percentile (between 0 and 100) of the durations, as the upper edge of the bin in which it lies"""
+        if self.count == 0:
+            return math.nan
+
+        index = int(np.searchsorted(np.cumsum(self._counts), q / 100 * self.count))
+        if index == 0:
+            return self.min_time
+        if index > self.num_bins:
+            return self.max
+        # The estimate is never beyond the largest duration
+        return min(float(self.edges[index]), self.max)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count > 0 else math.nan,
+            "min": self.min if self.count > 0 else math.nan,
+            "max": self.max if self.count > 0 else math.nan,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+    def clear(self):
+        self._counts = [0] * (self.num_bins + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+
+class StepTimer:
+    def __init__(self):
+        """
+        Timer of the phases of the environment's events (such as "step" and "reset"). An event is started with `begin()`, the end of each of its phases is marked with `mark()`,
+        and the time since the previous mark is accounted to that phase. Once the event is finished with `finish()`, the time spent in each phase (and in total) is recorded
+        in the histograms of the event's phases, and the hooks are called with it. Marks made outside of an event are ignored
+        """
+        self.histograms: Dict[str, Dict[str, TimingHistogram]] = {}
+        self.hooks: List[TimingHook] = []
+
+        self._event: str | None = None
+        self._start = 0.0
+        self._last = 0.0
+        self._durations: Dict[str, float] = {}
+
+    def begin(self, event: str) -> bool:
+        """Start timing an event, returning whether it was started. An event that starts while another one is being timed (such as the steps of `step_n()`) is not timed"""
+        if self._event is not None:
+            return False
+
+        self._event = event
+        self._durations = {}
+        self._start = self._last = perf_counter()
+        return True
+
+    def mark(self, phase: str):
+        """Account the time since the previous mark to `phase`"""
+        if self._event is None:
+            return
+
+        now = perf_counter()
+        self._durations[phase] = self._durations.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self) -> Dict[str, float]:
+        """Finish timing the event, returning the time spent in each of its phases. The time since the last mark is accounted to "other", and the whole event's time to "total" """
+        self.mark("other")
+        durations = self._durations
+        durations["total"] = self._last - self._start
+        event, self._event = self._event, None
+
+        histograms = self.histograms.get(event)
+        if histograms is None:
+            histograms = self.histograms[event] = {}
+        for phase, duration in durations.items():
+            histogram = histograms.get(phase)
+            if histogram is None:
+                histogram = histograms[phase] = TimingHistogram()
+            histogram.record(duration)
+
+        for hook in self.hooks:
+            hook(event, durations)
+
+        return durations
+
+    def cancel(self):
+        """Stop timing the event without recording it, such as when it failed"""
+        self._event = None
@@ -0,0 +1,260 @@
+import selectors
+import numpy as np
+from typing import Dict, List
+from .envs.footsies import FootsiesEnv, _OBSERVED_MOVE_ID_TO_INDEX
+from .envs.exceptions import FootsiesGameClosedError
+from .moves import FOOTSIES_MOVE_INDEFINITE
+from .state import FOOTSIES_STATE_DTYPE, FOOTSIES_STATE_WIRE_DTYPE
+from .wrappers.recorder import FootsiesRecordingWriter, recording_columns
+
+# Move index in the observations of each move ID, as a lookup table
+_OBSERVED_MOVE_INDEX = np.zeros(max(_OBSERVED_MOVE_ID_TO_INDEX) + 1, dtype=np.int64)
+_OBSERVED_MOVE_INDEX[list(_OBSERVED_MOVE_ID_TO_INDEX)] = list(_OBSERVED_MOVE_ID_TO_INDEX.values())
+# Bit flag of each action in the game's inputs (left, right, attack)
+_ACTION_BITS = np.array([1, 2, 4], dtype=np.uint8)
+
+
+def _action_flags(bits: np.ndarray) -> np.ndarray:
+    return (bits[:, np.newaxis] & _ACTION_BITS) != 0
+
+
+def episode_rows(states: np.ndarray, dense_reward: bool = True) -> Dict[str, np.ndarray]:
+    """
+    The rows of the recording (as written by `FootsiesRecorder` on an environment with "dict" observations) of a complete episode in which player 1 is the in-game bot,
+    given all of its environment states (with dtype `FOOTSIES_STATE_DTYPE`) from the first to the terminal one.
+    The action taken on each state is the input with which player 1 got to the next state
+    """
+    num_rows = len(states)
+    p1_move = _OBSERVED_MOVE_INDEX[states["p1Move"]]
+    p2_move = _OBSERVED_MOVE_INDEX[states["p2Move"]]
+    p1_guard = states["p1Guard"].astype(np.int64)
+    p2_guard = states["p2Guard"].astype(np.int64)
+
+    # Same as `FootsiesEnv._get_dense_reward` and `FootsiesEnv._get_sparse_reward`, for all steps at once
+    outcome = 1.0 if states["p2Vital"][-1] == 0 else -1.0
+    rewards = np.zeros(num_rows, dtype=np.float64)
+    if dense_reward:
+        rewards[:-1] = 0.3 * ((p2_guard[1:] < p2_guard[:-1]).astype(np.float64) - (p1_guard[1:] < p1_guard[:-1]))
+        rewards[-2] += outcome - rewards[:-1].sum()
+    else:
+        rewards[-2] = outcome
+
+    actions = np.zeros((num_rows, 3), dtype=np.int8)
+    actions[:-1] = _action_flags(states["p1MostRecentAction"][1:])
+
+    terminated = np.zeros(num_rows, dtype=np.bool_)
+    terminated[-2] = True
+    episode_start = np.zeros(num_rows, dtype=np.bool_)
+    episode_start[0] = True
+    episode_end = np.zeros(num_rows, dtype=np.bool_)
+    episode_end[-1] = True
+
+    return {
+        "observation.guard": np.stack([p1_guard, p2_guard], axis=1),
+        "observation.move": np.stack([p1_move, p2_move], axis=1),
+        "observation.move_frame": np.stack(
+            [
+                np.where(FOOTSIES_MOVE_INDEFINITE[p1_move], 0, states["p1MoveFrame"]),
+                np.where(FOOTSIES_MOVE_INDEFINITE[p2_move], 0, states["p2MoveFrame"]),
+            ],
+            axis=1,
+        ).astype(np.float32),
+        "observation.position": np.stack([states["p1Position"], states["p2Position"]], axis=1).astype(np.float32),
+        "action": actions,
+        "reward": rewards.astype(np.float32),
+        "terminated": terminated,
+        "truncated": np.zeros(num_rows, dtype=np.bool_),
+        "episode_start": episode_start,
+        "episode_end": episode_end,
+        "info.frame": states["globalFrame"],
+        "info.p1_action": _action_flags(states["p1MostRecentAction"]),
+        "info.p2_action": _action_flags(states["p2MostRecentAction"]),
+        "info.p1_hitstun": states["p1Hitstun"],
+        "info.p2_hitstun": states["p2Hitstun"],
+    }
+
+
+class _HarvestingFootsiesEnv(FootsiesEnv):
+    """Launcher of a game instance in which both players are the in-game bot, and which sends player 1's states in batches"""
+
+    def __init__(self, state_batch: int, **kwargs):
+        super().__init__(**kwargs)
+        self.state_batch = state_batch
+
+    def _game_arguments(self) -> List[str]:
+        return [*super()._game_arguments(), "--p1-state-batch", str(self.state_batch)]
+
+
+class _HarvestedInstance:
+    """A game instance being harvested, with the states of its ongoing episode"""
+
+    def __init__(self, env: _HarvestingFootsiesEnv):
+        self.env = env
+        # Batches of states of the ongoing episode, which are only decoded into rows once it's complete
+        self.episode: List[np.ndarray] = []
+
+    def take_episodes(self, states: np.ndarray) -> List[np.ndarray]:
+        """Take a batch of consecutive states, returning the episodes that it completes"""
+        episodes = []
+        terminal = np.flatnonzero((states["p1Vital"] == 0) | (states["p2Vital"] == 0))
+        start = 0
+        for end in terminal:
+            self.episode.append(states[start:end + 1])
+            episode = np.concatenate(self.episode)
+            self.episode = []
+            # The states before the first episode start that was received belong to an episode that wasn't received whole
+            first = np.flatnonzero(episode["globalFrame"] == -1)
+            if len(first) > 0 and len(episode) - first[0] >= 2:
+                episodes.append(episode[first[0]:])
+            start = end + 1
+
+        if start < len(states):
+            self.episode.append(states[start:])
+        return episodes
+
+
+class FootsiesHarvester:
+    def __init__(
+        self,
+        recording_path: str,
+        num_instances: int = 4,
+        state_batch: int = 256,
+        dense_reward: bool = True,
+        chunk_size: int = 65536,
+        compress: bool = False,
+        overwrite: bool = False,
+        seed: int | None = None,
+        port_start: int = 11000,
+        **env_kwargs,
+    ):
+        """
+        Harvester of demonstrations of the in-game bot, which plays both players in several game instances at once and records player 1's trajectories, as `by_example` would.
+        The game instances don't wait for the agent, they send player 1's states in batches of binary states as fast as they're received,
+        and the batches are decoded into the rows of the recording all at once, per complete episode, without going through `FootsiesEnv.step()`.
+
+        The recording has the same format and the same rows as a `FootsiesRecorder` on a `FootsiesEnv` with "dict" observations, except that the actions are the inputs of the bot
+        (rather than the ignored actions given to `step()`), so it can be read with `FootsiesDataset`. Episodes are written whole, in the order in which they are completed,
+        and those that are still incomplete when harvesting stops are discarded
+
+        Parameters
+        ----------
+        recording_path: str
+            the directory to which the recording is written
+        num_instances: int
+            the number of game instances that are harvested at the same time
+        state_batch: int
+            the number of states that the game sends in each message
+        dense_reward: bool
+            whether the recorded rewards are dense, as with `FootsiesEnv`
+        chunk_size: int
+            the number of rows kept in memory before they're flushed to disk
+        compress: bool
+            whether the recording is compressed, as with `FootsiesRecorder`
+        overwrite: bool
+            whether to overwrite an existing recording in `recording_path`. If not, an exception is raised if there is one
+        seed: int
+            if not `None`, the bots of each game instance are seeded with `seed + i`, where `i` is the instance's index. The seed is only applied once the game
+            receives it, after the game instances have already started playing, so harvesting is not reproducible
+        port_start: int
+            the port from which to search for free ports for the game instances, with the "tcp" transport and without `ephemeral_ports`. The `psutil` module is required in that case
+        **env_kwargs:
+            the arguments of `FootsiesEnv` with which the game instances are launched, such as `game_path`, `fast_forward_speed`, `transport` and `ephemeral_ports`.
+            The game instances always use the "binary" state format, the "synced_non_blocking" sync mode (so that the game waits for the states to be sent) and the in-game bot for both players
+        """
+        if num_instances < 1:
+            raise ValueError(f"the number of instances must be positive, got {num_instances}")
+        if state_batch < 1:
+            raise ValueError(f"the state batch must be positive, got {state_batch}")
+        for argument in ("backend", "by_example", "opponent", "vs_player", "state_format", "sync_mode", "skip_instancing", "instance_pool"):
+            if argument in env_kwargs:
+                raise ValueError(f"the '{argument}' argument can't be set, since it's fixed by the harvester")
+
+        env_kwargs.setdefault("fast_forward_speed", 20.0)
+        if env_kwargs.get("transport", "tcp") == "tcp" and not env_kwargs.get("ephemeral_ports", False):
+            ports = FootsiesEnv.find_ports_multiple(num_instances, start=port_start)
+        else:
+            ports = [{}] * num_instances
+
+        self.dense_reward = dense_reward
+        self.num_episodes = 0
+
+        self._instances = [
+            _HarvestedInstance(
+                _HarvestingFootsiesEnv(
+                    state_batch,
+                    **env_kwargs,
+                    **instance_ports,
+                    by_example=True,
+                    state_format="binary",
+                    sync_mode="synced_non_blocking",
+                )
+            )
+            for instance_ports in ports
+        ]
+        self._selector = selectors.DefaultSelector()
+        # Created before launching the game instances, so that an existing recording is not overwritten by mistake
+        self._writer = FootsiesRecordingWriter(
+            recording_path,
+            recording_columns(self._instances[0].env.observation_space, self._instances[0].env.action_space),
+            chunk_size=chunk_size,
+            compress=compress,
+            overwrite=overwrite,
+        )
+
+        try:
+            # The game instances are all launched before connecting to any, so that they start up at the same time
+            for instance in self._instances:
+                instance.env._instantiate_game()
+            for i, instance in enumerate(self._instances):
+                instance.env._connect_to_game()
+                if seed is not None:
+                    instance.env._request_seed_set(seed + i)
+                self._selector.register(instance.env.comm, selectors.EVENT_READ, instance)
+
+        except BaseException:
+            self.close()
+            raise
+
+    def _receive(self, instance: _HarvestedInstance):
+        """Receive the batches of states that arrived from the game instance, and write the episodes that they complete"""
+        reader = instance.env._comm_reader
+        while True:
+            # Decoded out of the receive buffer right away, since it's reused
+            states = np.frombuffer(reader.recv_message(), dtype=FOOTSIES_STATE_WIRE_DTYPE).astype(FOOTSIES_STATE_DTYPE)
+            for episode in instance.take_episodes(states):
+                self._writer.write(episode_rows(episode, self.dense_reward))
+                self.num_episodes += 1
+            if not reader.has_buffered_message():
+                break
+
+    def harvest(self, num_rows: int) -> int:
+        """Harvest until at least `num_rows` more rows are written, returning the number of rows that were written. Only whole episodes are written"""
+        target = self._writer.num_rows + num_rows
+        rows_before = self._writer.num_rows
+        while self._writer.num_rows < target:
+            events = self._selector.select(FootsiesEnv.COMM_TIMEOUT)
+            if not events:
+                raise FootsiesGameClosedError("no game instance sent any state for too long, will assume they're closed")
+            for key, _ in events:
+                self._receive(key.data)
+
+        return self._writer.num_rows - rows_before
+
+    @property
+    def num_rows(self) -> int:
+        """The number of rows written so far"""
+        return self._writer.num_rows
+
+    def close(self):
+        """Write the remaining rows to disk and close the game instances"""
+        self._writer.close()
+        self._selector.close()
+        for instance in self._instances:
+            instance.env.close()
+        self._instances.clear()
+
+    def __enter__(self) -> "FootsiesHarvester":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,3 +1,4 @@
+import numpy as np
 from enum import Enum
 from dataclasses import dataclass
 
@@ -40,3 +41,50 @@ class FootsiesMove(Enum):
 # Helper structures to simplify move IDs (0, 1, 2, ...)
 FOOTSIES_MOVE_INDEX_TO_MOVE = list(FootsiesMove)
 FOOTSIES_MOVE_ID_TO_INDEX = {move.value.id: i for i, move in enumerate(FOOTSIES_MOVE_INDEX_TO_MOVE)}
+
+# Frame data of each move as NumPy arrays, indexed by move index (as in the observations)
+FOOTSIES_MOVE_IDS = np.array([move.value.id for move in FOOTSIES_MOVE_INDEX_TO_MOVE], dtype=np.int64)
+FOOTSIES_MOVE_DURATIONS = np.array([move.value.duration for move in FOOTSIES_MOVE_INDEX_TO_MOVE], dtype=np.int64)
+FOOTSIES_MOVE_STARTUPS = np.array([move.value.startup for move in FOOTSIES_MOVE_INDEX_TO_MOVE], dtype=np.int64)
+FOOTSIES_MOVE_ACTIVES = np.array([move.value.active for move in FOOTSIES_MOVE_INDEX_TO_MOVE], dtype=np.int64)
+FOOTSIES_MOVE_RECOVERIES = np.array([move.value.recovery for move in FOOTSIES_MOVE_INDEX_TO_MOVE], dtype=np.int64)
+# Moves that last indefinitely, for which the number of frames since the start of the move is not meaningful
+FOOTSIES_MOVE_INDEFINITE = np.isin(
+    FOOTSIES_MOVE_IDS, [FootsiesMove.STAND.value.id, FootsiesMove.FORWARD.value.id, FootsiesMove.BACKWARD.value.id],
+)
+
+# Moves of being hit or guarding an attack
+FOOTSIES_MOVE_HIT_GUARD = np.isin(
+    FOOTSIES_MOVE_IDS,
+    [move.value.id for move in (FootsiesMove.DAMAGE, FootsiesMove.GUARD_STAND, FootsiesMove.GUARD_CROUCH, FootsiesMove.GUARD_M, FootsiesMove.GUARD_BREAK)],
+)
+
+
+# Vectorized versions of `FootsiesMove.in_startup`, `FootsiesMove.in_active` and `FootsiesMove.in_recovery`,
+# which accept arrays (or scalars) of move indices and move frames of any matching shape
+def move_in_startup(moves: np.ndarray, frames: np.ndarray) -> np.ndarray:
+    return np.asarray(frames) < FOOTSIES_MOVE_STARTUPS[moves]
+
+
+def move_in_active(moves: np.ndarray, frames: np.ndarray) -> np.ndarray:
+    frames = np.asarray(frames)
+    startups = FOOTSIES_MOVE_STARTUPS[moves]
+    return (startups <= frames) & (frames < startups + FOOTSIES_MOVE_ACTIVES[moves])
+
+
+def move_in_recovery(moves: np.ndarray, frames: np.ndarray) -> np.ndarray:
+    return np.asarray(frames) >= FOOTSIES_MOVE_STARTUPS[moves] + FOOTSIES_MOVE_ACTIVES[moves]
+
+
+def is_p1_actionable(moves: np.ndarray, move_frames: np.ndarray) -> np.ndarray:
+    """
+    Whether player 1 can act, from the move indices and move frames of both players as in the observations (with shape `(..., 2)`).
+    Player 1 can't act while in the middle of a move that hasn't hit the opponent, or while being hit.
+    The move frames are assumed to be simplified (always 0 for moves that last indefinitely), and may be normalized
+    """
+    moves = np.asarray(moves, dtype=np.intp)
+    move_frames = np.asarray(move_frames)
+    return (
+        ((move_frames[..., 0] == 0.0) | FOOTSIES_MOVE_HIT_GUARD[moves[..., 1]])
+        & (moves[..., 0] != FOOTSIES_MOVE_ID_TO_INDEX[FootsiesMove.DAMAGE.value.id])
+    )
@@ -0,0 +1,3 @@
+from .battle import FootsiesBattle, action_to_input
+from .battle_ai import BattleAI
+from .data import FOOTSIES_FIGHTER_DATA
@@ -0,0 +1,895 @@
+"""
+Port of the battle engine of FOOTSIES (`BattleCore.cs` and `Fighter.cs` in the game's source) to Python.
+
+The port is meant to be faithful down to the arithmetic: positions and boxes use single-precision floats like Unity does,
+and the order of the operations is kept the same, so that the same inputs produce exactly the same environment states as the game.
+Names, quirks and comments follow the game's source, so both can be compared side by side.
+"""
+import numpy as np
+from enum import Enum
+from typing import Dict, List, Tuple, Union
+from ..state import FootsiesState, FootsiesBattleState, FootsiesFighterState
+from .data import ActionData, ActionType, FighterData, FOOTSIES_FIGHTER_DATA, BATTLE_AREA_WIDTH, FIXED_DELTA_TIME
+
+F32 = np.float32
+
+_DELTA_TIME = F32(FIXED_DELTA_TIME)
+_ONE = F32(1)
+_MINUS_ONE = F32(-1)
+_TWO = F32(2)
+
+# Action IDs referenced by the battle rules (`CommonActionID` in the game's source)
+STAND = 0
+FORWARD = 1
+BACKWARD = 2
+DASH_FORWARD = 10
+DASH_BACKWARD = 11
+N_ATTACK = 100
+B_ATTACK = 105
+N_SPECIAL = 110
+B_SPECIAL = 115
+GUARD_BREAK = 310
+GUARD_PROXIMITY = 350
+WIN = 510
+
+# Input bit flags (`InputDefine` in the game's source)
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_ATTACK = 4
+
+
+class DamageResult(Enum):
+    DAMAGE = 1
+    GUARD = 2
+    GUARD_BREAK = 3
+
+
+class RoundState(Enum):
+    STOP = 0
+    INTRO = 1
+    FIGHT = 2
+    KO = 3
+    END = 4
+
+
+def action_to_input(action: "tuple[bool, bool, bool]") -> int:
+    """Convert an environment action (left, right, attack) into the game's input bit flags"""
+    return (INPUT_LEFT if action[0] else 0) | (INPUT_RIGHT if action[1] else 0) | (INPUT_ATTACK if action[2] else 0)
+
+
+class Box:
+    """Box centered horizontally on `x` and resting on `y`, as `BoxBase` in the game's source"""
+
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x: np.float32, y: np.float32, width: np.float32, height: np.float32):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def x_min(self) -> np.float32:
+        return self.x - self.width / _TWO
+
+    @property
+    def x_max(self) -> np.float32:
+        return self.x + self.width / _TWO
+
+    @property
+    def y_min(self) -> np.float32:
+        return self.y
+
+    @property
+    def y_max(self) -> np.float32:
+        return self.y + self.height
+
+    def overlaps(self, other: "Box") -> bool:
+        return other.x_max >= self.x_min and other.x_min <= self.x_max and other.y_max >= self.y_min and other.y_min <= self.y_max
+
+    def rect_dict(self) -> dict:
+        return {"x": float(self.x), "y": float(self.y), "width": float(self.width), "height": float(self.height)}
+
+
+class Hitbox(Box):
+    __slots__ = ("proximity", "attack_id")
+
+    def __init__(self, x: np.float32, y: np.float32, width: np.float32, height: np.float32, proximity: bool, attack_id: int):
+        super().__init__(x, y, width, height)
+        self.proximity = proximity
+        self.attack_id = attack_id
+
+
+def _rect_f32(rect: "tuple[float, float, float, float]") -> "tuple[np.float32, np.float32, np.float32, np.float32]":
+    return tuple(F32(v) for v in rect)
+
+
+class _CompiledAction:
+    """Action data with single-precision rectangles, and the frame data of every frame looked up in advance"""
+
+    def __init__(self, action: ActionData, fighter_data: FighterData):
+        self.id = action.id
+        self.type = action.type
+        self.frame_count = action.frame_count
+        self.is_loop = action.is_loop
+        self.loop_from_frame = action.loop_from_frame
+        self.always_cancelable = action.always_cancelable
+
+        base_hurtbox_rect = _rect_f32(fighter_data.base_hurtbox_rect)
+        base_pushbox_rect = _rect_f32(fighter_data.base_pushbox_rect)
+
+        last_frame = max(
+            (data.end_frame for data in (*action.hitboxes, *action.hurtboxes, *action.pushboxes, *action.movements, *action.cancels)),
+            default=0,
+        )
+        frames = range(last_frame + 1)
+
+        def active(data, frame: int) -> bool:
+            return data.start_frame <= frame <= data.end_frame
+
+        # All data that is active in the frame, in order
+        self._hitboxes = [
+            tuple((*_rect_f32(data.rect), data.proximity, data.attack_id) for data in action.hitboxes if active(data, frame))
+            for frame in frames
+        ]
+        self._hurtboxes = [
+            tuple(base_hurtbox_rect if data.use_base_rect else _rect_f32(data.rect) for data in action.hurtboxes if active(data, frame))
+            for frame in frames
+        ]
+        self._cancels = [
+            tuple(data for data in action.cancels if active(data, frame))
+            for frame in frames
+        ]
+        # Only the first data that is active in the frame
+        self._pushboxes = [
+            next((base_pushbox_rect if data.use_base_rect else _rect_f32(data.rect) for data in action.pushboxes if active(data, frame)), None)
+            for frame in frames
+        ]
+        self._movements = [
+            next((F32(data.velocity_x) for data in action.movements if active(data, frame)), None)
+            for frame in frames
+        ]
+
+    def hitboxes(self, frame: int) -> tuple:
+        return self._hitboxes[frame] if 0 <= frame < len(self._hitboxes) else ()
+
+    def hurtboxes(self, frame: int) -> tuple:
+        return self._hurtboxes[frame] if 0 <= frame < len(self._hurtboxes) else ()
+
+    def cancels(self, frame: int) -> tuple:
+        return self._cancels[frame] if 0 <= frame < len(self._cancels) else ()
+
+    def pushbox(self, frame: int) -> Union[tuple, None]:
+        return self._pushboxes[frame] if 0 <= frame < len(self._pushboxes) else None
+
+    def movement(self, frame: int) -> Union[np.float32, None]:
+        return self._movements[frame] if 0 <= frame < len(self._movements) else None
+
+
+class _CompiledFighterData:
+    def __init__(self, fighter_data: FighterData):
+        self.start_guard_health = fighter_data.start_guard_health
+        self.forward_move_speed = F32(fighter_data.forward_move_speed)
+        self.backward_move_speed = F32(fighter_data.backward_move_speed)
+        self.dash_allow_frame = fighter_data.dash_allow_frame
+        self.special_attack_hold_frame = fighter_data.special_attack_hold_frame
+        self.can_cancel_on_whiff = fighter_data.can_cancel_on_whiff
+        self.actions: Dict[int, _CompiledAction] = {
+            action_id: _CompiledAction(action, fighter_data) for action_id, action in fighter_data.actions.items()
+        }
+        self.attacks = fighter_data.attacks
+
+
+class Fighter:
+    INPUT_RECORD_FRAME = 180
+
+    def __init__(self, fighter_data: _CompiledFighterData):
+        self.fighter_data = fighter_data
+
+        self.position_x = F32(0)
+        self.position_y = F32(0)
+        self.velocity_x = F32(0)
+        self.is_face_right = True
+
+        self.hitboxes: List[Hitbox] = []
+        self.hurtboxes: List[Box] = []
+        self.pushbox: Box = None
+
+        self.vital_health = 0
+        self.guard_health = 0
+
+        self.current_action_id = STAND
+        self.current_action_frame = 0
+        self.current_action_hit_count = 0
+
+        self.current_hit_stun_frame = 0
+
+        # Input history as ring buffers, where index `i` of the game's arrays is at `(_input_head + i) % INPUT_RECORD_FRAME`
+        self._input = [0] * self.INPUT_RECORD_FRAME
+        self._input_down = [0] * self.INPUT_RECORD_FRAME
+        self._input_up = [0] * self.INPUT_RECORD_FRAME
+        self._input_head = 0
+
+        self.is_input_backward = False
+        self.is_reserve_proximity_guard = False
+
+        self.buffer_action_id = -1
+        self.reserve_damage_action_id = -1
+
+        self.sprite_shake_position = 0
+        self.max_sprite_shake_frame = 6
+
+        self.has_won = False
+
+    @property
+    def is_dead(self) -> bool:
+        return self.vital_health <= 0
+
+    @property
+    def current_action(self) -> _CompiledAction:
+        return self.fighter_data.actions[self.current_action_id]
+
+    @property
+    def is_action_end(self) -> bool:
+        return self.current_action_frame >= self.current_action.frame_count
+
+    def input(self, frame: int) -> int:
+        """The input `frame` frames ago"""
+        return self._input[(self._input_head + frame) % self.INPUT_RECORD_FRAME]
+
+    def setup_battle_start(self, start_position_x: np.float32, is_player_one: bool):
+        self.position_x = start_position_x
+        self.position_y = F32(0)
+        self.is_face_right = is_player_one
+
+        self.vital_health = 1
+        self.guard_health = self.fighter_data.start_guard_health
+        self.has_won = False
+
+        self.velocity_x = F32(0)
+
+        self.clear_input()
+
+        self._set_current_action(STAND)
+
+    def increment_action_frame(self):
+        # Decrease sprite shake count and swap +/-
+        if abs(self.sprite_shake_position) > 0:
+            self.sprite_shake_position *= -1
+            self.sprite_shake_position += -1 if self.sprite_shake_position > 0 else 1
+
+        # If fighter is in hit stun then the action frame stay the same
+        if self.current_hit_stun_frame > 0:
+            self.current_hit_stun_frame -= 1
+            return
+
+        self.current_action_frame += 1
+
+        # For loop motion (winning pose etc.) set action frame back to loop start frame
+        if self.is_action_end:
+            action = self.current_action
+            if action.is_loop:
+                self.current_action_frame = action.loop_from_frame
+
+    def update_input(self, input: int):
+        # Shift input history by 1 frame
+        self._input_head = (self._input_head - 1) % self.INPUT_RECORD_FRAME
+        previous_input = self._input[(self._input_head + 1) % self.INPUT_RECORD_FRAME]
+
+        # Insert new input data
+        self._input[self._input_head] = input
+        self._input_down[self._input_head] = (input ^ previous_input) & input
+        self._input_up[self._input_head] = (input ^ previous_input) & ~input
+
+    def update_intro_action(self):
+        self.request_action(STAND)
+
+    def update_action_request(self):
+        # If won then just request win animation
+        if self.has_won:
+            self.request_action(WIN)
+            return
+
+        # If there is any reserve damage action, set that to current action
+        # Use for playing damage motion after hit stun ended (only use this for guard break currently)
+        if self.reserve_damage_action_id != -1 and self.current_hit_stun_frame <= 0:
+            self._set_current_action(self.reserve_damage_action_id)
+            self.reserve_damage_action_id = -1
+            return
+
+        # If there is any buffer action, set that to current action
+        # Use for canceling normal to special attack
+        if self.buffer_action_id != -1 and self._can_cancel_attack() and self.current_hit_stun_frame <= 0:
+            self._set_current_action(self.buffer_action_id)
+            self.buffer_action_id = -1
+            return
+
+        current_input = self._input[self._input_head]
+        is_forward = self._is_forward_input(current_input)
+        is_backward = self._is_backward_input(current_input)
+        is_attack = self._is_attack_input(self._input_down[self._input_head])
+        if self._check_special_attack_input():
+            if is_backward or is_forward:
+                self.request_action(B_SPECIAL)
+            else:
+                self.request_action(N_SPECIAL)
+        elif is_attack:
+            if self.current_action_id in (N_ATTACK, B_ATTACK) and not self.is_action_end:
+                self.request_action(N_SPECIAL)
+            else:
+                if is_backward or is_forward:
+                    self.request_action(B_ATTACK)
+                else:
+                    self.request_action(N_ATTACK)
+
+        if self._check_forward_dash_input():
+            self.request_action(DASH_FORWARD)
+        elif self._check_backward_dash_input():
+            self.request_action(DASH_BACKWARD)
+
+        # for proximity guard check
+        self.is_input_backward = is_backward
+
+        if is_forward and is_backward:
+            self.request_action(STAND)
+        elif is_forward:
+            self.request_action(FORWARD)
+        elif is_backward:
+            if self.is_reserve_proximity_guard:
+                self.request_action(GUARD_PROXIMITY)
+            else:
+                self.request_action(BACKWARD)
+        else:
+            self.request_action(STAND)
+
+        self.is_reserve_proximity_guard = False
+
+    def update_movement(self):
+        if self.current_hit_stun_frame > 0:
+            return
+
+        # Position changes from walking forward and backward
+        sign = _ONE if self.is_face_right else _MINUS_ONE
+        if self.current_action_id == FORWARD:
+            self.position_x += self.fighter_data.forward_move_speed * sign * _DELTA_TIME
+            return
+        elif self.current_action_id == BACKWARD:
+            self.position_x -= self.fighter_data.backward_move_speed * sign * _DELTA_TIME
+            return
+
+        # Position changes from action data
+        velocity_x = self.current_action.movement(self.current_action_frame)
+        if velocity_x is not None:
+            self.velocity_x = velocity_x
+            if velocity_x != 0:
+                self.position_x += velocity_x * sign * _DELTA_TIME
+
+    def update_boxes(self):
+        """Copy data from current action and convert relative box position with fighter position"""
+        action = self.current_action
+        frame = self.current_action_frame
+        sign = _ONE if self.is_face_right else _MINUS_ONE
+        x, y = self.position_x, self.position_y
+
+        self.hitboxes = [
+            Hitbox(x + (rect_x * sign), y + rect_y, width, height, proximity, attack_id)
+            for rect_x, rect_y, width, height, proximity, attack_id in action.hitboxes(frame)
+        ]
+        self.hurtboxes = [
+            Box(x + (rect_x * sign), y + rect_y, width, height)
+            for rect_x, rect_y, width, height in action.hurtboxes(frame)
+        ]
+        rect_x, rect_y, width, height = action.pushbox(frame)
+        self.pushbox = Box(x + (rect_x * sign), y + rect_y, width, height)
+
+    def apply_position_change(self, x: np.float32, y: np.float32):
+        self.position_x += x
+        self.position_y += y
+
+        for box in self.hitboxes:
+            box.x += x
+            box.y += y
+
+        for box in self.hurtboxes:
+            box.x += x
+            box.y += y
+
+        self.pushbox.x += x
+        self.pushbox.y += y
+
+    def notify_attack_hit(self):
+        self.current_action_hit_count += 1
+
+    def notify_damaged(self, attack_id: int) -> DamageResult:
+        attack_data = self.fighter_data.attacks[attack_id]
+
+        is_guard_break = False
+        if attack_data.guard_health_damage > 0:
+            self.guard_health -= attack_data.guard_health_damage
+            if self.guard_health < 0:
+                is_guard_break = True
+                self.guard_health = 0
+
+        # if in blocking motion, automatically block next attack
+        if self.current_action_id == BACKWARD or self.current_action.type == ActionType.GUARD:
+            if is_guard_break:
+                self._set_current_action(attack_data.guard_action_id)
+                self.reserve_damage_action_id = GUARD_BREAK
+                return DamageResult.GUARD_BREAK
+            else:
+                self._set_current_action(attack_data.guard_action_id)
+                return DamageResult.GUARD
+        else:
+            if attack_data.vital_health_damage > 0:
+                self.vital_health -= attack_data.vital_health_damage
+                if self.vital_health <= 0:
+                    self.vital_health = 0
+
+            self._set_current_action(attack_data.damage_action_id)
+            return DamageResult.DAMAGE
+
+    def notify_in_proximity_guard_range(self):
+        if self.is_input_backward:
+            self.is_reserve_proximity_guard = True
+
+    def can_attack_hit(self, attack_id: int) -> bool:
+        attack_data = self.fighter_data.attacks.get(attack_id)
+        if attack_data is None:
+            return True
+
+        return self.current_action_hit_count < attack_data.number_of_hit
+
+    def set_hit_stun(self, hit_stun_frame: int):
+        self.current_hit_stun_frame = hit_stun_frame
+
+    def set_sprite_shake_frame(self, sprite_shake_frame: int):
+        sprite_shake_frame = min(sprite_shake_frame, self.max_sprite_shake_frame)
+        self.sprite_shake_position = sprite_shake_frame * (-1 if self.is_face_right else 1)
+
+    def get_hit_stun_frame(self, damage_result: DamageResult, attack_id: int) -> int:
+        attack_data = self.fighter_data.attacks[attack_id]
+        if damage_result == DamageResult.GUARD:
+            return attack_data.guard_stun_frame
+        elif damage_result == DamageResult.GUARD_BREAK:
+            return attack_data.guard_break_stun_frame
+
+        return attack_data.hit_stun_frame
+
+    def request_win_action(self):
+        self.has_won = True
+
+    def request_action(self, action_id: int, start_frame: int = 0) -> bool:
+        """Request action, if condition is met then set the requested action to current action"""
+        if self.is_action_end:
+            self._set_current_action(action_id, start_frame)
+            return True
+
+        if self.current_action_id == action_id:
+            return False
+
+        action = self.current_action
+        if action.always_cancelable:
+            self._set_current_action(action_id, start_frame)
+            return True
+        else:
+            for cancel_data in action.cancels(self.current_action_frame):
+                if action_id in cancel_data.action_ids:
+                    if cancel_data.execute:
+                        self.buffer_action_id = action_id
+                        return True
+                    elif cancel_data.buffer:
+                        self.buffer_action_id = action_id
+
+        return False
+
+    def clear_input(self):
+        self._input = [0] * self.INPUT_RECORD_FRAME
+        self._input_down = [0] * self.INPUT_RECORD_FRAME
+        self._input_up = [0] * self.INPUT_RECORD_FRAME
+        self._input_head = 0
+
+    def _can_cancel_attack(self) -> bool:
+        return self.fighter_data.can_cancel_on_whiff or self.current_action_hit_count > 0
+
+    def _set_current_action(self, action_id: int, start_frame: int = 0):
+        self.current_action_id = action_id
+        self.current_action_frame = start_frame
+
+        self.current_action_hit_count = 0
+        self.buffer_action_id = -1
+        self.reserve_damage_action_id = -1
+        self.sprite_shake_position = 0
+
+    def _check_special_attack_input(self) -> bool:
+        """Special attack input check (hold and release)"""
+        if not self._is_attack_input(self._input_up[self._input_head]):
+            return False
+
+        for i in range(1, self.fighter_data.special_attack_hold_frame):
+            if not self._is_attack_input(self.input(i)):
+                return False
+
+        return True
+
+    def _check_forward_dash_input(self) -> bool:
+        if not self._is_forward_input(self._input_down[self._input_head]):
+            return False
+
+        dash_allow_frame = self.fighter_data.dash_allow_frame
+        for i in range(1, dash_allow_frame):
+            if self._is_backward_input(self.input(i)):
+                return False
+
+            if self._is_forward_input(self.input(i)):
+                for j in range(i + 1, i + dash_allow_frame):
+                    if not self._is_forward_input(self.input(j)) and not self._is_backward_input(self.input(j)):
+                        return True
+                return False
+
+        return False
+
+    def _check_backward_dash_input(self) -> bool:
+        if not self._is_backward_input(self._input_down[self._input_head]):
+            return False
+
+        dash_allow_frame = self.fighter_data.dash_allow_frame
+        for i in range(1, dash_allow_frame):
+            if self._is_forward_input(self.input(i)):
+                return False
+
+            if self._is_backward_input(self.input(i)):
+                for j in range(i + 1, i + dash_allow_frame):
+                    if not self._is_forward_input(self.input(j)) and not self._is_backward_input(self.input(j)):
+                        return True
+                return False
+
+        return False
+
+    def _is_attack_input(self, input: int) -> bool:
+        return (input & INPUT_ATTACK) > 0
+
+    def _is_forward_input(self, input: int) -> bool:
+        return (input & (INPUT_RIGHT if self.is_face_right else INPUT_LEFT)) > 0
+
+    def _is_backward_input(self, input: int) -> bool:
+        return (input & (INPUT_LEFT if self.is_face_right else INPUT_RIGHT)) > 0
+
+    def save_state(self) -> FootsiesFighterState:
+        def history(ring: List[int]) -> List[int]:
+            return ring[self._input_head:] + ring[:self._input_head]
+
+        return FootsiesFighterState(
+            position=[float(self.position_x), float(self.position_y)],
+            velocity_x=float(self.velocity_x),
+            isFaceRight=self.is_face_right,
+            hitboxes=[
+                {"rect": hitbox.rect_dict(), "proximity": hitbox.proximity, "attackID": hitbox.attack_id}
+                for hitbox in self.hitboxes
+            ],
+            hurtboxes=[hurtbox.rect_dict() for hurtbox in self.hurtboxes],
+            pushbox=self.pushbox.rect_dict(),
+            vitalHealth=self.vital_health,
+            guardHealth=self.guard_health,
+            currentActionID=self.current_action_id,
+            currentActionFrame=self.current_action_frame,
+            currentActionHitCount=self.current_action_hit_count,
+            currentHitStunFrame=self.current_hit_stun_frame,
+            input=history(self._input),
+            inputDown=history(self._input_down),
+            inputUp=history(self._input_up),
+            isInputBackward=self.is_input_backward,
+            isReserveProximityGuard=self.is_reserve_proximity_guard,
+            bufferActionID=self.buffer_action_id,
+            reserveDamageActionID=self.reserve_damage_action_id,
+            spriteShakePosition=self.sprite_shake_position,
+            maxSpriteShakeFrame=self.max_sprite_shake_frame,
+            hasWon=self.has_won,
+        )
+
+    def load_state(self, state: FootsiesFighterState):
+        def box(rect: dict) -> Box:
+            return Box(F32(rect["x"]), F32(rect["y"]), F32(rect["width"]), F32(rect["height"]))
+
+        self.position_x = F32(state.position[0])
+        self.position_y = F32(state.position[1])
+        self.velocity_x = F32(state.velocity_x)
+        self.is_face_right = state.isFaceRight
+
+        self.hitboxes = [
+            Hitbox(*(F32(hitbox["rect"][k]) for k in ("x", "y", "width", "height")), hitbox["proximity"], hitbox["attackID"])
+            for hitbox in state.hitboxes
+        ]
+        self.hurtboxes = [box(hurtbox) for hurtbox in state.hurtboxes]
+        self.pushbox = box(state.pushbox)
+
+        self.vital_health = state.vitalHealth
+        self.guard_health = state.guardHealth
+
+        self.current_action_id = state.currentActionID
+        self.current_action_frame = state.currentActionFrame
+        self.current_action_hit_count = state.currentActionHitCount
+
+        self.current_hit_stun_frame = state.currentHitStunFrame
+
+        self._input = list(state.input)
+        self._input_down = list(state.inputDown)
+        self._input_up = list(state.inputUp)
+        self._input_head = 0
+
+        self.is_input_backward = state.isInputBackward
+        self.is_reserve_proximity_guard = state.isReserveProximityGuard
+
+        self.buffer_action_id = state.bufferActionID
+        self.reserve_damage_action_id = state.reserveDamageActionID
+
+        self.sprite_shake_position = state.spriteShakePosition
+        self.max_sprite_shake_frame = state.maxSpriteShakeFrame
+
+        self.has_won = state.hasWon
+
+
+class FootsiesBattle:
+    # Maximum number of recorded inputs per round (`BattleCore.maxRecordingInputFrame`)
+    MAX_RECORDING_INPUT_FRAME = 60 * 60 * 5
+
+    def __init__(self, fighter_data: FighterData = FOOTSIES_FIGHTER_DATA):
+        """
+        In-process simulation of a FOOTSIES battle, as run by the game in training mode.
+
+        Every call to `advance()` runs the game until it would send the next environment state to the agent, using the current
+        inputs of each player (`p1_input` and `p2_input`, as bit flags). As in training mode, the intro, KO and end sequences last a single update
+        """
+        self.fighter_data = _CompiledFighterData(fighter_data)
+
+        self.fighter1 = Fighter(self.fighter_data)
+        self.fighter2 = Fighter(self.fighter_data)
+        self.fighters = (self.fighter1, self.fighter2)
+
+        self.round_state = RoundState.STOP
+        self.frame_count = 0
+        self.round_start_time = 0.0
+        self._fixed_time = 0.0
+
+        # The most recent input of each player, used whenever the game updates
+        self.p1_input = 0
+        self.p2_input = 0
+
+        # Only the most recently recorded inputs matter for the environment state
+        self._recording_input_count = 0
+        self._most_recent_p1_input = 0
+        self._most_recent_p2_input = 0
+
+        stage_width = F32(BATTLE_AREA_WIDTH)
+        self._stage_min_x = stage_width * _MINUS_ONE / _TWO
+        self._stage_max_x = stage_width / _TWO
+
+    def set_inputs(self, p1_action: "tuple[bool, bool, bool]", p2_action: "tuple[bool, bool, bool]"):
+        """Set the inputs of both players from environment actions"""
+        self.p1_input = action_to_input(p1_action)
+        self.p2_input = action_to_input(p2_action)
+
+    def reset(self):
+        """Stop the current round, so that the next call to `advance()` starts a new one (the game's RESET command)"""
+        self._change_round_state(RoundState.STOP)
+
+    def advance(self) -> FootsiesState:
+        """Run the battle until the next environment state is produced, which is either the state after a fight frame or the first state of a new round"""
+        state = None
+        while state is None:
+            state = self._fixed_update()
+        return state
+
+    def _fixed_update(self) -> Union[FootsiesState, None]:
+        """A single update of the game (`BattleCore.FixedUpdate`), returning the environment state if it was sent to the agent"""
+        state = None
+
+        if self.round_state == RoundState.STOP:
+            self._change_round_state(RoundState.INTRO)
+
+        elif self.round_state == RoundState.INTRO:
+            self._update_intro_state()
+            state = self._change_round_state(RoundState.FIGHT)
+
+        elif self.round_state == RoundState.FIGHT:
+            self.frame_count += 1
+
+            self._update_fight_state()
+
+            battle_over = any(f.is_dead for f in self.fighters)
+            if battle_over:
+                self._change_round_state(RoundState.KO)
+            state = self.environment_state()
+
+        elif self.round_state == RoundState.KO:
+            self._change_round_state(RoundState.END)
+
+        elif self.round_state == RoundState.END:
+            self._update_end_state()
+            self._change_round_state(RoundState.STOP)
+
+        self._fixed_time += FIXED_DELTA_TIME
+        return state
+
+    def _change_round_state(self, round_state: RoundState) -> Union[FootsiesState, None]:
+        self.round_state = round_state
+
+        if round_state == RoundState.INTRO:
+            self.fighter1.setup_battle_start(F32(-2), True)
+            self.fighter2.setup_battle_start(F32(2), False)
+
+        elif round_state == RoundState.FIGHT:
+            self.round_start_time = self._fixed_time
+            self.frame_count = -1
+
+            self._recording_input_count = 0
+
+            # Environment reset, should send initial state first before receiving actions
+            return self.environment_state()
+
+        elif round_state == RoundState.KO:
+            self.fighter1.clear_input()
+            self.fighter2.clear_input()
+
+        elif round_state == RoundState.END:
+            dead_fighters = [f for f in self.fighters if f.is_dead]
+            if len(dead_fighters) == 1:
+                if dead_fighters[0] is self.fighter1:
+                    self.fighter2.request_win_action()
+                else:
+                    self.fighter1.request_win_action()
+
+        return None
+
+    def _update_intro_state(self):
+        self._record_input(self.p1_input, self.p2_input)
+        self.fighter1.update_input(self.p1_input)
+        self.fighter2.update_input(self.p2_input)
+
+        for f in self.fighters:
+            f.increment_action_frame()
+        for f in self.fighters:
+            f.update_intro_action()
+        for f in self.fighters:
+            f.update_movement()
+        for f in self.fighters:
+            f.update_boxes()
+
+        self._update_push_character_vs_character()
+        self._update_push_character_vs_background()
+
+    def _update_fight_state(self):
+        self._record_input(self.p1_input, self.p2_input)
+        self.fighter1.update_input(self.p1_input)
+        self.fighter2.update_input(self.p2_input)
+
+        for f in self.fighters:
+            f.increment_action_frame()
+        for f in self.fighters:
+            f.update_action_request()
+        for f in self.fighters:
+            f.update_movement()
+        for f in self.fighters:
+            f.update_boxes()
+
+        self._update_push_character_vs_character()
+        self._update_push_character_vs_background()
+        self._update_hitbox_hurtbox_collision()
+
+    def _update_end_state(self):
+        for f in self.fighters:
+            f.increment_action_frame()
+        for f in self.fighters:
+            f.update_action_request()
+        for f in self.fighters:
+            f.update_movement()
+        for f in self.fighters:
+            f.update_boxes()
+
+        self._update_push_character_vs_character()
+        self._update_push_character_vs_background()
+
+    def _record_input(self, p1_input: int, p2_input: int):
+        if self._recording_input_count >= self.MAX_RECORDING_INPUT_FRAME:
+            return
+
+        self._most_recent_p1_input = p1_input
+        self._most_recent_p2_input = p2_input
+        self._recording_input_count += 1
+
+    def environment_state(self) -> FootsiesState:
+        has_recorded_input = self._recording_input_count > 0
+        return FootsiesState(
+            p1Vital=self.fighter1.vital_health,
+            p2Vital=self.fighter2.vital_health,
+            p1Guard=self.fighter1.guard_health,
+            p2Guard=self.fighter2.guard_health,
+            p1Move=self.fighter1.current_action_id,
+            p2Move=self.fighter2.current_action_id,
+            p1MoveFrame=self.fighter1.current_action_frame,
+            p2MoveFrame=self.fighter2.current_action_frame,
+            p1Position=float(self.fighter1.position_x),
+            p2Position=float(self.fighter2.position_x),
+            globalFrame=self.frame_count,
+            p1MostRecentAction=self._most_recent_p1_input if has_recorded_input else 0,
+            p2MostRecentAction=self._most_recent_p2_input if has_recorded_input else 0,
+            p1Hitstun=self.fighter1.current_hit_stun_frame,
+            p2Hitstun=self.fighter2.current_hit_stun_frame,
+        )
+
+    def _update_push_character_vs_character(self):
+        # The game uses Unity's `Rect` here rather than the boxes, whose `x` is the left edge rather than the center
+        rect1 = self.fighter1.pushbox
+        rect2 = self.fighter2.pushbox
+        rect1_x_max = rect1.x + rect1.width
+        rect2_x_max = rect2.x + rect2.width
+
+        if rect2_x_max > rect1.x and rect2.x < rect1_x_max and rect2.y + rect2.height > rect1.y and rect2.y < rect1.y + rect1.height:
+            if self.fighter1.position_x < self.fighter2.position_x:
+                overlap = rect1_x_max - rect2.x
+                self.fighter1.apply_position_change(overlap * _MINUS_ONE / _TWO, self.fighter1.position_y)
+                self.fighter2.apply_position_change(overlap * _ONE / _TWO, self.fighter2.position_y)
+            elif self.fighter1.position_x > self.fighter2.position_x:
+                overlap = rect2_x_max - rect1.x
+                self.fighter1.apply_position_change(overlap * _ONE / _TWO, self.fighter1.position_y)
+                self.fighter2.apply_position_change(overlap * _MINUS_ONE / _TWO, self.fighter1.position_y)
+
+    def _update_push_character_vs_background(self):
+        for f in self.fighters:
+            if f.pushbox.x_min < self._stage_min_x:
+                f.apply_position_change(self._stage_min_x - f.pushbox.x_min, f.position_y)
+            elif f.pushbox.x_max > self._stage_max_x:
+                f.apply_position_change(self._stage_max_x - f.pushbox.x_max, f.position_y)
+
+    def _update_hitbox_hurtbox_collision(self):
+        for attacker in self.fighters:
+            is_hit = False
+            is_proximity = False
+            hit_attack_id = 0
+
+            for damaged in self.fighters:
+                if attacker is damaged:
+                    continue
+
+                for hitbox in attacker.hitboxes:
+                    # continue if attack already hit
+                    if not attacker.can_attack_hit(hitbox.attack_id):
+                        continue
+
+                    for hurtbox in damaged.hurtboxes:
+                        if hitbox.overlaps(hurtbox):
+                            if hitbox.proximity:
+                                is_proximity = True
+                            else:
+                                is_hit = True
+                                hit_attack_id = hitbox.attack_id
+                                break
+
+                    if is_hit:
+                        break
+
+                if is_hit:
+                    attacker.notify_attack_hit()
+                    damage_result = damaged.notify_damaged(hit_attack_id)
+
+                    hit_stun_frame = attacker.get_hit_stun_frame(damage_result, hit_attack_id)
+                    attacker.set_hit_stun(hit_stun_frame)
+                    damaged.set_hit_stun(hit_stun_frame)
+                    damaged.set_sprite_shake_frame(hit_stun_frame // 3)
+
+                elif is_proximity:
+                    damaged.notify_in_proximity_guard_range()
+
+    def save_state(self) -> FootsiesBattleState:
+        return FootsiesBattleState(
+            p1State=self.fighter1.save_state(),
+            p2State=self.fighter2.save_state(),
+            roundStartTime=self.round_start_time,
+            frameCount=self.frame_count,
+        )
+
+    def load_state(self, battle_state: FootsiesBattleState):
+        self.fighter1.load_state(battle_state.p1State)
+        self.fighter2.load_state(battle_state.p2State)
+
+        self.round_start_time = battle_state.roundStartTime
+        self.frame_count = battle_state.frameCount
@@ -0,0 +1,267 @@
+"""
+Port of the in-game bot of FOOTSIES (`BattleAI.cs` in the game's source) to Python, evaluated on a whole batch of battles at once.
+
+The decision logic is the same as the game's, but random choices are made with NumPy's random number generator,
+so the same seed doesn't lead to the same choices as in the game.
+"""
+import numpy as np
+from typing import Sequence, Union
+from ..state import FootsiesState
+from ..moves import FootsiesMove, FOOTSIES_MOVE_IDS
+from .battle import INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK
+
+# Relative inputs of the movement patterns, converted to the actual inputs depending on the side of the bot
+_F = 1
+_B = 2
+_A = INPUT_ATTACK
+
+
+def _dash_forward() -> list:
+    return [_F, 0, _F]
+
+
+def _dash_backward() -> list:
+    # The game's bot enqueues forward inputs for the backward dash as well
+    return [_F, 0, _F]
+
+
+# Movement patterns (`AddNeutralMovement`, `AddFarApproach1`, ...)
+_MOVE_NEUTRAL = 0
+_MOVE_FAR_APPROACH_1 = 1
+_MOVE_FAR_APPROACH_2 = 2
+_MOVE_MID_APPROACH_1 = 3
+_MOVE_MID_APPROACH_2 = 4
+_MOVE_FALL_BACK_1 = 5
+_MOVE_FALL_BACK_2 = 6
+
+_MOVE_PATTERNS = [
+    [0] * 30,
+    [_F] * 40 + [_B] * 10 + [_F] * 30 + [_B] * 10,
+    _dash_forward() + [_B] * 25 + _dash_forward() + [_B] * 25,
+    [_F] * 30 + [_B] * 10 + [_F] * 20 + [_B] * 10,
+    _dash_forward() + [_B] * 30,
+    [_B] * 60,
+    _dash_backward() + [_B] * 60,
+]
+
+# Attack patterns (`AddNoAttack`, `AddOneHitImmediateAttack`, ...)
+_ATTACK_NONE = 0
+_ATTACK_ONE_HIT_IMMEDIATE = 1
+_ATTACK_TWO_HIT_IMMEDIATE = 2
+_ATTACK_IMMEDIATE_SPECIAL = 3
+_ATTACK_DELAY_SPECIAL = 4
+
+_ATTACK_PATTERNS = [
+    [0] * 30,
+    [_A] + [0] * 18,
+    [_A] + [0] * 3 + [_A] + [0] * 18,
+    [_A] * 60 + [0],
+    [_A] * 120 + [0],
+]
+
+# The bot's choices depend on the distance between the fighters, divided into these ranges (greater than each threshold, in order)
+_DISTANCE_THRESHOLDS = np.array([4.0, 3.0, 2.5, 2.0], dtype=np.float32)
+
+# Choices for each distance range, picked uniformly at random (`SelectMovement`)
+_MOVE_CHOICES = [
+    [_MOVE_FAR_APPROACH_1, _MOVE_FAR_APPROACH_2],
+    [_MOVE_MID_APPROACH_1, _MOVE_MID_APPROACH_1, _MOVE_MID_APPROACH_2, _MOVE_MID_APPROACH_2, _MOVE_FAR_APPROACH_1, _MOVE_FAR_APPROACH_2, _MOVE_NEUTRAL],
+    [_MOVE_MID_APPROACH_1, _MOVE_MID_APPROACH_2, _MOVE_FALL_BACK_1, _MOVE_FALL_BACK_2, _MOVE_NEUTRAL],
+    [_MOVE_FALL_BACK_1, _MOVE_FALL_BACK_2, _MOVE_NEUTRAL, _MOVE_NEUTRAL],
+    [_MOVE_FALL_BACK_1, _MOVE_FALL_BACK_2, _MOVE_NEUTRAL],
+]
+
+# Choices for each distance range, picked uniformly at random (`SelectAttack`).
+# The first row is for when the opponent can be punished, where the bot always attacks twice
+_ATTACK_CHOICES = [
+    [_ATTACK_TWO_HIT_IMMEDIATE],
+    # The special attack is never chosen in the game's bot, due to the range of the random number
+    [_ATTACK_NONE, _ATTACK_NONE, _ATTACK_NONE, _ATTACK_NONE],
+    [_ATTACK_NONE, _ATTACK_NONE, _ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_DELAY_SPECIAL],
+    [_ATTACK_NONE, _ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_TWO_HIT_IMMEDIATE],
+    [_ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_TWO_HIT_IMMEDIATE, _ATTACK_TWO_HIT_IMMEDIATE, _ATTACK_IMMEDIATE_SPECIAL, _ATTACK_DELAY_SPECIAL],
+    [_ATTACK_ONE_HIT_IMMEDIATE, _ATTACK_TWO_HIT_IMMEDIATE, _ATTACK_TWO_HIT_IMMEDIATE],
+]
+
+
+def _pad(rows: list) -> "tuple[np.ndarray, np.ndarray]":
+    """Table of rows of different lengths padded with zeros, and the row lengths"""
+    lengths = np.array([len(row) for row in rows], dtype=np.int64)
+    table = np.zeros((len(rows), lengths.max()), dtype=np.int64)
+    for i, row in enumerate(rows):
+        table[i, :len(row)] = row
+    return table, lengths
+
+
+_MOVE_CHOICE_TABLE, _MOVE_CHOICE_COUNTS = _pad(_MOVE_CHOICES)
+_ATTACK_CHOICE_TABLE, _ATTACK_CHOICE_COUNTS = _pad(_ATTACK_CHOICES)
+_ATTACK_PATTERN_TABLE, _ATTACK_PATTERN_LENGTHS = _pad(_ATTACK_PATTERNS)
+
+# Opponent move categories relevant for the bot's choices
+_OPPONENT_NEUTRAL = 0
+_OPPONENT_NORMAL_ATTACK = 1
+# Damaged, guard broken or performing a special attack
+_OPPONENT_PUNISHABLE = 2
+
+_MOVE_ID_TO_CATEGORY = np.zeros(max(m.value.id for m in FootsiesMove) + 1, dtype=np.int8)
+_MOVE_ID_TO_CATEGORY[[FootsiesMove.N_ATTACK.value.id, FootsiesMove.B_ATTACK.value.id]] = _OPPONENT_NORMAL_ATTACK
+_MOVE_ID_TO_CATEGORY[[
+    FootsiesMove.DAMAGE.value.id,
+    FootsiesMove.GUARD_BREAK.value.id,
+    FootsiesMove.N_SPECIAL.value.id,
+    FootsiesMove.B_SPECIAL.value.id,
+]] = _OPPONENT_PUNISHABLE
+
+
+class BattleAI:
+    # Number of past fight states that are kept, and which one is used for decisions (`maxFightStateRecord` and `fightStateReadIndex`)
+    MAX_FIGHT_STATE_RECORD = 10
+    FIGHT_STATE_READ_INDEX = 5
+
+    def __init__(self, num_envs: int = 1, is_player1: bool = False, seed: Union[int, Sequence[int], None] = None):
+        """
+        The in-game bot of FOOTSIES, playing `num_envs` battles at once.
+
+        As in the game, the bot queues movement and attack inputs according to patterns chosen at random, depending on the distance between
+        the fighters and what the opponent is doing 5 frames before. Each battle has its own queues and history of fight states, which are
+        reset at the start of every episode (environment states with frame -1).
+
+        Can be used as the `opponent` of `FootsiesEnv` (with `num_envs` of 1) or as the `batched_opponent` of `FootsiesVectorEnv`
+
+        Parameters
+        ----------
+        num_envs: int
+            the number of battles played at once
+        is_player1: bool
+            whether the bot plays as player 1 rather than player 2
+        seed: int | Sequence[int]
+            the seed of the random number generator, as accepted by `np.random.default_rng`
+        """
+        self.num_envs = num_envs
+        self.is_player1 = is_player1
+        self.rng = np.random.default_rng(seed)
+
+        forward_input, backward_input = (INPUT_RIGHT, INPUT_LEFT) if is_player1 else (INPUT_LEFT, INPUT_RIGHT)
+        relative_move_patterns, self._move_pattern_lengths = _pad(_MOVE_PATTERNS)
+        self._move_pattern_table = np.select(
+            [relative_move_patterns == _F, relative_move_patterns == _B], [forward_input, backward_input], 0,
+        )
+
+        # The queues are represented as the pattern that was enqueued and the position of the next input to dequeue
+        self._move_pattern = np.zeros(num_envs, dtype=np.int64)
+        self._move_position = self._move_pattern_lengths[self._move_pattern].copy()
+        self._attack_pattern = np.zeros(num_envs, dtype=np.int64)
+        self._attack_position = _ATTACK_PATTERN_LENGTHS[self._attack_pattern].copy()
+
+        # Ring buffers of past fight states, in which the most recent state of each battle is at `_fight_state_index`
+        self._distances = np.zeros((num_envs, self.MAX_FIGHT_STATE_RECORD), dtype=np.float32)
+        self._opponent_categories = np.zeros((num_envs, self.MAX_FIGHT_STATE_RECORD), dtype=np.int8)
+        self._fight_state_index = np.zeros(num_envs, dtype=np.int64)
+        # Number of fight states recorded in each battle. The bot does nothing until the fight state to be read has been recorded
+        self._fight_state_count = np.zeros(num_envs, dtype=np.int64)
+
+    def seed(self, seed: Union[int, Sequence[int], None]):
+        """Reset the random number generator with the given seed"""
+        self.rng = np.random.default_rng(seed)
+
+    def get_inputs(self, positions: np.ndarray, moves: np.ndarray, new_episode: np.ndarray, mask: "np.ndarray | None" = None) -> np.ndarray:
+        """
+        Get the next input of the bot in every battle, as the game's input bit flags (`getNextAIInput`).
+
+        Parameters
+        ----------
+        positions: np.ndarray
+            the positions of player 1 and player 2, with shape `(num_envs, 2)`
+        moves: np.ndarray
+            the move IDs (not indices) of player 1 and player 2, with shape `(num_envs, 2)`
+        new_episode: np.ndarray
+            whether the battle has just started, with shape `(num_envs,)`. The bot's queues and history are reset for these battles
+        mask: np.ndarray
+            which battles advance, with shape `(num_envs,)`. The other battles are left untouched and their inputs are 0. If `None`, all battles advance
+        """
+        positions = np.asarray(positions, dtype=np.float32)
+        moves = np.asarray(moves)
+        active = np.ones(self.num_envs, dtype=np.bool_) if mask is None else np.asarray(mask, dtype=np.bool_)
+        new_episode = np.asarray(new_episode, dtype=np.bool_) & active
+
+        distances = np.abs(positions[:, 1] - positions[:, 0])
+        opponent_categories = _MOVE_ID_TO_CATEGORY[moves[:, 1 if self.is_player1 else 0]]
+
+        # Record the current fight state
+        self._fight_state_index[active] = (self._fight_state_index[active] - 1) % self.MAX_FIGHT_STATE_RECORD
+        active_rows = np.flatnonzero(active)
+        self._distances[active_rows, self._fight_state_index[active_rows]] = distances[active_rows]
+        self._opponent_categories[active_rows, self._fight_state_index[active_rows]] = opponent_categories[active_rows]
+        self._fight_state_count[active] += 1
+
+        # At the start of a battle, the queues are cleared and the whole history is filled with the current fight state (`Reset`)
+        if new_episode.any():
+            self._move_position[new_episode] = self._move_pattern_lengths[self._move_pattern[new_episode]]
+            self._attack_position[new_episode] = _ATTACK_PATTERN_LENGTHS[self._attack_pattern[new_episode]]
+            self._distances[new_episode] = distances[new_episode, np.newaxis]
+            self._opponent_categories[new_episode] = opponent_categories[new_episode, np.newaxis]
+            self._fight_state_count[new_episode] = self.MAX_FIGHT_STATE_RECORD
+
+        rows = np.arange(self.num_envs)
+        read_index = (self._fight_state_index + self.FIGHT_STATE_READ_INDEX) % self.MAX_FIGHT_STATE_RECORD
+        read_distances = self._distances[rows, read_index]
+        read_opponent_categories = self._opponent_categories[rows, read_index]
+        ready = active & (self._fight_state_count > self.FIGHT_STATE_READ_INDEX)
+
+        # Index of the distance range, 0 being the farthest
+        distance_ranges = (read_distances[:, np.newaxis] <= _DISTANCE_THRESHOLDS).sum(axis=1)
+
+        inputs = np.zeros(self.num_envs, dtype=np.int64)
+
+        # Dequeue movement inputs, or choose a new pattern if the queue is empty
+        move_queued = ready & (self._move_position < self._move_pattern_lengths[self._move_pattern])
+        inputs[move_queued] |= self._move_pattern_table[self._move_pattern[move_queued], self._move_position[move_queued]]
+        self._move_position[move_queued] += 1
+
+        move_select = ready & ~move_queued
+        if move_select.any():
+            selected_ranges = distance_ranges[move_select]
+            choices = self.rng.integers(0, _MOVE_CHOICE_COUNTS[selected_ranges])
+            self._move_pattern[move_select] = _MOVE_CHOICE_TABLE[selected_ranges, choices]
+            self._move_position[move_select] = 0
+
+        # Dequeue attack inputs, or choose a new pattern if the queue is empty
+        attack_queued = ready & (self._attack_position < _ATTACK_PATTERN_LENGTHS[self._attack_pattern])
+        inputs[attack_queued] |= _ATTACK_PATTERN_TABLE[self._attack_pattern[attack_queued], self._attack_position[attack_queued]]
+        self._attack_position[attack_queued] += 1
+
+        attack_select = ready & ~attack_queued
+        if attack_select.any():
+            # The attack choices have an extra row at the start, for punishing the opponent
+            selected_ranges = distance_ranges[attack_select] + 1
+            selected_categories = read_opponent_categories[attack_select]
+            punish = (selected_categories == _OPPONENT_PUNISHABLE) | ((selected_ranges == 2) & (selected_categories == _OPPONENT_NORMAL_ATTACK))
+            selected_ranges[punish] = 0
+            choices = self.rng.integers(0, _ATTACK_CHOICE_COUNTS[selected_ranges])
+            self._attack_pattern[attack_select] = _ATTACK_CHOICE_TABLE[selected_ranges, choices]
+            self._attack_position[attack_select] = 0
+
+        return inputs
+
+    def get_state_inputs(self, states: Sequence[FootsiesState], mask: "np.ndarray | None" = None) -> np.ndarray:
+        """Get the next input of the bot in every battle from the environment states, as the game's input bit flags. If `mask` is given, only those battles advance, as in `get_inputs`"""
+        positions = [(state.p1Position, state.p2Position) for state in states]
+        moves = [(state.p1Move, state.p2Move) for state in states]
+        new_episode = [state.globalFrame == -1 for state in states]
+        return self.get_inputs(positions, moves, new_episode, mask)
+
+    def batch(self, observations: "dict | np.ndarray", infos: dict, mask: "np.ndarray | None" = None) -> np.ndarray:
+        """
+        Get the next action of the bot in every battle from batched observations and infos (as those of `FootsiesVectorEnv`), with shape `(num_envs, 3)`.
+        Observations in the array format are not decoded, the positions and moves are taken from the infos instead.
+        If `mask` is given, only those battles advance, as in `get_inputs`
+        """
+        source = observations if isinstance(observations, dict) else {key: np.stack(infos[key]) for key in ("position", "move")}
+        inputs = self.get_inputs(source["position"], FOOTSIES_MOVE_IDS[source["move"]], np.asarray(infos["frame"]) == -1, mask)
+        return (inputs[:, np.newaxis] & [INPUT_LEFT, INPUT_RIGHT, INPUT_ATTACK]) != 0
+
+    def __call__(self, obs: "dict | np.ndarray", info: dict) -> "tuple[bool, bool, bool]":
+        """Get the next action of the bot from the observation and info of a single environment, as an opponent policy of `FootsiesEnv`"""
+        source = obs if isinstance(obs, dict) else info
+        inputs = self.get_inputs([source["position"]], FOOTSIES_MOVE_IDS[[source["move"]]], [info["frame"] == -1])
+        return ((inputs[0] & INPUT_LEFT) != 0, (inputs[0] & INPUT_RIGHT) != 0, (inputs[0] & INPUT_ATTACK) != 0)
@@ -0,0 +1,153 @@
+"""
+Conformance check of the in-process battle simulation against the game.
+
+The same recorded inputs are replayed on an environment of each backend, and the environment states they produce are compared frame by frame.
+Run as a module to check against a game build:
+
+```
+python -m footsies_gym.sim.conformance --game-path Build/FOOTSIES.exe
+```
+"""
+import json
+from copy import copy
+import numpy as np
+from typing import Iterable, List, Tuple
+from ..state import FootsiesState, FOOTSIES_STATE_FIELDS
+from ..envs.footsies import FootsiesEnv
+
+# The inputs of both players at every frame of an episode, as the game's input bit flags (left = 1, right = 2, attack = 4)
+EpisodeInputs = List[Tuple[int, int]]
+
+
+def input_to_action(input: int) -> "tuple[bool, bool, bool]":
+    return ((input & 1) != 0, (input & 2) != 0, (input & 4) != 0)
+
+
+def random_inputs(num_frames: int, rng: np.random.Generator, max_hold: int = 80) -> EpisodeInputs:
+    """
+    Random inputs of both players, where each input is held for a random number of frames up to `max_hold`.
+    Holding inputs for long is required for special moves to be performed, and short holds produce dashes
+    """
+    def player_inputs() -> List[int]:
+        inputs = []
+        while len(inputs) < num_frames:
+            hold = int(rng.integers(1, max_hold + 1)) if rng.random() < 0.3 else int(rng.integers(1, 6))
+            inputs.extend([int(rng.integers(0, 8))] * hold)
+        return inputs[:num_frames]
+
+    return list(zip(player_inputs(), player_inputs()))
+
+
+class StateRecordingEnv(FootsiesEnv):
+    def __init__(self, **kwargs):
+        """FOOTSIES environment which keeps a copy of every environment state it receives, before any processing"""
+        super().__init__(opponent=self._recorded_opponent, **kwargs)
+        self.states: List[FootsiesState] = []
+        self._opponent_inputs = iter(())
+
+    def _recorded_opponent(self, obs: dict, info: dict) -> "tuple[bool, bool, bool]":
+        return input_to_action(next(self._opponent_inputs))
+
+    def _receive_and_update_state(self) -> FootsiesState:
+        state = super()._receive_and_update_state()
+        self.states.append(copy(state))
+        return state
+
+    def replay(self, inputs: EpisodeInputs) -> List[FootsiesState]:
+        """Play an episode with the given inputs, until it terminates or the inputs run out. Returns the environment states of the episode"""
+        self.states = []
+        self._opponent_inputs = iter([p2_input for _, p2_input in inputs])
+
+        self.reset()
+        # Only keep the first state of the episode
+        self.states = self.states[-1:]
+        for p1_input, _ in inputs:
+            _, _, terminated, _, _ = self.step(input_to_action(p1_input))
+            if terminated:
+                break
+
+        return self.states
+
+
+def compare_states(expected: FootsiesState, actual: FootsiesState) -> List[str]:
+    """The differences between two environment states. Positions are compared with the game's precision"""
+    differences = []
+    for field in FOOTSIES_STATE_FIELDS:
+        expected_value = getattr(expected, field)
+        actual_value = getattr(actual, field)
+        if field in ("p1Position", "p2Position"):
+            equal = np.float32(expected_value) == np.float32(actual_value)
+        else:
+            equal = expected_value == actual_value
+
+        if not equal:
+            differences.append(f"{field}: expected {expected_value}, got {actual_value}")
+
+    return differences
+
+
+def check_conformance(expected_env: StateRecordingEnv, actual_env: StateRecordingEnv, episodes: Iterable[EpisodeInputs]) -> bool:
+    """Replay the episodes on both environments, reporting the first state that differs in each episode. Returns whether all states matched"""
+    conformant = True
+    for episode, inputs in enumerate(episodes):
+        expected_states = expected_env.replay(inputs)
+        actual_states = actual_env.replay(inputs)
+
+        if len(expected_states) != len(actual_states):
+            print(f"Episode {episode}: lasted {len(actual_states)} states, expected {len(expected_states)}")
+            conformant = False
+
+        for expected, actual in zip(expected_states, actual_states):
+            differences = compare_states(expected, actual)
+            if differences:
+                print(f"Episode {episode}, frame {expected.globalFrame}:\n  " + "\n  ".join(differences))
+                conformant = False
+                break
+
+        else:
+            print(f"Episode {episode}: {len(expected_states)} states")
+
+    return conformant
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the environment states of the game and of the in-process battle simulation on the same inputs")
+    parser.add_argument("--game-path", type=str, default="Build/FOOTSIES.exe")
+    parser.add_argument("--port-start", type=int, default=11000)
+    parser.add_argument("--inputs", type=str, default=None, help="JSON file with the inputs to replay, as a list of episodes of [P1, P2] input bit flags. If not specified, random inputs are used")
+    parser.add_argument("--save-inputs", type=str, default=None, help="JSON file to which the replayed inputs are saved")
+    parser.add_argument("--episodes", type=int, default=10, help="number of episodes of random inputs")
+    parser.add_argument("--frames", type=int, default=3000, help="maximum number of frames of each episode of random inputs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.inputs is not None:
+        with open(args.inputs, "rt") as f:
+            episodes = [[tuple(frame) for frame in episode] for episode in json.load(f)]
+    else:
+        rng = np.random.default_rng(args.seed)
+        episodes = [random_inputs(args.frames, rng) for _ in range(args.episodes)]
+
+    if args.save_inputs is not None:
+        with open(args.save_inputs, "wt") as f:
+            json.dump(episodes, f)
+
+    game_env = StateRecordingEnv(
+        game_path=args.game_path,
+        fast_forward=True,
+        sync_mode="synced_non_blocking",
+        state_format="binary",
+        **FootsiesEnv.find_ports(start=args.port_start),
+    )
+    simulated_env = StateRecordingEnv(backend="python")
+
+    try:
+        conformant = check_conformance(game_env, simulated_env, episodes)
+    finally:
+        game_env.close()
+        simulated_env.close()
+
+    print("All states match" if conformant else "The simulation does not conform to the game")
+    raise SystemExit(0 if conformant else 1)
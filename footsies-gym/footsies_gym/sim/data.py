@@ -0,0 +1,431 @@
+"""
+Battle data of the FOOTSIES fighter, transcribed from the game's assets (`Assets/Fighter/F00`).
+Must be kept in sync with the assets if they change.
+
+Frame ranges are inclusive, and rectangles are `(x, y, width, height)` relative to the fighter's position when facing right.
+"""
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, Tuple
+
+
+class ActionType(IntEnum):
+    MOVEMENT = 0
+    ATTACK = 1
+    DAMAGE = 2
+    GUARD = 3
+
+
+@dataclass(frozen=True)
+class HitboxData:
+    start_frame: int
+    end_frame: int
+    rect: Tuple[float, float, float, float]
+    attack_id: int
+    proximity: bool
+
+
+@dataclass(frozen=True)
+class BoxData:
+    """Hurtbox or pushbox data"""
+
+    start_frame: int
+    end_frame: int
+    rect: Tuple[float, float, float, float]
+    use_base_rect: bool
+
+
+@dataclass(frozen=True)
+class MovementData:
+    start_frame: int
+    end_frame: int
+    velocity_x: float
+
+
+@dataclass(frozen=True)
+class CancelData:
+    start_frame: int
+    end_frame: int
+    buffer: bool
+    execute: bool
+    action_ids: Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class ActionData:
+    id: int
+    name: str
+    type: ActionType
+    frame_count: int
+    is_loop: bool = False
+    loop_from_frame: int = 0
+    hitboxes: Tuple[HitboxData, ...] = ()
+    hurtboxes: Tuple[BoxData, ...] = ()
+    pushboxes: Tuple[BoxData, ...] = ()
+    movements: Tuple[MovementData, ...] = ()
+    cancels: Tuple[CancelData, ...] = ()
+    always_cancelable: bool = False
+
+
+@dataclass(frozen=True)
+class AttackData:
+    attack_id: int
+    name: str
+    damage_action_id: int
+    guard_action_id: int
+    number_of_hit: int
+    vital_health_damage: int
+    guard_health_damage: int
+    hit_stun_frame: int
+    guard_stun_frame: int
+    guard_break_stun_frame: int
+
+
+@dataclass(frozen=True)
+class FighterData:
+    start_guard_health: int
+    forward_move_speed: float
+    backward_move_speed: float
+    dash_allow_frame: int
+    special_attack_hold_frame: int
+    can_cancel_on_whiff: bool
+    base_hurtbox_rect: Tuple[float, float, float, float]
+    base_pushbox_rect: Tuple[float, float, float, float]
+    actions: Dict[int, ActionData]
+    attacks: Dict[int, AttackData]
+
+
+# Width of the stage (`BattleCore._battleAreaWidth` in the battle scene)
+BATTLE_AREA_WIDTH = 10.0
+# Duration of a game update (the project's fixed timestep)
+FIXED_DELTA_TIME = 0.02
+
+FOOTSIES_ACTIONS = (
+    ActionData(
+        id=0,
+        name="STAND",
+        type=ActionType.MOVEMENT,
+        frame_count=24,
+        hurtboxes=(
+            BoxData(0, 59, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 59, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        always_cancelable=True,
+    ),
+    ActionData(
+        id=1,
+        name="FORWARD",
+        type=ActionType.MOVEMENT,
+        frame_count=24,
+        hurtboxes=(
+            BoxData(0, 59, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 59, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        always_cancelable=True,
+    ),
+    ActionData(
+        id=2,
+        name="BACKWARD",
+        type=ActionType.MOVEMENT,
+        frame_count=24,
+        hurtboxes=(
+            BoxData(0, 59, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 59, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        always_cancelable=True,
+    ),
+    ActionData(
+        id=10,
+        name="DASH_FORWARD",
+        type=ActionType.MOVEMENT,
+        frame_count=16,
+        hurtboxes=(
+            BoxData(0, 15, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 15, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 2, velocity_x=5.0),
+            MovementData(3, 8, velocity_x=7.0),
+            MovementData(9, 11, velocity_x=5.0),
+            MovementData(12, 13, velocity_x=2.0),
+            MovementData(14, 14, velocity_x=1.0),
+            MovementData(15, 15, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=11,
+        name="DASH_BACKWARD",
+        type=ActionType.MOVEMENT,
+        frame_count=22,
+        hurtboxes=(
+            BoxData(4, 21, (0.0, 0.0, 0.9, 1.2), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 21, (0.0, 0.0, 0.8, 1.0), use_base_rect=False),
+        ),
+        movements=(
+            MovementData(0, 2, velocity_x=-10.0),
+            MovementData(3, 8, velocity_x=-5.0),
+            MovementData(9, 12, velocity_x=-3.0),
+            MovementData(13, 14, velocity_x=-1.0),
+            MovementData(15, 15, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=100,
+        name="N_ATTACK",
+        type=ActionType.ATTACK,
+        frame_count=22,
+        hitboxes=(
+            HitboxData(0, 5, (1.5, 0.0, 3.0, 0.4), attack_id=1, proximity=True),
+            HitboxData(4, 5, (0.9, 0.0, 1.8, 0.3), attack_id=1, proximity=False),
+        ),
+        hurtboxes=(
+            BoxData(0, 21, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+            BoxData(4, 15, (0.8, 0.0, 1.6, 0.4), use_base_rect=False),
+            BoxData(16, 18, (0.5, 0.0, 1.0, 0.4), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 21, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        cancels=(
+            CancelData(1, 3, buffer=True, execute=False, action_ids=(110,)),
+            CancelData(4, 5, buffer=False, execute=True, action_ids=(110,)),
+        ),
+    ),
+    ActionData(
+        id=105,
+        name="B_ATTACK",
+        type=ActionType.ATTACK,
+        frame_count=21,
+        hitboxes=(
+            HitboxData(0, 5, (1.4, 0.5, 2.8, 0.4), attack_id=2, proximity=True),
+            HitboxData(3, 5, (0.8, 0.0, 1.6, 0.9), attack_id=2, proximity=False),
+        ),
+        hurtboxes=(
+            BoxData(0, 21, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+            BoxData(3, 14, (0.7, 0.0, 1.4, 0.9), use_base_rect=False),
+            BoxData(15, 17, (0.6, 0.0, 1.2, 0.9), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 21, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+        ),
+        cancels=(
+            CancelData(1, 2, buffer=True, execute=False, action_ids=(110,)),
+            CancelData(3, 5, buffer=False, execute=True, action_ids=(110,)),
+        ),
+    ),
+    ActionData(
+        id=110,
+        name="N_SPECIAL",
+        type=ActionType.ATTACK,
+        frame_count=44,
+        hitboxes=(
+            HitboxData(0, 14, (1.5, 0.8, 3.0, 0.2), attack_id=10, proximity=True),
+            HitboxData(11, 14, (1.0, 0.75, 2.0, 0.3), attack_id=10, proximity=False),
+        ),
+        hurtboxes=(
+            BoxData(0, 43, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+            BoxData(10, 25, (0.8, 0.7, 1.6, 0.4), use_base_rect=False),
+            BoxData(26, 28, (0.7, 0.7, 1.4, 0.4), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 43, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 3, velocity_x=2.0),
+            MovementData(4, 15, velocity_x=5.0),
+            MovementData(16, 17, velocity_x=2.0),
+            MovementData(18, 20, velocity_x=1.0),
+            MovementData(21, 21, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=115,
+        name="B_SPECIAL",
+        type=ActionType.ATTACK,
+        frame_count=55,
+        hitboxes=(
+            HitboxData(0, 5, (1.5, 0.4, 3.0, 0.3), attack_id=11, proximity=True),
+            HitboxData(2, 7, (0.6, 0.0, 1.2, 1.0), attack_id=11, proximity=False),
+        ),
+        hurtboxes=(
+            BoxData(6, 54, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 54, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 2, velocity_x=3.0),
+            MovementData(0, 10, velocity_x=2.0),
+            MovementData(10, 15, velocity_x=1.0),
+            MovementData(16, 16, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=200,
+        name="DAMAGE",
+        type=ActionType.DAMAGE,
+        frame_count=17,
+        hurtboxes=(
+            BoxData(0, 16, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 16, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 3, velocity_x=-3.0),
+            MovementData(4, 8, velocity_x=-2.0),
+            MovementData(9, 12, velocity_x=-0.5),
+            MovementData(13, 13, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=301,
+        name="GUARD_M",
+        type=ActionType.GUARD,
+        frame_count=23,
+        hurtboxes=(
+            BoxData(0, 29, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 29, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 6, velocity_x=-3.0),
+            MovementData(7, 10, velocity_x=-2.0),
+            MovementData(11, 15, velocity_x=-0.5),
+            MovementData(16, 16, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=305,
+        name="GUARD_STAND",
+        type=ActionType.GUARD,
+        frame_count=15,
+        hurtboxes=(
+            BoxData(0, 14, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 14, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 3, velocity_x=-2.0),
+            MovementData(4, 6, velocity_x=-1.0),
+            MovementData(7, 8, velocity_x=-0.5),
+            MovementData(9, 9, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=306,
+        name="GUARD_CROUCH",
+        type=ActionType.GUARD,
+        frame_count=15,
+        hurtboxes=(
+            BoxData(0, 14, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 14, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 3, velocity_x=-2.0),
+            MovementData(4, 6, velocity_x=-1.0),
+            MovementData(7, 8, velocity_x=-0.5),
+            MovementData(9, 9, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=310,
+        name="GUARD_BREAK",
+        type=ActionType.DAMAGE,
+        frame_count=36,
+        hurtboxes=(
+            BoxData(0, 35, (0.0, 0.0, 1.2, 1.2), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 35, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        movements=(
+            MovementData(0, 3, velocity_x=-2.0),
+            MovementData(4, 6, velocity_x=-1.0),
+            MovementData(7, 10, velocity_x=-0.5),
+            MovementData(11, 11, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=350,
+        name="GUARD_PROXIMITY",
+        type=ActionType.GUARD,
+        frame_count=1,
+        hurtboxes=(
+            BoxData(0, 0, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 0, (0.0, 0.0, 0.8, 1.0), use_base_rect=True),
+        ),
+        always_cancelable=True,
+    ),
+    ActionData(
+        id=500,
+        name="DEAD",
+        type=ActionType.DAMAGE,
+        frame_count=500,
+        hurtboxes=(
+            BoxData(0, 20, (0.0, 0.0, 1.0, 1.2), use_base_rect=True),
+            BoxData(21, 500, (0.0, 0.0, 1.0, 0.5), use_base_rect=False),
+        ),
+        pushboxes=(
+            BoxData(0, 9, (0.0, 0.0, 2.0, 1.0), use_base_rect=False),
+            BoxData(10, 20, (-0.25, 0.0, 2.0, 1.0), use_base_rect=False),
+            BoxData(21, 500, (-0.5, 0.0, 2.5, 0.5), use_base_rect=False),
+        ),
+        movements=(
+            MovementData(0, 19, velocity_x=-4.0),
+            MovementData(20, 39, velocity_x=-3.0),
+            MovementData(40, 49, velocity_x=-1.0),
+            MovementData(50, 50, velocity_x=0.0),
+        ),
+    ),
+    ActionData(
+        id=510,
+        name="WIN",
+        type=ActionType.MOVEMENT,
+        frame_count=33,
+        is_loop=True,
+        loop_from_frame=5,
+        hurtboxes=(
+            BoxData(0, 32, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+        ),
+        pushboxes=(
+            BoxData(0, 32, (0.0, 0.0, 0.0, 0.0), use_base_rect=True),
+        ),
+    ),
+)
+
+FOOTSIES_ATTACKS = (
+    AttackData(1, "N_ATTACK", damage_action_id=200, guard_action_id=306, number_of_hit=1, vital_health_damage=0, guard_health_damage=1, hit_stun_frame=12, guard_stun_frame=12, guard_break_stun_frame=30),
+    AttackData(10, "N_SPECIAL", damage_action_id=500, guard_action_id=301, number_of_hit=1, vital_health_damage=1, guard_health_damage=1, hit_stun_frame=0, guard_stun_frame=15, guard_break_stun_frame=30),
+    AttackData(2, "B_ATTACK", damage_action_id=200, guard_action_id=305, number_of_hit=1, vital_health_damage=0, guard_health_damage=1, hit_stun_frame=12, guard_stun_frame=12, guard_break_stun_frame=30),
+    AttackData(11, "B_SPECIAL", damage_action_id=500, guard_action_id=301, number_of_hit=1, vital_health_damage=1, guard_health_damage=1, hit_stun_frame=0, guard_stun_frame=15, guard_break_stun_frame=30),
+)
+
+FOOTSIES_FIGHTER_DATA = FighterData(
+    start_guard_health=3,
+    forward_move_speed=2.2,
+    backward_move_speed=1.8,
+    dash_allow_frame=9,
+    special_attack_hold_frame=60,
+    can_cancel_on_whiff=False,
+    base_hurtbox_rect=(0.0, 0.0, 1.5, 1.2),
+    base_pushbox_rect=(0.0, 0.0, 1.4, 1.0),
+    actions={action.id: action for action in FOOTSIES_ACTIONS},
+    attacks={attack.attack_id: attack for attack in FOOTSIES_ATTACKS},
+)
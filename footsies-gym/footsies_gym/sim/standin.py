@@ -0,0 +1,306 @@
+"""
+Stand-in for the FOOTSIES game process, which plays the in-process battle simulation behind the same command-line arguments and protocol as the game in training mode.
+It speaks every transport ("tcp", "unix" and "shm"), so that the environment's communication can be tested and benchmarked without a game build.
+
+It's launched by the environment when given as the game's command:
+
+```python
+env = FootsiesEnv(game_path=[sys.executable, "-m", "footsies_gym.sim.standin"], state_format="binary", transport="shm")
+```
+
+Rendering, fast forward and the sync modes are ignored, since the battle is always run as fast as the agent allows. Human players are not supported
+"""
+import argparse
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import numpy as np
+from typing import Dict, List
+from ..state import FootsiesBattleState, FootsiesState, FOOTSIES_STATE_FIELDS, FOOTSIES_STATE_STRUCT
+from ..envs.footsies import FootsiesEnv
+from ..envs.comms import BufferedMessageReader
+from ..envs.shm import SharedMemoryChannel
+from ..envs.exceptions import FootsiesGameClosedError
+from .battle import FootsiesBattle, RoundState, STAND, FORWARD, BACKWARD
+from .battle_ai import BattleAI
+
+# Moves of player 2 during which player 1 can act even if in the middle of a move (`CommonActionID.DAMAGE`, `GUARD_M`, `GUARD_STAND`, `GUARD_CROUCH` and `GUARD_BREAK`)
+_P2_HIT_OR_GUARDING_MOVES = frozenset((200, 301, 305, 306, 310))
+_DAMAGE = 200
+_P1_INDEFINITE_MOVES = frozenset((STAND, FORWARD, BACKWARD))
+
+_MESSAGE_SIZE_STRUCT = struct.Struct("!I")
+
+
+def _recv_exact(sckt: socket.socket, size: int) -> bytes:
+    """Receive exactly `size` bytes from the socket, without reading past them. Raises `EOFError` if the connection was closed"""
+    data = bytearray()
+    while len(data) < size:
+        chunk = sckt.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _send_with_size(sckt: socket.socket, message: bytes):
+    sckt.sendall(_MESSAGE_SIZE_STRUCT.pack(len(message)) + message)
+
+
+def _listen(address: str, port: int, unix_path: "str | None") -> socket.socket:
+    """Listen on the channel's Unix domain socket if there is one, or else on the address and port (0 to let the system choose)"""
+    if unix_path is not None:
+        if os.path.exists(unix_path):
+            os.unlink(unix_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(unix_path)
+        listener.listen(1)
+        return listener
+
+    return socket.create_server((address, port))
+
+
+def _accept(listener: socket.socket) -> socket.socket:
+    sckt, _ = listener.accept()
+    listener.close()
+    if sckt.family != socket.AF_UNIX:
+        sckt.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sckt
+
+
+def _action_input(message: bytes) -> int:
+    return (message[0] != 0) | ((message[1] != 0) << 1) | ((message[2] != 0) << 2)
+
+
+class FootsiesStandIn:
+    def __init__(self, args: argparse.Namespace):
+        """The game's side of the training protocol, for the command-line arguments `args` (as parsed by `parse_arguments()`)"""
+        self.binary_state = args.binary_state
+        self.action_repeat = args.action_repeat
+        self.p1_bot = BattleAI(is_player1=True) if args.p1_bot else None
+        self.p2_bot = BattleAI(is_player1=False)
+        self.p2_is_bot = args.p2_bot
+
+        self.battle = FootsiesBattle()
+        self.battle_state_slots: Dict[int, FootsiesBattleState] = {}
+        self.state: FootsiesState = None
+
+        # Listen on every channel before signaling that the game is ready, as the game does
+        listeners = {"p1": _listen(args.p1_address, args.p1_port, args.p1_unix_path)}
+        listeners["remote_control"] = _listen(args.remote_control_address, args.remote_control_port, args.remote_control_unix_path)
+        if not args.p2_bot:
+            listeners["p2"] = _listen(args.p2_address, args.p2_port, args.p2_unix_path)
+
+        if args.ready_port is not None:
+            ports = {channel: (listener.getsockname()[1] if listener.family != socket.AF_UNIX else 0) for channel, listener in listeners.items()}
+            ready_message = {"p1Port": ports["p1"], "p2Port": ports.get("p2", -1), "remoteControlPort": ports["remote_control"]}
+            with socket.create_connection((args.ready_address, args.ready_port)) as ready_comm:
+                _send_with_size(ready_comm, json.dumps(ready_message).encode("utf-8"))
+
+        self.comm = _accept(listeners["p1"])
+        self.remote_control_comm = _accept(listeners["remote_control"])
+        self.opponent_comm = _accept(listeners["p2"]) if "p2" in listeners else None
+        self.remote_control_reader = BufferedMessageReader(self.remote_control_comm)
+
+        self.shared_memory = SharedMemoryChannel(args.p1_shm_path, self.comm, is_game=True) if args.p1_shm_path is not None else None
+
+        if self.binary_state and not args.p1_no_state:
+            self._send_state_message(FootsiesEnv.PROTOCOL_HANDSHAKE_STRUCT.pack(FootsiesEnv.PROTOCOL_MAGIC, FootsiesEnv.PROTOCOL_VERSION))
+        self.send_states = not args.p1_no_state
+        # As in the game, states are only sent in batches to a spectating agent, which doesn't have to act on each of them
+        self.state_batch = args.p1_state_batch if self.binary_state and self.p1_bot is not None else 1
+        self._state_batch_buffer = bytearray()
+        self._state_batch_count = 0
+
+    def _send_state_message(self, message: bytes):
+        if self.shared_memory is not None:
+            self.shared_memory.send(message)
+        else:
+            _send_with_size(self.comm, message)
+
+    def _send_state(self):
+        if not self.send_states:
+            return
+
+        values = self.state.astuple()
+        if self.state_batch > 1:
+            self._state_batch_buffer += FOOTSIES_STATE_STRUCT.pack(*values)
+            self._state_batch_count += 1
+            if self._state_batch_count == self.state_batch:
+                self._send_state_message(self._state_batch_buffer)
+                self._state_batch_buffer = bytearray()
+                self._state_batch_count = 0
+        elif self.binary_state:
+            self._send_state_message(FOOTSIES_STATE_STRUCT.pack(*values))
+        else:
+            state_dict = {name: value.item() if isinstance(value, np.generic) else value for name, value in zip(FOOTSIES_STATE_FIELDS, values)}
+            self._send_state_message(json.dumps(state_dict).encode("utf-8"))
+
+    def _advance(self):
+        """Advance the battle to the next environment state. Once a round is over, its terminal state is sent and the next round starts right away"""
+        self.state = self.battle.advance()
+        while self.battle.round_state != RoundState.FIGHT:
+            self._send_state()
+            self.state = self.battle.advance()
+
+    def _should_stop_repeat(self, start_state: FootsiesState, stop_conditions: int) -> bool:
+        """Same as `TrainingRemoteActor.ShouldStopRepeat` in the game"""
+        state = self.state
+        if state.p1Guard < start_state.p1Guard or state.p2Guard < start_state.p2Guard:
+            return True
+
+        if stop_conditions & FootsiesEnv.ACTION_REPEAT_UNTIL_ACTIONABLE:
+            p1_in_move = state.p1Move not in _P1_INDEFINITE_MOVES and state.p1MoveFrame != 0
+            p2_hit_or_guarding = state.p2Move in _P2_HIT_OR_GUARDING_MOVES
+            p1_hit = state.p1Move == _DAMAGE
+            return not ((p1_in_move and not p2_hit_or_guarding) or p1_hit)
+
+        return False
+
+    def _recv_agent_action(self) -> bytes:
+        if self.shared_memory is not None:
+            return bytes(self.shared_memory.recv_message())
+        return _recv_exact(self.comm, FootsiesEnv.ACTION_REPEAT_MESSAGE_STRUCT.size if self.action_repeat else 3)
+
+    def _p2_input(self) -> int:
+        if self.p2_is_bot or self.opponent_comm is None:
+            return int(self.p2_bot.get_state_inputs([self.state])[0])
+        return _action_input(_recv_exact(self.opponent_comm, 3))
+
+    def _play(self, action_message: "bytes | None"):
+        """Play the frames of the agent's action (`None` if player 1 is the bot), and send the state once it's no longer held"""
+        frames, stop_conditions = 1, 0
+        if action_message is not None and self.action_repeat:
+            _, _, _, stop_conditions, frames = FootsiesEnv.ACTION_REPEAT_MESSAGE_STRUCT.unpack(action_message)
+            frames = max(1, frames)
+
+        start_state = self.state
+        for frame in range(frames):
+            self.battle.p1_input = int(self.p1_bot.get_state_inputs([self.state])[0]) if action_message is None else _action_input(action_message)
+            self.battle.p2_input = self._p2_input()
+            self.state = self.battle.advance()
+            if self.battle.round_state != RoundState.FIGHT or frame == frames - 1 or self._should_stop_repeat(start_state, stop_conditions):
+                break
+
+        over = self.battle.round_state != RoundState.FIGHT
+        self._send_state()
+        if over:
+            self._advance()
+            self._send_state()
+
+    def _remote_control(self, message: dict):
+        """Carry out a remote control command, as `TrainingRemoteControl` in the game"""
+        command = FootsiesEnv.RemoteControlCommand(message["command"])
+        value = message["value"]
+
+        if command == FootsiesEnv.RemoteControlCommand.RESET:
+            self.battle.reset()
+            self._advance()
+            self._send_state()
+
+        elif command == FootsiesEnv.RemoteControlCommand.STATE_SAVE:
+            _send_with_size(self.remote_control_comm, self.battle.save_state().json().encode("utf-8"))
+
+        elif command == FootsiesEnv.RemoteControlCommand.STATE_LOAD:
+            self.battle.load_state(FootsiesBattleState.from_json(value))
+            self.state = self.battle.environment_state()
+
+        elif command == FootsiesEnv.RemoteControlCommand.STATE_SAVE_SLOT:
+            self.battle_state_slots[int(value)] = self.battle.save_state()
+
+        elif command == FootsiesEnv.RemoteControlCommand.STATE_LOAD_SLOT:
+            # Slots in which nothing was saved are ignored
+            if int(value) in self.battle_state_slots:
+                self.battle.load_state(self.battle_state_slots[int(value)])
+                self.state = self.battle.environment_state()
+
+        elif command == FootsiesEnv.RemoteControlCommand.P2_BOT:
+            self.p2_is_bot = value.lower() == "true"
+
+        elif command == FootsiesEnv.RemoteControlCommand.SEED:
+            self.p2_bot.seed(int(value))
+            if self.p1_bot is not None:
+                self.p1_bot.seed([int(value), 1])
+
+    def _remote_control_pending(self) -> bool:
+        if self.remote_control_reader.has_buffered_message():
+            return True
+        readable, _, _ = select.select([self.remote_control_comm], [], [], 0.0)
+        return bool(readable)
+
+    def run(self):
+        """Play until the environment closes the connection"""
+        self._advance()
+        self._send_state()
+
+        try:
+            while True:
+                # Remote control commands are carried out before any action that the environment sent after them
+                if self._remote_control_pending():
+                    self._remote_control(json.loads(str(self.remote_control_reader.recv_message(), "utf-8")))
+                    continue
+
+                if self.p1_bot is not None:
+                    # As a spectator, the agent doesn't send actions
+                    self._play(None)
+                    continue
+
+                if self.shared_memory is not None and self.shared_memory.has_buffered_message(spin=True):
+                    # Commands that arrived while spinning were sent before the action, so they're carried out first
+                    if not self._remote_control_pending():
+                        self._play(self._recv_agent_action())
+                    continue
+
+                timeout = SharedMemoryChannel.WAKE_UP_POLL_INTERVAL if self.shared_memory is not None else None
+                readable, _, _ = select.select([self.remote_control_comm, self.comm], [], [], timeout)
+                # Commands that arrived along with the action were sent before it, so they're carried out first
+                if self.remote_control_comm in readable or self.comm not in readable:
+                    continue
+
+                if self.shared_memory is None:
+                    self._play(self._recv_agent_action())
+                elif not self.comm.recv(4096):
+                    # Only wake-ups are sent through the socket, the actions are read from the shared memory
+                    raise EOFError
+
+        except (EOFError, ConnectionError, FootsiesGameClosedError):
+            # The environment is gone
+            pass
+
+    def close(self):
+        if self.shared_memory is not None:
+            self.shared_memory.close()
+        for sckt in (self.comm, self.remote_control_comm, self.opponent_comm):
+            if sckt is not None:
+                sckt.close()
+
+
+def parse_arguments(argv: List[str]) -> argparse.Namespace:
+    """Parse the game's command-line arguments that are relevant to the stand-in, ignoring the rest (such as Unity's)"""
+    parser = argparse.ArgumentParser(description="Stand-in for the FOOTSIES game process, backed by the in-process battle simulation")
+    for channel, port in (("p1", 11000), ("p2", 11001), ("remote-control", 11002)):
+        parser.add_argument(f"--{channel}-address", type=str, default="localhost")
+        parser.add_argument(f"--{channel}-port", type=int, default=port)
+        parser.add_argument(f"--{channel}-unix-path", type=str, default=None)
+    parser.add_argument("--p1-shm-path", type=str, default=None)
+    parser.add_argument("--p1-bot", action="store_true")
+    parser.add_argument("--p2-bot", action="store_true")
+    parser.add_argument("--p1-no-state", action="store_true")
+    parser.add_argument("--p1-state-batch", type=int, default=1)
+    parser.add_argument("--binary-state", action="store_true")
+    parser.add_argument("--action-repeat", action="store_true")
+    parser.add_argument("--ready-address", type=str, default="localhost")
+    parser.add_argument("--ready-port", type=int, default=None)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+if __name__ == "__main__":
+    standin = FootsiesStandIn(parse_arguments(sys.argv[1:]))
+    try:
+        standin.run()
+    finally:
+        standin.close()
@@ -1,11 +1,79 @@
 import json
+import struct
 import dataclasses
-from typing import List
+import numpy as np
+from typing import Iterable, Iterator, List
 
 
-@dataclasses.dataclass
+# Fixed layout of the binary environment state sent by the game, with the same field order as `FootsiesState`.
+# Must be kept in sync with `EnvironmentState.WriteBytes` in the game's source
+FOOTSIES_STATE_STRUCT = struct.Struct("!8i2f5i")
+
+# The fields of `FootsiesState`, in order. The most recent actions are stored as the game's input bit flags (left = 1, right = 2, attack = 4)
+FOOTSIES_STATE_DTYPE = np.dtype([
+    ("p1Vital", np.int32),
+    ("p2Vital", np.int32),
+    ("p1Guard", np.int32),
+    ("p2Guard", np.int32),
+    ("p1Move", np.int32),
+    ("p2Move", np.int32),
+    ("p1MoveFrame", np.int32),
+    ("p2MoveFrame", np.int32),
+    ("p1Position", np.float64),
+    ("p2Position", np.float64),
+    ("globalFrame", np.int32),
+    ("p1MostRecentAction", np.uint8),
+    ("p2MostRecentAction", np.uint8),
+    ("p1Hitstun", np.int32),
+    ("p2Hitstun", np.int32),
+])
+FOOTSIES_STATE_FIELDS = FOOTSIES_STATE_DTYPE.names
+
+# The binary encoding of the environment state (`FOOTSIES_STATE_STRUCT`) as a NumPy dtype, so that messages with many consecutive states can be decoded at once
+FOOTSIES_STATE_WIRE_DTYPE = np.dtype([
+    (name, ">f4" if name in ("p1Position", "p2Position") else ">i4") for name in FOOTSIES_STATE_FIELDS
+])
+
+# Decoded actions, indexed by their bit flags
+_ACTION_BITS_TO_TUPLE = tuple(((bits & 1) != 0, (bits & 2) != 0, (bits & 4) != 0) for bits in range(8))
+
+
+def _action_bits(action: "int | tuple[bool, bool, bool]") -> int:
+    if isinstance(action, (tuple, list)):
+        return int(action[0]) | (int(action[1]) << 1) | (int(action[2]) << 2)
+    return action
+
+
+class _ActionField:
+    def __init__(self, slot):
+        """
+        Data descriptor of a most recent action field of `FootsiesState`, which keeps the game's input bit flags in the field's slot
+        and only decodes them into a tuple of 3 bools when the field is read. Either form can be assigned
+
+        Parameters
+        ----------
+        slot
+            the slot's member descriptor, created by the dataclass
+        """
+        self.slot = slot
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return _ACTION_BITS_TO_TUPLE[self.slot.__get__(instance, owner)]
+
+    def __set__(self, instance, action: "int | tuple[bool, bool, bool]"):
+        self.slot.__set__(instance, _action_bits(action))
+
+
+@dataclasses.dataclass(slots=True)
 class FootsiesState:
-    """The environment state of FOOTSIES, obtained directly from the game. Less general than `FootsiesBattleState`"""
+    """
+    The environment state of FOOTSIES, obtained directly from the game. Less general than `FootsiesBattleState`.
+
+    The most recent actions are kept as the game's input bit flags (`p1MostRecentActionBits` and `p2MostRecentActionBits`),
+    and are only decoded into tuples of 3 bools when `p1MostRecentAction` or `p2MostRecentAction` are read. Many states are best kept in a `FootsiesStateArray`
+    """
 
     p1Vital: int
     p2Vital: int
@@ -23,18 +91,39 @@ class FootsiesState:
     p1Hitstun: int
     p2Hitstun: int
 
-    def __post_init__(self):
-        self.p1MostRecentAction = (
-            (self.p1MostRecentAction & 1) != 0,
-            (self.p1MostRecentAction & 2) != 0,
-            (self.p1MostRecentAction & 4) != 0,
-        )
-        self.p2MostRecentAction = (
-            (self.p2MostRecentAction & 1) != 0,
-            (self.p2MostRecentAction & 2) != 0,
-            (self.p2MostRecentAction & 4) != 0,
+    @property
+    def p1MostRecentActionBits(self) -> int:
+        return FootsiesState.p1MostRecentAction.slot.__get__(self)
+
+    @property
+    def p2MostRecentActionBits(self) -> int:
+        return FootsiesState.p2MostRecentAction.slot.__get__(self)
+
+    def astuple(self) -> tuple:
+        """The values of the fields, in the order of `FOOTSIES_STATE_FIELDS`, with the most recent actions as bit flags"""
+        return (
+            self.p1Vital,
+            self.p2Vital,
+            self.p1Guard,
+            self.p2Guard,
+            self.p1Move,
+            self.p2Move,
+            self.p1MoveFrame,
+            self.p2MoveFrame,
+            self.p1Position,
+            self.p2Position,
+            self.globalFrame,
+            self.p1MostRecentActionBits,
+            self.p2MostRecentActionBits,
+            self.p1Hitstun,
+            self.p2Hitstun,
         )
 
+    @staticmethod
+    def from_bytes(buffer) -> "FootsiesState":
+        """Decode the environment state from its binary encoding, present at the start of `buffer`"""
+        return FootsiesState(*FOOTSIES_STATE_STRUCT.unpack_from(buffer))
+
     @staticmethod
     def from_battle_state(battle_state: "FootsiesBattleState") -> "FootsiesState":
         return FootsiesState(
@@ -73,7 +162,116 @@ class FootsiesState:
 - Frame: {self.globalFrame}
 - P1 most recent action: {self.p1MostRecentAction}
 - P2 most recent action: {self.p2MostRecentAction}"""
-    
+
+
+# The dataclass' slots hold the bit flags of the most recent actions, which are decoded when read
+FootsiesState.p1MostRecentAction = _ActionField(FootsiesState.p1MostRecentAction)
+FootsiesState.p2MostRecentAction = _ActionField(FootsiesState.p2MostRecentAction)
+
+
+class FootsiesStateArray:
+    def __init__(self, capacity: int):
+        """
+        Fixed-capacity sequence of environment states, stored in a single contiguous NumPy structured array (with dtype `FOOTSIES_STATE_DTYPE`).
+
+        Behaves like a `deque` with `maxlen` equal to `capacity`: states are added with `append` and removed with `popleft`,
+        and appending to a full array drops the oldest state. Indexing returns `FootsiesState` objects, while the fields of all states
+        are accessed with the same attribute names, as NumPy arrays in order from oldest to newest. The most recent actions are returned
+        as arrays of bools with shape `(len(self), 3)`, and as bit flags with `p1MostRecentActionBits` and `p2MostRecentActionBits`
+
+        Parameters
+        ----------
+        capacity: int
+            the maximum number of states held
+        """
+        if capacity <= 0:
+            raise ValueError(f"the capacity must be positive, got {capacity}")
+
+        self.records = np.zeros(capacity, dtype=FOOTSIES_STATE_DTYPE)
+        self._start = 0
+        self._length = 0
+
+    @staticmethod
+    def from_states(states: Iterable[FootsiesState], capacity: "int | None" = None) -> "FootsiesStateArray":
+        states = list(states)
+        array = FootsiesStateArray(capacity if capacity is not None else max(len(states), 1))
+        array.extend(states)
+        return array
+
+    @staticmethod
+    def from_records(records: np.ndarray, capacity: "int | None" = None) -> "FootsiesStateArray":
+        """States copied from a structured array with dtype `FOOTSIES_STATE_DTYPE` (such as those of the harvester). Only the most recent `capacity` states are kept"""
+        array = FootsiesStateArray(capacity if capacity is not None else max(len(records), 1))
+        length = min(len(records), len(array.records))
+        array.records[:length] = records[len(records) - length:]
+        array._length = length
+        return array
+
+    def to_records(self) -> np.ndarray:
+        """Copy of the states as a structured array with dtype `FOOTSIES_STATE_DTYPE`, in order"""
+        return np.roll(self.records, -self._start)[:self._length]
+
+    @property
+    def maxlen(self) -> int:
+        return len(self.records)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _record_index(self, index: int) -> int:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("state index out of range")
+        return (self._start + index) % len(self.records)
+
+    def append(self, state: FootsiesState):
+        if self._length == len(self.records):
+            self._start = (self._start + 1) % len(self.records)
+            self._length -= 1
+        self.records[(self._start + self._length) % len(self.records)] = state.astuple()
+        self._length += 1
+
+    def extend(self, states: Iterable[FootsiesState]):
+        for state in states:
+            self.append(state)
+
+    def popleft(self) -> FootsiesState:
+        if self._length == 0:
+            raise IndexError("pop from an empty state array")
+        state = self[0]
+        self._start = (self._start + 1) % len(self.records)
+        self._length -= 1
+        return state
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def __getitem__(self, index: int) -> FootsiesState:
+        return FootsiesState(*self.records[self._record_index(index)].tolist())
+
+    def __iter__(self) -> Iterator[FootsiesState]:
+        for index in range(self._length):
+            yield self[index]
+
+    def column(self, name: str) -> np.ndarray:
+        """The values of the field `name` of all states, in order. A view of the underlying array unless the states wrap around its end"""
+        column = self.records[name]
+        end = self._start + self._length
+        if end <= len(self.records):
+            return column[self._start:end]
+        return np.concatenate((column[self._start:], column[:end - len(self.records)]))
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in ("p1MostRecentAction", "p2MostRecentAction"):
+            return (self.column(name)[:, np.newaxis] & np.array([1, 2, 4], dtype=np.uint8)) != 0
+        if name in ("p1MostRecentActionBits", "p2MostRecentActionBits"):
+            return self.column(name[:-len("Bits")])
+        if name in FOOTSIES_STATE_FIELDS:
+            return self.column(name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
 
 @dataclasses.dataclass(slots=True)
 class FootsiesBattleState:
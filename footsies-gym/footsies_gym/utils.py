@@ -1,9 +1,35 @@
 from footsies_gym.wrappers.normalization import FootsiesNormalized
-from gymnasium.spaces.utils import unflatten
-from gymnasium.spaces import Space
+from gymnasium.spaces.utils import unflatten, flatdim
+from gymnasium.spaces import Space, Dict, Box, MultiBinary, Discrete, MultiDiscrete
 import numpy as np
 
 
+def _unflatten_batch(space: Space, vector_obs: np.ndarray) -> "dict | np.ndarray":
+    """Batched version of `unflatten`, for a batch of flattened observations with shape `(N, flatdim(space))`"""
+    if isinstance(space, Dict):
+        dims = np.cumsum([flatdim(subspace) for subspace in space.spaces.values()])
+        return {
+            key: _unflatten_batch(subspace, vector_obs[:, end - flatdim(subspace):end])
+            for end, (key, subspace) in zip(dims, space.spaces.items())
+        }
+
+    if isinstance(space, (Box, MultiBinary)):
+        return np.array(vector_obs, dtype=space.dtype).reshape((vector_obs.shape[0], *space.shape))
+
+    if isinstance(space, (Discrete, MultiDiscrete)):
+        nvec = np.atleast_1d(space.n if isinstance(space, Discrete) else space.nvec.flatten())
+        offsets = np.concatenate([[0], np.cumsum(nvec)])
+        hot = vector_obs != 0
+        if not all(hot[:, start:end].any(axis=1).all() for start, end in zip(offsets[:-1], offsets[1:])):
+            raise ValueError(f"the batch contains observations that are not valid one-hot encodings and can not be unflattened to space {space}")
+        values = np.stack([hot[:, start:end].argmax(axis=1) for start, end in zip(offsets[:-1], offsets[1:])], axis=1).astype(space.dtype)
+        if isinstance(space, Discrete):
+            return values[:, 0] + space.start
+        return values.reshape((vector_obs.shape[0], *space.shape)) + space.start
+
+    raise ValueError(f"spaces of type {type(space).__name__} can't be unflattened in batches")
+
+
 def get_dict_obs_from_vector_obs(
     vector_obs: np.ndarray,
     flattened: bool = True,
@@ -14,6 +40,9 @@ def get_dict_obs_from_vector_obs(
     """
     Convert a FOOTSIES observation from a transformed version (with observation wrappers) into the original version.
     Doesn't work on observations that had frame skipping
+
+    A batch of flattened observations, with shape `(N, D)`, or a dictionary of batched arrays may also be given,
+    in which case the arrays of the returned dictionary have the batch as their first dimension
     """
 
     dict_obs = {}
@@ -23,6 +52,14 @@ def get_dict_obs_from_vector_obs(
             raise ValueError(
                 "if argument vector_obs is flattened, then the unflattened observation space needs to be provided"
             )
+        vector_obs = np.asarray(vector_obs)
+        if vector_obs.ndim == 2:
+            dict_obs = _unflatten_batch(unflattenend_observation_space, vector_obs)
+            if normalized:
+                # The unflattened arrays are new, so they can be overwritten
+                dict_obs = FootsiesNormalized.undo(dict_obs, normalized_guard=normalized_guard, inplace=True)
+            return dict_obs
+
         dict_obs = unflatten(unflattenend_observation_space, vector_obs)
 
     # If not flattened, we assume it's a dictionary
@@ -1,4 +1,5 @@
 from .action_comb_disc import FootsiesActionCombinationsDiscretized
 from .normalization import FootsiesNormalized
 from .statistics import FootsiesStatistics
-from .frame_skip import FootsiesFrameSkipped
\ No newline at end of file
+from .frame_skip import FootsiesFrameSkipped, FootsiesFrameSkippedVector
+from .recorder import FootsiesRecorder
\ No newline at end of file
@@ -1,6 +1,26 @@
+import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
-from ..moves import FOOTSIES_MOVE_INDEX_TO_MOVE, FootsiesMove
+from gymnasium.vector.utils import batch_space
+from ..moves import is_p1_actionable
+from ..envs.footsies import FootsiesEnv
+from ..envs.footsies_vector import FootsiesVectorEnv
+
+
+def _frame_skipped_observation_space(wrapped_observation_space: spaces.Dict) -> spaces.Dict:
+    """The observation space of a single frame-skipped environment, in which only the opponent's move progress is kept"""
+    move_frame_low = wrapped_observation_space["move_frame"].low[1]
+    move_frame_high = wrapped_observation_space["move_frame"].high[1]
+    return spaces.Dict(
+        {
+            "guard": wrapped_observation_space["guard"],
+            "move": wrapped_observation_space["move"],
+            "move_frame": spaces.Box(
+                low=move_frame_low, high=move_frame_high, shape=(1,)
+            ),
+            "position": wrapped_observation_space["position"],
+        }
+    )
 
 
 class FootsiesFrameSkipped(gym.Wrapper):
@@ -15,20 +35,7 @@ class FootsiesFrameSkipped(gym.Wrapper):
         super().__init__(env)
 
         # Assumed to be a dictionary, since 'env' should be either FootsiesEnv or one of FOOTSIES's observation wrappers
-        wrapped_observation_space = env.observation_space
-
-        move_frame_low = wrapped_observation_space["move_frame"].low[1]
-        move_frame_high = wrapped_observation_space["move_frame"].high[1]
-        self.observation_space = spaces.Dict(
-            {
-                "guard": wrapped_observation_space["guard"],
-                "move": wrapped_observation_space["move"],
-                "move_frame": spaces.Box(
-                    low=move_frame_low, high=move_frame_high, shape=(1,)
-                ),
-                "position": wrapped_observation_space["position"],
-            }
-        )
+        self.observation_space = _frame_skipped_observation_space(env.observation_space)
 
         # At the moment the agent is hit or hits the opponent, if frame skip is enabled,
         # then the agent will not receive the reward immediately, and so we should accumulate it
@@ -44,19 +51,11 @@ class FootsiesFrameSkipped(gym.Wrapper):
         }
 
     def _is_obs_skippable(self, state_dict: dict) -> bool:
-        """From the extracted observation data, check whether the observation is skippable, i.e. the agent can't act on it"""
-        p1_move = FOOTSIES_MOVE_INDEX_TO_MOVE[state_dict["move"][0]]
-        p2_move = FOOTSIES_MOVE_INDEX_TO_MOVE[state_dict["move"][1]]
-        hit_guard_moves = {FootsiesMove.DAMAGE, FootsiesMove.GUARD_STAND, FootsiesMove.GUARD_CROUCH, FootsiesMove.GUARD_M, FootsiesMove.GUARD_BREAK}
-
-        return (
-            # player 1 is in the middle of a move (that hasn't hit the opponent yet!). We are assuming the move's progress is simplified (always 0 for instantaneous actions)
-            (state_dict["move_frame"][0] != 0.0 and (p2_move not in hit_guard_moves))
-            # player 1 is being hit
-            or p1_move == FootsiesMove.DAMAGE
-        )
-
-    def reset(self, *, seed, options):
+        """From the extracted observation data, check whether the observation is skippable, i.e. the agent can't act on it. Also accepts batched observations"""
+        # We are assuming the move's progress is simplified (always 0 for instantaneous actions)
+        return ~is_p1_actionable(state_dict["move"], state_dict["move_frame"])
+
+    def reset(self, *, seed: int = None, options: dict = None):
         obs, info = self.env.reset(seed=seed, options=options)
 
         # We assume there is no need for frame skipping on the first state
@@ -64,17 +63,83 @@ class FootsiesFrameSkipped(gym.Wrapper):
 
     def step(self, action):
         obs, reward, terminated, truncated, info = self.env.step(action)
-
-        # Skip irrelevant environment steps until relevant state or termination/truncation
-        skipped = False
         self._frame_skip_retained_reward += reward
-        if self._is_obs_skippable(obs) and not (terminated or truncated):
-            obs, reward, terminated, truncated, info = self.step((False, False, False))
+
+        # Skip irrelevant environment steps until relevant state or termination/truncation.
+        # If directly wrapping the environment, all skipped frames can be played at once
+        skip_in_one_step = self.env is self.env.unwrapped and isinstance(self.env, FootsiesEnv)
+        while self._is_obs_skippable(obs) and not (terminated or truncated):
+            if skip_in_one_step:
+                obs, reward, terminated, truncated, info = self.env.step_n((False, False, False), FootsiesEnv.ACTION_REPEAT_MAX_FRAMES, until_actionable=True)
+            else:
+                obs, reward, terminated, truncated, info = self.env.step((False, False, False))
             self._frame_skip_retained_reward += reward
-            skipped = True
 
         reward = self._frame_skip_retained_reward
-        obs = self._frame_skip_obs(obs) if not skipped else obs
         self._frame_skip_retained_reward = 0
 
-        return obs, reward, terminated, truncated, info
+        return self._frame_skip_obs(obs), reward, terminated, truncated, info
+
+
+class FootsiesFrameSkippedVector(gym.vector.VectorWrapper):
+    """
+    Vectorized version of `FootsiesFrameSkipped`, for `FootsiesVectorEnv`.
+    After every step, only the sub-environments on which the agent can't act are stepped further (with no action), until all of them can act or have terminated/truncated.
+    The results are then returned for all sub-environments at once, with the rewards accumulated over the skipped steps
+
+    Should be applied directly on top of `FootsiesVectorEnv`, with observations in the "dict" format
+    """
+
+    NO_ACTION = (False, False, False)
+
+    def __init__(self, env: FootsiesVectorEnv):
+        super().__init__(env)
+        if not isinstance(env.unwrapped, FootsiesVectorEnv) or not isinstance(env.single_observation_space, spaces.Dict):
+            raise ValueError("the frame skip vector wrapper requires a 'FootsiesVectorEnv' with observations in the 'dict' format")
+
+        self.single_observation_space = _frame_skipped_observation_space(env.single_observation_space)
+        self.observation_space = batch_space(self.single_observation_space, self.num_envs)
+
+        self._no_actions = np.zeros((self.num_envs, 3), dtype=np.bool_)
+        # Rewards of each sub-environment that weren't returned yet, since they were obtained on skipped steps
+        self._frame_skip_retained_reward = np.zeros((self.num_envs,), dtype=np.float64)
+
+    def _frame_skip_obs(self, observations: dict) -> dict:
+        return {
+            "guard": observations["guard"],
+            "move": observations["move"],
+            "move_frame": observations["move_frame"][:, 1:],
+            "position": observations["position"],
+        }
+
+    def _is_obs_skippable(self, observations: dict) -> np.ndarray:
+        """Which of the batched observations are skippable, i.e. the agent can't act on them"""
+        return ~is_p1_actionable(observations["move"], observations["move_frame"])
+
+    def reset(self, *, seed: "int | list[int] | None" = None, options: dict | None = None):
+        observations, infos = self.env.reset(seed=seed, options=options)
+        self._frame_skip_retained_reward[:] = 0.0
+
+        # We assume there is no need for frame skipping on the first state
+        return self._frame_skip_obs(observations), infos
+
+    def step(self, actions):
+        observations, rewards, terminations, truncations, infos = self.env.step(actions)
+        self._frame_skip_retained_reward += rewards
+        terminations = np.copy(terminations)
+        truncations = np.copy(truncations)
+
+        pending = self._is_obs_skippable(observations) & ~(terminations | truncations)
+        while pending.any():
+            observations, rewards, step_terminations, step_truncations, step_infos = self.env.unwrapped.step_masked(self._no_actions, pending)
+            self._frame_skip_retained_reward += rewards
+            terminations[pending] = step_terminations[pending]
+            truncations[pending] = step_truncations[pending]
+            infos = FootsiesVectorEnv._merge_infos(infos, step_infos, pending)
+
+            pending &= self._is_obs_skippable(observations) & ~(step_terminations | step_truncations)
+
+        rewards = self._frame_skip_retained_reward
+        self._frame_skip_retained_reward = np.zeros_like(rewards)
+
+        return self._frame_skip_obs(observations), rewards, terminations, truncations, infos
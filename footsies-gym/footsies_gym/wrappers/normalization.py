@@ -1,14 +1,37 @@
 import gymnasium as gym
+import numpy as np
 from gymnasium import spaces
-from ..moves import FootsiesMove, FOOTSIES_MOVE_INDEX_TO_MOVE
+from ..moves import FOOTSIES_MOVE_DURATIONS
 from ..envs.footsies import FootsiesEnv
 
+# Scales by which the observation variables are divided when normalizing
+_GUARD_SCALE = 3.0
+_POSITION_SCALE = 4.6
+# Scale of the move frame, indexed by move index. Kept as integers, as the move durations are
+_MOVE_FRAME_SCALES = FOOTSIES_MOVE_DURATIONS
+
+
+def _rescale(values, scales, ufunc: np.ufunc, inplace: bool) -> np.ndarray:
+    """
+    Apply `ufunc` to the values and scales, writing the result into `values` if requested and if it already has the result's dtype.
+    Floating-point values keep their precision, as they would with Python scalar scales (a `float32` value divided by a Python `int` is still `float32`)
+    """
+    values = np.asarray(values)
+    scales = np.asarray(scales)
+    if values.dtype.kind == "f":
+        scales = scales.astype(values.dtype, copy=False)
+    out = values if inplace and ufunc.resolve_dtypes((values.dtype, scales.dtype, None))[-1] == values.dtype else None
+    return ufunc(values, scales, out=out)
+
 
 class FootsiesNormalized(gym.ObservationWrapper):
     """Normalizes all observation space variables. Wrapper should be applied to the base FOOTSIES environment before any other observation wrapper
 
     Move frame durations will be between `0` and `1`, inclusive. `0` indicates the start of the move, while `1` indicates the end of it.
     The guard information of each player can also be set to be between `0` and `1`.
+
+    The normalized values are NumPy arrays. `normalize` and `undo` also accept batched observations, with arrays of shape `(N, 2)`, and can work in place
+    on them. Each observation of a batch gets the same result, bit for bit, as when it's processed on its own.
     """
 
     def __init__(self, env, normalize_guard: bool = True):
@@ -26,30 +49,31 @@ class FootsiesNormalized(gym.ObservationWrapper):
         self.observation_space.spaces["position"] = spaces.Box(low=-1.0, high=1.0, shape=(2,))
 
     def observation(self, obs: dict) -> dict:
-        obs = obs.copy()
-        if self.normalize_guard:
-            obs["guard"] = (obs["guard"][0] / 3.0, obs["guard"][1] / 3.0)
-        obs["position"] = (obs["position"][0] / 4.6, obs["position"][1] / 4.6)
-        obs["move_frame"] = (
-            obs["move_frame"][0]
-            / FOOTSIES_MOVE_INDEX_TO_MOVE[int(obs["move"][0])].value.duration,
-            obs["move_frame"][1]
-            / FOOTSIES_MOVE_INDEX_TO_MOVE[int(obs["move"][1])].value.duration
-        )
+        return self.normalize(obs, normalize_guard=self.normalize_guard)
+
+    @staticmethod
+    def normalize(obs: dict, normalize_guard: bool = True, inplace: bool = False) -> dict:
+        """
+        Normalize an observation, or a batch of observations. If `inplace`, the dictionary is updated rather than copied,
+        and the arrays that already have the dtype of the result (usually `float64`) are overwritten
+        """
+        if not inplace:
+            obs = obs.copy()
+        if normalize_guard:
+            obs["guard"] = _rescale(obs["guard"], _GUARD_SCALE, np.divide, inplace)
+        obs["position"] = _rescale(obs["position"], _POSITION_SCALE, np.divide, inplace)
+        obs["move_frame"] = _rescale(obs["move_frame"], _MOVE_FRAME_SCALES[np.asarray(obs["move"], dtype=np.intp)], np.divide, inplace)
 
         return obs
 
     @staticmethod
-    def undo(obs: dict, normalized_guard: bool = True) -> dict:
-        obs = obs.copy()
+    def undo(obs: dict, normalized_guard: bool = True, inplace: bool = False) -> dict:
+        """Undo the normalization of an observation, or a batch of observations. `inplace` works as in `normalize`"""
+        if not inplace:
+            obs = obs.copy()
         if normalized_guard:
-            obs["guard"] = (obs["guard"][0] * 3.0, obs["guard"][1] * 3.0)
-        obs["position"] = (obs["position"][0] * 4.6, obs["position"][1] * 4.6)
-        obs["move_frame"] = (
-            obs["move_frame"][0]
-            * FOOTSIES_MOVE_INDEX_TO_MOVE[int(obs["move"][0])].value.duration,
-            obs["move_frame"][1]
-            * FOOTSIES_MOVE_INDEX_TO_MOVE[int(obs["move"][1])].value.duration
-        )
+            obs["guard"] = _rescale(obs["guard"], _GUARD_SCALE, np.multiply, inplace)
+        obs["position"] = _rescale(obs["position"], _POSITION_SCALE, np.multiply, inplace)
+        obs["move_frame"] = _rescale(obs["move_frame"], _MOVE_FRAME_SCALES[np.asarray(obs["move"], dtype=np.intp)], np.multiply, inplace)
 
         return obs
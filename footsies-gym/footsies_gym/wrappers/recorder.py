@@ -0,0 +1,336 @@
+import json
+import os
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+from os import path
+from typing import Dict, List, Tuple
+
+# On-disk layout of a recording, which is a directory with:
+# - the metadata file, with the dtype and the shape of each row of every column
+# - the chunk index, with a line per flushed chunk (its number of rows), appended only once the chunk's data is written.
+#   Data past the last indexed chunk (left by an interrupted run) is ignored
+# - uncompressed recordings: a file per column, to which the rows of each chunk are appended in their raw binary form, so that they can be memory-mapped
+# - compressed recordings: a compressed NumPy archive per chunk, with an array per column
+RECORDING_FORMAT_VERSION = 1
+RECORDING_METADATA_FILE = "metadata.json"
+RECORDING_CHUNK_INDEX_FILE = "chunks.jsonl"
+RECORDING_COLUMN_FILE_SUFFIX = ".bin"
+
+# The recorded `info` fields of the FOOTSIES environment, with their dtype and shape
+RECORDED_INFO_FIELDS: Dict[str, Tuple[np.dtype, Tuple[int, ...]]] = {
+    "frame": (np.dtype(np.int32), ()),
+    "p1_action": (np.dtype(np.bool_), (3,)),
+    "p2_action": (np.dtype(np.bool_), (3,)),
+    "p1_hitstun": (np.dtype(np.int32), ()),
+    "p2_hitstun": (np.dtype(np.int32), ()),
+}
+
+
+def recording_chunk_file(index: int) -> str:
+    """Name of the file of a chunk of a compressed recording"""
+    return f"chunk_{index:06d}.npz"
+
+
+def read_recording_metadata(recording_path: str) -> "tuple[dict, List[int]]":
+    """The metadata of a recording, and the number of rows of each of its chunks"""
+    with open(path.join(recording_path, RECORDING_METADATA_FILE), "rt") as f:
+        metadata = json.load(f)
+    if metadata["version"] != RECORDING_FORMAT_VERSION:
+        raise ValueError(f"the recording uses format version {metadata['version']}, but version {RECORDING_FORMAT_VERSION} is expected")
+
+    chunk_rows = []
+    chunk_index_path = path.join(recording_path, RECORDING_CHUNK_INDEX_FILE)
+    if path.exists(chunk_index_path):
+        with open(chunk_index_path, "rt") as f:
+            chunk_rows = [json.loads(line)["rows"] for line in f if line.strip()]
+
+    return metadata, chunk_rows
+
+
+def _space_columns(space: spaces.Space, name: str) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+    """The columns in which the values of a space are recorded, one per subspace of dictionary spaces"""
+    if isinstance(space, spaces.Dict):
+        columns = {}
+        for key, subspace in space.spaces.items():
+            columns.update(_space_columns(subspace, f"{name}.{key}"))
+        return columns
+
+    if space.dtype is None or space.shape is None:
+        raise ValueError(f"spaces of type {type(space).__name__} can't be recorded")
+    return {name: (np.dtype(space.dtype), tuple(space.shape))}
+
+
+def recording_columns(observation_space: spaces.Space, action_space: spaces.Space) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+    """The columns of a recording of an environment with the given spaces, with their dtype and shape"""
+    return {
+        **_space_columns(observation_space, "observation"),
+        **_space_columns(action_space, "action"),
+        "reward": (np.dtype(np.float32), ()),
+        "terminated": (np.dtype(np.bool_), ()),
+        "truncated": (np.dtype(np.bool_), ()),
+        "episode_start": (np.dtype(np.bool_), ()),
+        "episode_end": (np.dtype(np.bool_), ()),
+        **{f"info.{field}": dtype_shape for field, dtype_shape in RECORDED_INFO_FIELDS.items()},
+    }
+
+
+class FootsiesRecordingWriter:
+    def __init__(
+        self,
+        recording_path: str,
+        columns: Dict[str, Tuple[np.dtype, Tuple[int, ...]]],
+        chunk_size: int = 65536,
+        compress: bool = False,
+        overwrite: bool = False,
+    ):
+        """
+        Writer of the on-disk recording format, which keeps the rows of a chunk in preallocated columns and flushes them to disk once the chunk is full.
+        Rows are either filled in place in `chunk` and committed one at a time with `commit_row()`, or appended in bulk with `write()`
+
+        Parameters
+        ----------
+        recording_path: str
+            the directory to which the recording is written, created if it doesn't exist
+        columns: Dict[str, Tuple[np.dtype, Tuple[int, ...]]]
+            the dtype and the shape of each row of every column, such as those given by `recording_columns()`
+        chunk_size: int
+            the number of rows kept in memory before they're flushed to disk
+        compress: bool
+            whether each chunk is written as a compressed NumPy archive, rather than appended to raw column files. Compressed recordings can't be memory-mapped
+        overwrite: bool
+            whether to overwrite an existing recording in `recording_path`. If not, an exception is raised if there is one
+        """
+        if chunk_size < 1:
+            raise ValueError(f"the chunk size must be positive, got {chunk_size}")
+
+        metadata_path = path.join(recording_path, RECORDING_METADATA_FILE)
+        if path.exists(metadata_path):
+            if not overwrite:
+                raise FileExistsError(f"there is already a recording in '{recording_path}' and the recorder was set to not overwrite it")
+            # Remove only what belongs to the recording
+            for name in os.listdir(recording_path):
+                if name.endswith(RECORDING_COLUMN_FILE_SUFFIX) or name == RECORDING_CHUNK_INDEX_FILE or (name.startswith("chunk_") and name.endswith(".npz")):
+                    os.remove(path.join(recording_path, name))
+        os.makedirs(recording_path, exist_ok=True)
+
+        self.recording_path = recording_path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.compress = compress
+
+        # Preallocated rows of the chunk being recorded
+        self.chunk = {name: np.zeros((chunk_size, *shape), dtype=dtype) for name, (dtype, shape) in columns.items()}
+        self.chunk_rows = 0
+        self._num_chunks = 0
+        self._rows_flushed = 0
+
+        with open(metadata_path, "wt") as f:
+            json.dump(
+                {
+                    "version": RECORDING_FORMAT_VERSION,
+                    "compressed": compress,
+                    "columns": {name: {"dtype": dtype.str, "shape": list(shape)} for name, (dtype, shape) in columns.items()},
+                },
+                f,
+                indent=4,
+            )
+
+        self._column_files = (
+            None
+            if compress
+            else {name: open(path.join(recording_path, name + RECORDING_COLUMN_FILE_SUFFIX), "wb") for name in columns}
+        )
+        self._chunk_index_file = open(path.join(recording_path, RECORDING_CHUNK_INDEX_FILE), "wt")
+        self._closed = False
+
+    def commit_row(self):
+        """Commit the row at index `chunk_rows` of the chunk, which was filled in place"""
+        self.chunk_rows += 1
+        if self.chunk_rows == self.chunk_size:
+            self.flush()
+
+    def write(self, rows: Dict[str, np.ndarray]):
+        """Append rows in bulk, given as an array per column with the same number of rows. Every column must be given"""
+        num_rows = len(next(iter(rows.values())))
+        written = 0
+        while written < num_rows:
+            count = min(num_rows - written, self.chunk_size - self.chunk_rows)
+            for name, column in self.chunk.items():
+                column[self.chunk_rows:self.chunk_rows + count] = rows[name][written:written + count]
+            written += count
+            self.chunk_rows += count
+            if self.chunk_rows == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the committed rows to disk. The row at index `chunk_rows`, which may be partially filled in place but isn't committed yet,
+        is carried over to the start of the chunk, so that it can be completed after the flush
+        """
+        rows = self.chunk_rows
+        if rows == 0:
+            return
+
+        if self.compress:
+            np.savez_compressed(
+                path.join(self.recording_path, recording_chunk_file(self._num_chunks)),
+                **{name: column[:rows] for name, column in self.chunk.items()},
+            )
+        else:
+            for name, column in self.chunk.items():
+                f = self._column_files[name]
+                column[:rows].tofile(f)
+                f.flush()
+
+        # The chunk is only indexed once its data is written, so that it's never read partially
+        self._chunk_index_file.write(json.dumps({"rows": rows}) + "\n")
+        self._chunk_index_file.flush()
+
+        if rows < self.chunk_size:
+            for column in self.chunk.values():
+                column[0] = column[rows]
+
+        self._num_chunks += 1
+        self._rows_flushed += rows
+        self.chunk_rows = 0
+
+    @property
+    def num_rows(self) -> int:
+        """The number of rows recorded so far, including those that weren't flushed yet"""
+        return self._rows_flushed + self.chunk_rows
+
+    def close(self):
+        """Flush the remaining rows and close the files. No-op if already closed"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self.flush()
+        if self._column_files is not None:
+            for f in self._column_files.values():
+                f.close()
+        self._chunk_index_file.close()
+
+
+class FootsiesRecorder(gym.Wrapper):
+    """
+    Record the trajectories of the FOOTSIES environment to disk, as columns of NumPy arrays that are streamed in chunks, so that memory usage is bounded regardless of the length of the run.
+    Should be applied on the base FOOTSIES environment, or any of its wrappers whose `info` is that of the base environment
+
+    Each row holds an observation with its `info` fields (`RECORDED_INFO_FIELDS`), the action taken on it, the reward received after that action and whether the episode then terminated or was truncated.
+    The final observation of each episode gets a row of its own, flagged with `episode_end`, whose action and reward are 0. If an episode is interrupted by `reset()`, its final observation is flagged
+    with `episode_end` without the previous row being terminated or truncated. The first observation of each episode is flagged with `episode_start`.
+    Episodes that are reset or closed before any step is taken aren't recorded.
+
+    Columns are named after the recorded value ("observation", "action", "reward", "terminated", "truncated", "episode_start", "episode_end" and "info.<field>"), and dictionary observations
+    get a column per key ("observation.<key>")
+    """
+
+    def __init__(self, env, recording_path: str, chunk_size: int = 65536, compress: bool = False, overwrite: bool = False):
+        """
+        Parameters
+        ----------
+        env: gym.Env
+            the FOOTSIES environment to record
+        recording_path: str
+            the directory to which the recording is written, created if it doesn't exist
+        chunk_size: int
+            the number of rows kept in memory before they're flushed to disk
+        compress: bool
+            whether each chunk is written as a compressed NumPy archive, rather than appended to raw column files. Compressed recordings can't be memory-mapped
+        overwrite: bool
+            whether to overwrite an existing recording in `recording_path`. If not, an exception is raised if there is one
+        """
+        super().__init__(env)
+
+        self._writer = FootsiesRecordingWriter(
+            recording_path,
+            recording_columns(env.observation_space, env.action_space),
+            chunk_size=chunk_size,
+            compress=compress,
+            overwrite=overwrite,
+        )
+        self.recording_path = recording_path
+        self.chunk_size = chunk_size
+        self.compress = compress
+
+        self._observation_columns = [(name, name.split(".")[1:]) for name in self._writer.columns if name == "observation" or name.startswith("observation.")]
+
+        # Whether the row being recorded already holds an observation, which is missing the action taken on it
+        self._row_pending = False
+        # Whether the pending row holds the first observation of its episode, which no step was taken on yet
+        self._row_episode_start = False
+        self._closed = False
+
+    def _begin_row(self, obs, info: dict, episode_start: bool):
+        """Record an observation in the next row. It's written right away, since the environment may reuse the observation's array"""
+        row = self._writer.chunk_rows
+        chunk = self._writer.chunk
+        for name, keys in self._observation_columns:
+            value = obs
+            for key in keys:
+                value = value[key]
+            chunk[name][row] = value
+        for field in RECORDED_INFO_FIELDS:
+            chunk["info." + field][row] = info[field]
+        chunk["episode_start"][row] = episode_start
+        self._row_pending = True
+        self._row_episode_start = episode_start
+
+    def _end_row(self, action, reward: float, terminated: bool, truncated: bool, episode_end: bool):
+        """Complete the row of the most recent observation with the action taken on it and its outcome"""
+        row = self._writer.chunk_rows
+        chunk = self._writer.chunk
+        chunk["action"][row] = 0 if action is None else action
+        chunk["reward"][row] = reward
+        chunk["terminated"][row] = terminated
+        chunk["truncated"][row] = truncated
+        chunk["episode_end"][row] = episode_end
+        self._row_pending = False
+
+        self._writer.commit_row()
+
+    def _end_pending_episode(self):
+        """Record the current episode's observation as its final one, if there is an episode. An episode on which no step was taken is dropped instead"""
+        if self._row_episode_start:
+            self._row_pending = False
+            self._row_episode_start = False
+        elif self._row_pending:
+            self._end_row(None, 0.0, False, False, True)
+
+    def reset(self, *, seed: int = None, options: dict = None):
+        obs, info = self.env.reset(seed=seed, options=options)
+
+        self._end_pending_episode()
+        self._begin_row(obs, info, episode_start=True)
+
+        return obs, info
+
+    def step(self, action):
+        next_obs, reward, terminated, truncated, info = self.env.step(action)
+
+        if self._row_pending:
+            self._end_row(action, reward, terminated, truncated, False)
+            self._begin_row(next_obs, info, episode_start=False)
+            if terminated or truncated:
+                self._end_pending_episode()
+
+        return next_obs, reward, terminated, truncated, info
+
+    def flush(self):
+        """Write the rows recorded so far to disk, except for the one of the most recent observation, which is still missing the action taken on it"""
+        self._writer.flush()
+
+    @property
+    def num_rows(self) -> int:
+        """The number of rows recorded so far, including those that weren't flushed yet"""
+        return self._writer.num_rows
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._end_pending_episode()
+            self._writer.close()
+
+        super().close()
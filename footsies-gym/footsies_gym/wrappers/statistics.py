@@ -1,71 +1,231 @@
+import math
+import numpy as np
 import gymnasium as gym
-from ..moves import FOOTSIES_MOVE_INDEX_TO_MOVE, FootsiesMove
+from typing import Dict
+from ..moves import FOOTSIES_MOVE_INDEX_TO_MOVE, FOOTSIES_MOVE_INDEFINITE, FOOTSIES_MOVE_HIT_GUARD, FOOTSIES_MOVE_ID_TO_INDEX, FootsiesMove
+
+_SPECIAL_MOVES = frozenset(FOOTSIES_MOVE_ID_TO_INDEX[move.value.id] for move in (FootsiesMove.B_SPECIAL, FootsiesMove.N_SPECIAL))
+_ATTACK_MOVES = frozenset(FOOTSIES_MOVE_ID_TO_INDEX[move.value.id] for move in (FootsiesMove.B_ATTACK, FootsiesMove.N_ATTACK))
+_GUARD_BREAK = FOOTSIES_MOVE_ID_TO_INDEX[FootsiesMove.GUARD_BREAK.value.id]
+
+
+class StreamingMetric:
+    def __init__(self, window: int = 100):
+        """
+        Summary of a stream of values in constant memory: the running count, mean, variance (with Welford's algorithm), minimum and maximum of all values,
+        and the mean of the most recent `window` values, which are kept in a ring buffer
+        """
+        if window < 1:
+            raise ValueError(f"the window must be positive, got {window}")
+
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+        self._window = np.zeros(window, dtype=np.float64)
+        self._window_next = 0
+        self._window_sum = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        # The window's sum is updated incrementally, with the value that's dropped from the ring buffer
+        self._window_sum += value - self._window[self._window_next]
+        self._window[self._window_next] = value
+        self._window_next = (self._window_next + 1) % len(self._window)
+
+    @property
+    def variance(self) -> float:
+        """The population variance of all values"""
+        return self._m2 / self.count if self.count > 0 else math.nan
+
+    def window_values(self) -> np.ndarray:
+        """The most recent values, from oldest to newest"""
+        if self.count < len(self._window):
+            return self._window[:self.count].copy()
+        return np.roll(self._window, -self._window_next)
+
+    @property
+    def window_mean(self) -> float:
+        """The mean of the most recent `window` values"""
+        return self._window_sum / min(self.count, len(self._window)) if self.count > 0 else math.nan
+
+    def summary(self) -> Dict[str, float]:
+        if self.count == 0:
+            return {"mean": math.nan, "std": math.nan, "min": math.nan, "max": math.nan, "window_mean": math.nan}
+        return {
+            "mean": self.mean,
+            "std": math.sqrt(self.variance),
+            "min": self.min,
+            "max": self.max,
+            "window_mean": self.window_mean,
+        }
 
 
 class FootsiesStatistics(gym.Wrapper):
-    """Collect statistics on the FOOTSIES environment. The environment that this wrapper receives should not be wrapped by observation wrappers"""
+    """
+    Collect statistics on the FOOTSIES environment, in constant memory: per-episode metrics are summarized as they stream in (`StreamingMetric`), and the usage of each move is counted.
+    The moves are read from the `info` of the base environment, so this wrapper works with any observation format, but should be applied below any wrapper that changes the `info` or skips steps
+
+    The per-episode metrics are the episode length (in steps), return, the number of special moves performed by player 1 (and of those performed from neutral, i.e. not cancelled from an attack),
+    the number of hits landed and taken (whether guarded or not), and the number of guard breaks inflicted and suffered. Wins are counted for episodes that terminated with a positive return
+    """
 
-    def __init__(self, env):
+    METRICS = (
+        "episode_length",
+        "episode_return",
+        "special_moves",
+        "special_moves_from_neutral",
+        "hits_landed",
+        "hits_taken",
+        "guard_breaks_inflicted",
+        "guard_breaks_suffered",
+    )
+
+    def __init__(self, env, window: int = 100):
+        """
+        Parameters
+        ----------
+        env: gym.Env
+            the FOOTSIES environment
+        window: int
+            the number of most recent episodes over which the windowed aggregates are computed
+        """
         super().__init__(env)
-        self._special_moves_per_episode = []
-        self._special_moves_from_neutral_per_episode = []
-        self._special_moves_per_episode_counter = 0
-        self._special_moves_from_neutral_per_episode_counter = 0
-        self._prev_p1_move = None  # used to make sure special moves are only counted when they are performed, and not every time step they are active
+        self.window = window
+
+        self._metrics = {name: StreamingMetric(window) for name in self.METRICS}
+        # Whether each terminated episode was won
+        self._wins = StreamingMetric(window)
+
+        # Number of times each move was performed by each player, indexed by move index
+        self.p1_move_usage = np.zeros(len(FOOTSIES_MOVE_INDEX_TO_MOVE), dtype=np.int64)
+        self.p2_move_usage = np.zeros(len(FOOTSIES_MOVE_INDEX_TO_MOVE), dtype=np.int64)
+        self.total_steps = 0
+
+        # Counters of the ongoing episode
+        self._episode = dict.fromkeys(self.METRICS, 0)
+        # Moves and move frames of the most recent step, used to make sure moves are only counted when they are performed, and not every time step they are active
+        self._prev_moves = None
+        self._prev_move_frames = None
 
-    def _get_p1_move(self, obs) -> FootsiesMove:
-        p1_move_index = obs["move"][0]
-        return FOOTSIES_MOVE_INDEX_TO_MOVE[p1_move_index]
+    def _started_moves(self, info: dict) -> "tuple[bool, bool]":
+        """Whether each player started a move on this step, either a different one or the same one again"""
+        moves = info["move"]
+        move_frames = info["move_frame"]
+        started = tuple(
+            moves[player] != self._prev_moves[player]
+            # A non-indefinite move that is performed again starts over
+            or (not FOOTSIES_MOVE_INDEFINITE[moves[player]] and move_frames[player] < self._prev_move_frames[player])
+            for player in (0, 1)
+        )
+        self._prev_moves = moves
+        self._prev_move_frames = move_frames
+        return started
 
     def reset(self, *, seed: int = None, options: dict = None):
         obs, info = self.env.reset(seed=seed, options=options)
-        self._prev_p1_move = self._get_p1_move(obs)
+
+        self._episode = dict.fromkeys(self.METRICS, 0)
+        self._prev_moves = info["move"]
+        self._prev_move_frames = info["move_frame"]
 
         return obs, info
 
     def step(self, action):
         next_obs, reward, terminated, truncated, info = self.env.step(action)
 
-        p1_move = self._get_p1_move(next_obs)
-        if self._prev_p1_move != p1_move and p1_move in {
-            FootsiesMove.B_SPECIAL,
-            FootsiesMove.N_SPECIAL,
-        }:
-            self._special_moves_per_episode_counter += 1
-
-            if self._prev_p1_move not in {
-                FootsiesMove.B_ATTACK,
-                FootsiesMove.N_ATTACK,
-            }:
-                self._special_moves_from_neutral_per_episode_counter += 1
-        
-        self._prev_p1_move = p1_move
+        prev_p1_move = self._prev_moves[0]
+        p1_started, p2_started = self._started_moves(info)
+        p1_move, p2_move = info["move"]
+        episode = self._episode
+
+        if p1_started:
+            self.p1_move_usage[p1_move] += 1
+            if p1_move in _SPECIAL_MOVES:
+                episode["special_moves"] += 1
+                if prev_p1_move not in _ATTACK_MOVES:
+                    episode["special_moves_from_neutral"] += 1
+            if FOOTSIES_MOVE_HIT_GUARD[p1_move]:
+                episode["hits_taken"] += 1
+            if p1_move == _GUARD_BREAK:
+                episode["guard_breaks_suffered"] += 1
+
+        if p2_started:
+            self.p2_move_usage[p2_move] += 1
+            if FOOTSIES_MOVE_HIT_GUARD[p2_move]:
+                episode["hits_landed"] += 1
+            if p2_move == _GUARD_BREAK:
+                episode["guard_breaks_inflicted"] += 1
+
+        episode["episode_length"] += 1
+        episode["episode_return"] += reward
+        self.total_steps += 1
 
         if terminated or truncated:
-            self._special_moves_per_episode.append(
-                self._special_moves_per_episode_counter
-            )
-            self._special_moves_per_episode_counter = 0
+            for name, value in episode.items():
+                self._metrics[name].update(value)
+            if terminated:
+                self._wins.update(1.0 if episode["episode_return"] > 0 else 0.0)
+            self._episode = dict.fromkeys(self.METRICS, 0)
 
         return next_obs, reward, terminated, truncated, info
 
     @property
-    def metric_special_moves_per_episode(self):
-        return self._special_moves_per_episode
+    def episodes(self) -> int:
+        """The number of episodes that finished"""
+        return self._metrics["episode_length"].count
+
+    def metric(self, name: str) -> StreamingMetric:
+        """The summary of one of the per-episode metrics (`METRICS`)"""
+        return self._metrics[name]
+
+    @property
+    def metric_special_moves_per_episode(self) -> np.ndarray:
+        """The number of special moves of each of the most recent episodes"""
+        return self._metrics["special_moves"].window_values()
 
     @property
-    def metric_special_moves_from_neutral_per_episode(self):
-        return self._special_moves_from_neutral_per_episode
-    
+    def metric_special_moves_from_neutral_per_episode(self) -> np.ndarray:
+        """The number of special moves from neutral of each of the most recent episodes"""
+        return self._metrics["special_moves_from_neutral"].window_values()
+
+    def snapshot(self) -> Dict[str, "float | int | np.ndarray"]:
+        """
+        The current statistics as a flat dictionary, meant for loggers. Each per-episode metric has the keys "<metric>/mean", "<metric>/std", "<metric>/min", "<metric>/max"
+        and "<metric>/window_mean", and the move usage counts are arrays indexed by move index (copies)
+        """
+        snapshot = {
+            "episodes": self.episodes,
+            "steps": self.total_steps,
+            "win_rate": self._wins.mean if self._wins.count > 0 else math.nan,
+            "win_rate/window": self._wins.window_mean,
+        }
+        for name, metric in self._metrics.items():
+            for key, value in metric.summary().items():
+                snapshot[f"{name}/{key}"] = value
+        snapshot["p1_move_usage"] = self.p1_move_usage.copy()
+        snapshot["p2_move_usage"] = self.p2_move_usage.copy()
+
+        return snapshot
+
     def report(self):
-        total_episodes = len(self.metric_special_moves_per_episode)
-        total_special_moves = sum(self.metric_special_moves_per_episode)
-        total_special_moves_from_neutral = sum(self.metric_special_moves_from_neutral_per_episode)
+        snapshot = self.snapshot()
 
         print("Report")
-        print(" Special moves")
-        print(f"  Average: {total_special_moves / total_episodes}")
-        print(f"  Total: {total_special_moves}")
-        print(" Special moves")
-        print(f"  Average: {total_special_moves_from_neutral / total_episodes}")
-        print(f"  Total: {total_special_moves_from_neutral}")
\ No newline at end of file
+        print(f" Episodes: {snapshot['episodes']}")
+        print(f" Win rate: {snapshot['win_rate']:.3f} (last {self.window} episodes: {snapshot['win_rate/window']:.3f})")
+        for name in self.METRICS:
+            print(f" {name.replace('_', ' ').capitalize()}")
+            print(f"  Average: {snapshot[name + '/mean']:.3f} (std: {snapshot[name + '/std']:.3f}, last {self.window} episodes: {snapshot[name + '/window_mean']:.3f})")
+            print(f"  Range: [{snapshot[name + '/min']}, {snapshot[name + '/max']}]")
+        print(" P1 move usage")
+        for move, count in zip(FOOTSIES_MOVE_INDEX_TO_MOVE, snapshot["p1_move_usage"]):
+            print(f"  {move.name}: {count}")
@@ -1,3 +1,3 @@
 from setuptools import setup
 
-setup(name="footsies_gym", version="0.0.1", install_requires=["gymnasium>=0.29.1"])
+setup(name="footsies_gym", version="0.0.1", install_requires=["gymnasium>=1.1.0"])